@@ -1,2 +1,3 @@
 from .assistant import Assistant
 from .vector_store import VectorStore
+from .local_vector_store import LocalVectorStore
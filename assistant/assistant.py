@@ -1,8 +1,11 @@
-from typing import List
+from typing import Any, Awaitable, Callable, List, Optional
 
 from loguru import logger
 from openai import AsyncOpenAI
 
+from utils.resilience import Resilience
+
+from .local_vector_store import LocalVectorStore
 from .vector_store import VectorStore
 
 
@@ -39,9 +42,17 @@ class Assistant:
                                Отказывайся от обсуждения несвязанных тем. 
                                Отвечай только на вопросы по поводу твоей компании.
                                """,
+        "local_vector_store_instructions": """
+            Отвечая на вопросы о компании, опирайся на приведённые фрагменты данных о ней.
+        """,
+        "local_passages_header": "Фрагменты данных о компании:",
+        "local_passages_count": 4,
         "tools": [
             {"type": "file_search"},
         ],
+        # "openai" keeps the company data in an OpenAI vector store searched by the file_search tool,
+        # "local" keeps it in a LocalVectorStore whose passages are added to every run.
+        "vector_store_backend": "openai",
     }
 
     def __init__(self) -> None:
@@ -52,6 +63,7 @@ class Assistant:
         - _async_client: An instance of AsyncOpenAI client for making API calls.
         - _assistant: The OpenAI assistant associated with this manager.
         - _vector_storages: A list to hold instances of VectorStore for storing vectors.
+        - _local_store: The LocalVectorStore of the assistant, if the local backend is used.
         - _config: A configuration dictionary with settings for the assistant and vector stores.
         - company_name: The name of the company this assistant is managed for.
         - company_url: The URL of the company this assistant is managed for.
@@ -63,6 +75,7 @@ class Assistant:
         self._async_client = None
         self._assistant = None
         self._vector_storages = []
+        self._local_store = None
         self._config = self._base_config.copy()
 
         self.company_name = ""
@@ -101,8 +114,15 @@ class Assistant:
             company_name=self.company_name, company_url=self.company_url
         )
 
-        # Creating the assistant with configured instructions
-        self._assistant = await self._async_client.beta.assistants.create(
+        if self._config["vector_store_backend"] == "local":
+            await self._initialize_local(data_file_paths)
+            return
+
+        # Creating the assistant with configured instructions, only once since creations are not idempotent
+        self._assistant = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.assistants.create,
+            attempts=1,
             name=self._config["name"],
             instructions=self._config["assistant_instructions"],
             model=self._config["model"],
@@ -121,7 +141,9 @@ class Assistant:
                 async_client=self._async_client,
             )
 
-            self._assistant = await self._async_client.beta.assistants.update(
+            self._assistant = await Resilience.call(
+                "openai.assistants",
+                self._async_client.beta.assistants.update,
                 assistant_id=self._assistant.id,
                 tool_resources={
                     "file_search": {"vector_store_ids": [store.vector_store.id]}
@@ -137,6 +159,212 @@ class Assistant:
         except Exception as e:
             logger.error(f"Error in store initialization in assistant: {e}.")
 
+    async def _initialize_local(self, data_file_paths: List[str]) -> None:
+        """
+        Creates the assistant without the file_search tool and builds its LocalVectorStore,
+        recording the store in the assistant's metadata so that it can be restored.
+
+        Parameters:
+        - data_file_paths (List[str]): Paths to the data files indexed by the store.
+
+        Returns:
+        None
+        """
+
+        store = LocalVectorStore()
+        await store.initialization(
+            name=self._config["vector_store_name"].format(
+                company_name=self.company_name
+            ),
+            file_paths=data_file_paths,
+            instructions=self._config["local_vector_store_instructions"],
+            async_client=self._async_client,
+        )
+        self._local_store = store
+
+        self._assistant = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.assistants.create,
+            attempts=1,
+            name=self._config["name"],
+            instructions=self._config["assistant_instructions"],
+            model=self._config["model"],
+            metadata={
+                "vector_store_backend": "local",
+                "local_vector_store_id": store.id,
+            },
+        )
+
+        self._config["run_instructions"] += store.instructions
+
+    async def restore(
+        self,
+        async_client: AsyncOpenAI,
+        company_name: str,
+        company_url: str,
+        assistant_id: str,
+        data_file_paths: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Restores an Assistant that was created earlier, retrieving it instead of creating it again.
+
+        Parameters:
+        - async_client (AsyncOpenAI): The asynchronous OpenAI client for API interactions.
+        - company_name (str): The name of the company.
+        - company_url (str): The URL of the company.
+        - assistant_id (str): The ID of the existing assistant.
+        - data_file_paths (Optional[List[str]], optional): Paths to the data files, used to rebuild a local vector store
+          that is missing on this instance. Defaults to None.
+
+        Returns:
+        None
+        """
+
+        self._async_client = async_client
+        self.company_name = company_name
+        self.company_url = company_url
+
+        self._assistant = await Resilience.call(
+            "openai.assistants", self._async_client.beta.assistants.retrieve, assistant_id
+        )
+
+        self._config["run_instructions"] = self._config["run_instructions"].format(
+            company_name=self.company_name, company_url=self.company_url
+        )
+
+        # Restoring the local vector store recorded at creation
+        metadata = self._assistant.metadata or {}
+        if metadata.get("vector_store_backend") == "local":
+            store = LocalVectorStore()
+            try:
+                try:
+                    await store.load(
+                        store_id=metadata["local_vector_store_id"],
+                        instructions=self._config["local_vector_store_instructions"],
+                        async_client=self._async_client,
+                    )
+                except FileNotFoundError:
+                    # The store was built by another instance or before a redeploy, rebuilding it under the same ID
+                    if data_file_paths is None:
+                        raise
+                    logger.info(
+                        f"Rebuilding missing local vector store {metadata['local_vector_store_id']}."
+                    )
+                    store = LocalVectorStore()
+                    await store.initialization(
+                        name=self._config["vector_store_name"].format(
+                            company_name=self.company_name
+                        ),
+                        file_paths=data_file_paths,
+                        instructions=self._config["local_vector_store_instructions"],
+                        async_client=self._async_client,
+                        store_id=metadata["local_vector_store_id"],
+                    )
+                self._local_store = store
+                self._config["run_instructions"] += store.instructions
+            except Exception as e:
+                logger.error(
+                    f"Error while loading local vector store of assistant: {e}."
+                )
+            return
+
+        # Restoring the run instructions of the vector stores attached at creation
+        tool_resources = self._assistant.tool_resources
+        if (
+            tool_resources is not None
+            and tool_resources.file_search is not None
+            and tool_resources.file_search.vector_store_ids
+        ):
+            self._config["run_instructions"] += self._config[
+                "vector_store_instructions"
+            ]
+
+    async def update_data(self, data_file_paths: List[str]) -> None:
+        """
+        Replaces the company data the assistant answers from, e.g. after the company's website has been recrawled.
+
+        The new data is indexed in a new vector store of the same backend, which then replaces the old one.
+
+        Parameters:
+        - data_file_paths (List[str]): Paths to the new data files.
+
+        Returns:
+        None
+        """
+
+        metadata = self._assistant.metadata or {}
+        if metadata.get("vector_store_backend") == "local":
+            store = LocalVectorStore()
+            await store.initialization(
+                name=self._config["vector_store_name"].format(
+                    company_name=self.company_name
+                ),
+                file_paths=data_file_paths,
+                instructions=self._config["local_vector_store_instructions"],
+                async_client=self._async_client,
+            )
+            self._assistant = await Resilience.call(
+                "openai.assistants",
+                self._async_client.beta.assistants.update,
+                assistant_id=self._assistant.id,
+                metadata={**metadata, "local_vector_store_id": store.id},
+            )
+            self._local_store = store
+
+            # Deleting the files of the replaced store, which is no longer used by the assistant
+            old_store = LocalVectorStore()
+            old_store.id = metadata.get("local_vector_store_id") or ""
+            if old_store.id:
+                try:
+                    await old_store.delete()
+                except Exception as e:
+                    logger.error(
+                        f"Error while deleting local vector store {old_store.id}: {e}."
+                    )
+            return
+
+        store = VectorStore()
+        await store.initialization(
+            name=self._config["vector_store_name"].format(
+                company_name=self.company_name
+            ),
+            file_paths=data_file_paths,
+            instructions=self._config["vector_store_instructions"],
+            async_client=self._async_client,
+        )
+
+        tool_resources = self._assistant.tool_resources
+        old_ids = (
+            tool_resources.file_search.vector_store_ids or []
+            if tool_resources is not None and tool_resources.file_search is not None
+            else []
+        )
+
+        self._assistant = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.assistants.update,
+            assistant_id=self._assistant.id,
+            tool_resources={
+                "file_search": {"vector_store_ids": [store.vector_store.id]}
+            },
+        )
+        if len(old_ids) == 0:
+            self._config["run_instructions"] += store.instructions
+        self._vector_storages = [store]
+
+        # Deleting the replaced vector stores, which are no longer used by the assistant
+        for vector_store_id in old_ids:
+            try:
+                await Resilience.call(
+                    "openai.assistants",
+                    self._async_client.beta.vector_stores.delete,
+                    vector_store_id,
+                )
+            except Exception as e:
+                logger.error(
+                    f"Error while deleting vector store {vector_store_id}: {e}."
+                )
+
     async def request(
         self,
         thread_id: str,
@@ -158,52 +386,244 @@ class Assistant:
                 "async_client must be initialized before calling speech_to_text."
             )
 
-        # Sending the prompt to the assistant
-        user_message = await self._async_client.beta.threads.messages.create(
-            thread_id=thread_id, role="user", content=prompt
+        # Sending the prompt to the assistant, only once so that a retry does not post it twice
+        user_message = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.threads.messages.create,
+            attempts=1,
+            thread_id=thread_id,
+            role="user",
+            content=prompt,
         )
 
-        # Running the assistant with the configured instructions
-        run = await self._async_client.beta.threads.runs.create_and_poll(
+        # Running the assistant with the configured instructions. The run is created once,
+        # only the polling of the existing run is retried.
+        run = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.threads.runs.create,
+            attempts=1,
             thread_id=thread_id,
             assistant_id=self._assistant.id,
             instructions=self._config["run_instructions"],
+            additional_instructions=await self._retrieve_passages(prompt),
         )
+        run = await self._wait_for_run(thread_id, run.id)
 
         # Handling required actions and polling for completion
         if run.status == "requires_action":
             tool_outputs = []
             for tool in run.required_action.submit_tool_outputs.tool_calls:
-                run = await self._async_client.beta.threads.runs.submit_tool_outputs_and_poll(
-                    thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+                run = await Resilience.call(
+                    "openai.assistants",
+                    self._async_client.beta.threads.runs.submit_tool_outputs,
+                    attempts=1,
+                    thread_id=thread_id,
+                    run_id=run.id,
+                    tool_outputs=tool_outputs,
                 )
+                run = await self._wait_for_run(thread_id, run.id)
 
         # Processing the completed run's messages
         if run.status == "completed":
-            messages = await self._async_client.beta.threads.messages.list(
-                thread_id=thread_id
+            messages = await Resilience.call(
+                "openai.assistants",
+                self._async_client.beta.threads.messages.list,
+                thread_id=thread_id,
             )
 
             if messages.data and messages.data[0].role == "assistant":
-                message_content = messages.data[0].content[0].text
-                citations = []
-                annotations = message_content.annotations
-                for index, annotation in enumerate(annotations):
-                    if file_citation := getattr(annotation, "file_citation", None):
-                        cited_file: dict = await self._async_client.files.retrieve(
-                            file_citation.file_id
-                        )
-                        citations.append(cited_file.filename)
-                    if index < len(citations):
-                        message_content.value = message_content.value.replace(
-                            annotation.text, ""
-                        )
-                ans = message_content.value
-                return ans
+                return await self._render_answer(messages.data[0])
             else:
                 raise Exception("No assistant message found.")
         else:
-            raise Exception(f'Run status is not <completed>, it\'s "{run["status"]}".')
+            raise Exception(f'Run status is not <completed>, it\'s "{run.status}".')
+
+    async def request_stream(
+        self,
+        thread_id: str,
+        prompt: str,
+        on_delta: Callable[[str], Awaitable[None]],
+    ) -> str:
+        """
+        Sends a request to the assistant and streams the response as it is generated.
+
+        Parameters:
+        - thread_id (str): The ID of the conversation thread.
+        - prompt (str): The text prompt to send to the assistant.
+        - on_delta (Callable[[str], Awaitable[None]]): Coroutine called with every new piece of the response text.
+
+        Returns:
+        str: The assistant's complete response to the prompt, with file citations removed.
+        """
+
+        if self._async_client is None:
+            raise ValueError(
+                "async_client must be initialized before calling speech_to_text."
+            )
+
+        # Sending the prompt to the assistant, only once so that a retry does not post it twice
+        await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.threads.messages.create,
+            attempts=1,
+            thread_id=thread_id,
+            role="user",
+            content=prompt,
+        )
+
+        # Running the assistant and forwarding the text as it arrives
+        async with self._async_client.beta.threads.runs.stream(
+            thread_id=thread_id,
+            assistant_id=self._assistant.id,
+            instructions=self._config["run_instructions"],
+            additional_instructions=await self._retrieve_passages(prompt),
+        ) as stream:
+            try:
+                async for delta in stream.text_deltas:
+                    await on_delta(delta)
+                messages = await stream.get_final_messages()
+            except BaseException:
+                # A run left active would block every later message of the thread
+                if stream.current_run is not None:
+                    await self._cancel_run(thread_id, stream.current_run.id)
+                raise
+
+        answers = [message for message in messages if message.role == "assistant"]
+        if len(answers) == 0:
+            raise Exception("No assistant message found.")
+        return await self._render_answer(answers[-1])
+
+    async def add_exchange(self, thread_id: str, prompt: str, answer: str) -> None:
+        """
+        Appends a question and its answer to a thread without running the assistant,
+        so that an answer given from a cache is part of the context of the next questions.
+
+        Parameters:
+        - thread_id (str): The ID of the conversation thread.
+        - prompt (str): The question.
+        - answer (str): The answer to the question.
+
+        Returns:
+        None
+        """
+
+        # The messages are posted only once, so that a retry does not post them twice
+        for role, content in (("user", prompt), ("assistant", answer)):
+            await Resilience.call(
+                "openai.assistants",
+                self._async_client.beta.threads.messages.create,
+                attempts=1,
+                thread_id=thread_id,
+                role=role,
+                content=content,
+            )
+
+    async def _wait_for_run(self, thread_id: str, run_id: str) -> Any:
+        """
+        Polls a run until it ends. Polling an existing run is safe to retry, unlike creating it;
+        a run that cannot be waited for is cancelled, so that it does not block the thread.
+
+        Parameters:
+        - thread_id (str): The ID of the conversation thread.
+        - run_id (str): The ID of the run.
+
+        Returns:
+        Any: The ended run.
+        """
+
+        try:
+            return await Resilience.call(
+                "openai.assistants",
+                self._async_client.beta.threads.runs.poll,
+                run_id,
+                thread_id=thread_id,
+            )
+        except BaseException:
+            await self._cancel_run(thread_id, run_id)
+            raise
+
+    async def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        """
+        Cancels a run, on a best-effort basis.
+
+        Parameters:
+        - thread_id (str): The ID of the conversation thread.
+        - run_id (str): The ID of the run.
+
+        Returns:
+        None
+        """
+
+        try:
+            await self._async_client.beta.threads.runs.cancel(
+                run_id=run_id, thread_id=thread_id
+            )
+        except Exception as e:
+            logger.error(f"Error while cancelling run {run_id}: {e}.")
+
+    async def _retrieve_passages(self, prompt: str) -> Optional[str]:
+        """
+        Retrieves the passages of the local vector store relevant to a prompt, formatted as run instructions.
+
+        Parameters:
+        - prompt (str): The text prompt sent to the assistant.
+
+        Returns:
+        Optional[str]: The instructions with the passages, or None if the local backend is not used.
+        """
+
+        if self._local_store is None:
+            return None
+
+        try:
+            passages = await self._local_store.search(
+                prompt, k=self._config["local_passages_count"]
+            )
+        except Exception as e:
+            logger.error(f"Error while searching local vector store: {e}.")
+            return None
+        if len(passages) == 0:
+            return None
+        return "\n\n".join([self._config["local_passages_header"], *passages])
+
+    async def _render_answer(self, message: Any) -> str:
+        """
+        Extracts the text of an assistant message, removing the markers of file citations.
+
+        Parameters:
+        - message (Any): The assistant message.
+
+        Returns:
+        str: The text of the message.
+        """
+
+        message_content = message.content[0].text
+        citations = []
+        annotations = message_content.annotations
+        for index, annotation in enumerate(annotations):
+            if file_citation := getattr(annotation, "file_citation", None):
+                cited_file: dict = await Resilience.call(
+                    "openai.assistants",
+                    self._async_client.files.retrieve,
+                    file_citation.file_id,
+                )
+                citations.append(cited_file.filename)
+            if index < len(citations):
+                message_content.value = message_content.value.replace(
+                    annotation.text, ""
+                )
+        return message_content.value
+
+    @classmethod
+    def vector_store_backend(cls) -> str:
+        """
+        Returns the backend in which new assistants keep their company data.
+
+        Returns:
+        str: "openai" or "local".
+        """
+
+        return cls._base_config["vector_store_backend"]
 
     async def get_id(self) -> str:
         """
@@ -0,0 +1,223 @@
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from openai import AsyncOpenAI
+
+from utils.resilience import Resilience
+
+
+class LocalVectorStore:
+    """
+    LocalVectorStore is a retrieval engine kept next to the bot instead of in an OpenAI vector store:
+    the company data is chunked, embedded and indexed with faiss, and the index is persisted to local disk.
+    The disk copy is only a cache of one instance: a store missing on another instance is rebuilt from the company data.
+    """
+
+    # A dictionary containing configuration options for the store, such as the embedding model and the chunk size.
+    _config = {
+        "directory": "./vector_stores",
+        "embedding_model": "text-embedding-3-small",
+        "chunk_size": 1200,
+        "chunk_overlap": 150,
+        "embedding_batch_size": 96,
+        "embedding_concurrency": 4,
+    }
+
+    def __init__(self) -> None:
+        """
+        Initializes a new LocalVectorStore instance.
+
+        Returns:
+        None
+        """
+
+        self.id = ""
+        self.name = ""
+        self.instructions = ""
+        self.file_paths = []
+        self._async_client = None
+        self._index = None
+        self._chunks: List[str] = []
+
+    async def initialization(
+        self,
+        name: str,
+        file_paths: List[str],
+        instructions: str,
+        async_client: AsyncOpenAI,
+        store_id: Optional[str] = None,
+    ) -> None:
+        """
+        Builds the store from the given files: splits them into chunks, embeds the chunks in batches
+        and persists the faiss index and the chunks to disk.
+
+        Parameters:
+        - name (str): The name of the store.
+        - file_paths (List[str]): A list of paths to the files with the data of the store.
+        - instructions (str): Instructions for the assistant on how to use the retrieved passages.
+        - async_client (AsyncOpenAI): An asynchronous client for interacting with the OpenAI API.
+        - store_id (Optional[str], optional): The ID of a store to rebuild, or None to create a new one. Defaults to None.
+
+        Returns:
+        None
+        """
+
+        self.id = store_id or str(uuid.uuid4())
+        self.name = name
+        self.file_paths = file_paths
+        self.instructions = instructions
+        self._async_client = async_client
+
+        # Splitting the files into overlapping chunks
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self._config["chunk_size"],
+            chunk_overlap=self._config["chunk_overlap"],
+        )
+        for path in self.file_paths:
+            with open(path, "r") as file:
+                self._chunks.extend(splitter.split_text(file.read()))
+        if len(self._chunks) == 0:
+            raise ValueError(f"No data to index in local vector store {self.name}.")
+
+        # Embedding the chunks in concurrent batches
+        batch_size = self._config["embedding_batch_size"]
+        semaphore = asyncio.Semaphore(self._config["embedding_concurrency"])
+
+        async def _embed_batch(start: int) -> np.ndarray:
+            async with semaphore:
+                return await self._embed(self._chunks[start : start + batch_size])
+
+        batches = await asyncio.gather(
+            *[_embed_batch(start) for start in range(0, len(self._chunks), batch_size)]
+        )
+        vectors = np.vstack(batches)
+
+        self._index = faiss.IndexFlatIP(vectors.shape[1])
+        self._index.add(vectors)
+
+        # Persisting the index and the chunks off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._save)
+
+    async def load(
+        self, store_id: str, instructions: str, async_client: AsyncOpenAI
+    ) -> None:
+        """
+        Loads a store persisted earlier, memory-mapping its index.
+
+        Parameters:
+        - store_id (str): The ID of the store.
+        - instructions (str): Instructions for the assistant on how to use the retrieved passages.
+        - async_client (AsyncOpenAI): An asynchronous client for interacting with the OpenAI API.
+
+        Returns:
+        None
+        """
+
+        self.id = store_id
+        self.instructions = instructions
+        self._async_client = async_client
+
+        await asyncio.get_running_loop().run_in_executor(None, self._load)
+
+    async def delete(self) -> None:
+        """
+        Removes the files of the store from disk.
+
+        Returns:
+        None
+        """
+
+        await asyncio.get_running_loop().run_in_executor(
+            None, shutil.rmtree, os.path.dirname(self._path("")), True
+        )
+
+    async def search(self, query: str, k: int = 4) -> List[str]:
+        """
+        Finds the passages most relevant to a query.
+
+        Parameters:
+        - query (str): The query.
+        - k (int, optional): The number of passages to return. Defaults to 4.
+
+        Returns:
+        List[str]: The passages, most relevant first.
+        """
+
+        vector = await self._embed([query])
+        _, ids = self._index.search(vector, min(k, len(self._chunks)))
+        return [self._chunks[id] for id in ids[0] if id >= 0]
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Computes the normalized embeddings of texts in a single request.
+
+        Parameters:
+        - texts (List[str]): The texts to embed.
+
+        Returns:
+        np.ndarray: The embeddings, one row per text.
+        """
+
+        response = await Resilience.call(
+            "openai.embeddings",
+            self._async_client.embeddings.create,
+            model=self._config["embedding_model"],
+            input=texts,
+        )
+        vectors = np.asarray(
+            [item.embedding for item in response.data], dtype=np.float32
+        )
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def _path(self, file_name: str) -> str:
+        """
+        Returns the path of one of the store files.
+
+        Parameters:
+        - file_name (str): The name of the file.
+
+        Returns:
+        str: The path of the file.
+        """
+
+        return os.path.join(self._config["directory"], self.id, file_name)
+
+    def _save(self) -> None:
+        """
+        Writes the index and the chunks to disk.
+
+        Returns:
+        None
+        """
+
+        # Writing to temporary files first, so an instance rebuilding the same store never exposes a partial file
+        os.makedirs(os.path.dirname(self._path("")), exist_ok=True)
+        suffix = f".{uuid.uuid4()}.tmp"
+        faiss.write_index(self._index, self._path("index.faiss" + suffix))
+        with open(self._path("chunks.json" + suffix), "w") as file:
+            json.dump(
+                {"name": self.name, "chunks": self._chunks}, file, ensure_ascii=False
+            )
+        os.replace(self._path("index.faiss" + suffix), self._path("index.faiss"))
+        os.replace(self._path("chunks.json" + suffix), self._path("chunks.json"))
+
+    def _load(self) -> None:
+        """
+        Reads the chunks from disk and memory-maps the index.
+
+        Returns:
+        None
+        """
+
+        with open(self._path("chunks.json"), "r") as file:
+            data = json.load(file)
+        self.name = data["name"]
+        self._chunks = data["chunks"]
+        self._index = faiss.read_index(self._path("index.faiss"), faiss.IO_FLAG_MMAP)
@@ -2,6 +2,8 @@ from typing import Any, List
 
 from openai import AsyncOpenAI
 
+from utils.resilience import Resilience
+
 
 class VectorStore:
     """
@@ -54,24 +56,32 @@ class VectorStore:
         self.instructions = instructions
         self._async_client = async_client
 
-        # Creating the vector store instance
-        self.vector_store = await self._async_client.beta.vector_stores.create(
-            name=self.name
+        # Creating the vector store instance, only once since creations are not idempotent
+        self.vector_store = await Resilience.call(
+            "openai.assistants",
+            self._async_client.beta.vector_stores.create,
+            attempts=1,
+            name=self.name,
         )
 
         # Checking if file_paths is None to avoid unnecessary operations
         if self.file_paths is None:
             return
 
-        # Opening the files in binary mode for reading
-        file_streams = [open(path, "rb") for path in self.file_paths]
+        async def _upload() -> Any:
+            # Opening the files in binary mode for reading
+            file_streams = [open(path, "rb") for path in self.file_paths]
+            try:
+                return await self._async_client.beta.vector_stores.file_batches.upload_and_poll(
+                    vector_store_id=self.vector_store.id, files=file_streams
+                )
+            finally:
+                for stream in file_streams:
+                    stream.close()
 
-        # Uploading the files to the vector store and waiting for the upload to complete
-        self.file_batch = (
-            await self._async_client.beta.vector_stores.file_batches.upload_and_poll(
-                vector_store_id=self.vector_store.id, files=file_streams
-            )
-        )
+        # Uploading the files to the vector store and waiting for the upload to complete,
+        # only once so that a retry does not upload the files twice
+        self.file_batch = await Resilience.call("openai.assistants", _upload, attempts=1)
 
         # Verifying that all files were successfully uploaded
         if not (
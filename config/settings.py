@@ -1,6 +1,8 @@
 import os
 from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
+import httpx
 from aiogram import Bot
 from firecrawl import FirecrawlApp
 from loguru import logger
@@ -19,6 +21,17 @@ class Settings(BaseSettings):
     SER_KEY: str = Field(env="SER_KEY")
     FIRE_CRAWL_KEY: str = Field(env="FIRE_CRAWL_KEY")
     DATABASE_URL: str = Field(env="DATABASE_URL")
+    ONBOARDING_WORKERS: int = Field(default=2, env="ONBOARDING_WORKERS")
+    FSM_STORAGE: str = Field(default="memory", env="FSM_STORAGE")
+    BOT_MODE: str = Field(default="polling", env="BOT_MODE")
+    WEBHOOK_BASE_URL: str = Field(default="", env="WEBHOOK_BASE_URL")
+    WEBHOOK_PATH: str = Field(default="/webhook", env="WEBHOOK_PATH")
+    WEBHOOK_HOST: str = Field(default="0.0.0.0", env="WEBHOOK_HOST")
+    WEBHOOK_PORT: int = Field(default=8080, env="WEBHOOK_PORT")
+    WEBHOOK_SECRET: Optional[str] = Field(default=None, env="WEBHOOK_SECRET")
+    WEBHOOK_CONCURRENCY: int = Field(default=32, env="WEBHOOK_CONCURRENCY")
+    WEBHOOK_DRAIN_TIMEOUT: float = Field(default=30.0, env="WEBHOOK_DRAIN_TIMEOUT")
+    REFRESH_ENABLED: bool = Field(default=True, env="REFRESH_ENABLED")
 
     @property
     def bot(self) -> Bot:
@@ -43,9 +56,26 @@ class Settings(BaseSettings):
         """
 
         if not hasattr(self, "_async_client"):
-            self._async_client = AsyncOpenAI(api_key=self.OPENAI_KEY)
+            # Retries are made by utils.resilience, so the client itself must not multiply them.
+            self._async_client = AsyncOpenAI(api_key=self.OPENAI_KEY, max_retries=0)
         return self._async_client
 
+    @property
+    def http_async_client(self) -> httpx.AsyncClient:
+        """
+        Returns a pooled asynchronous HTTP client shared by the LangChain model clients.
+
+        Returns:
+        - httpx.AsyncClient: An instance of httpx.AsyncClient with keep-alive connection pooling.
+        """
+
+        if not hasattr(self, "_http_async_client"):
+            self._http_async_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+            )
+        return self._http_async_client
+
     @property
     def thread_executor(self) -> ThreadPoolExecutor:
         """
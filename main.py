@@ -2,10 +2,18 @@ import asyncio
 from asyncio.exceptions import CancelledError
 
 from aiogram import Dispatcher
+from aiogram.fsm.storage.memory import MemoryStorage
 from loguru import logger
 
 from config import settings
-from services import AssistantService, SttService, TtsService
+from services import (
+    AssistantService,
+    OnboardingService,
+    RefreshScheduler,
+    SemanticCacheService,
+    SttService,
+    TtsService,
+)
 from tg.routers import (
     get_company_name_router,
     get_website_url_router,
@@ -14,26 +22,34 @@ from tg.routers import (
     text_message_router,
     voice_message_router,
 )
+from tg.storage import DbStorage
+from tg.webhook import WebhookServer
 
 
 async def main():
     """
     Initializes the bot, sets up routers for handling different types of messages and commands,
-    and starts the bot's polling loop.
+    and starts the bot's polling loop or webhook server, depending on the BOT_MODE setting.
 
     Returns:
     - None
     """
 
-    dp = Dispatcher()
+    # Keep the conversation state in the database when several bot instances share it.
+    storage = DbStorage() if settings.FSM_STORAGE == "db" else MemoryStorage()
+    dp = Dispatcher(storage=storage)
 
     bot = settings.bot
     async_client = settings.async_client
 
     # Initialize services with the async client.
     AssistantService.initialize(async_client=async_client)
+    SemanticCacheService.initialize(async_client=async_client)
     SttService.initialize(async_client=async_client)
     TtsService.initialize(async_client=async_client)
+    OnboardingService.initialize(
+        bot=bot, storage=dp.storage, workers=settings.ONBOARDING_WORKERS
+    )
 
     # Include routers for handling different types of messages and commands.
     dp.include_router(start_command_router)
@@ -43,10 +59,38 @@ async def main():
     dp.include_router(get_company_name_router)
     dp.include_router(get_website_url_router)
 
+    # Start the background onboarding workers, resuming jobs interrupted by a restart.
+    await OnboardingService.start()
+
+    # Start the background refresh of company data.
+    if settings.REFRESH_ENABLED:
+        RefreshScheduler.start()
+
     logger.info("Bot started")
 
-    # Start the bot's polling loop.
-    await dp.start_polling(bot)
+    try:
+        if settings.BOT_MODE == "webhook":
+            # Serve updates over HTTP, so several replicas can share the load.
+            server = WebhookServer(
+                dp,
+                bot,
+                concurrency=settings.WEBHOOK_CONCURRENCY,
+                secret=settings.WEBHOOK_SECRET,
+                drain_timeout=settings.WEBHOOK_DRAIN_TIMEOUT,
+            )
+            await server.run(
+                host=settings.WEBHOOK_HOST,
+                port=settings.WEBHOOK_PORT,
+                path=settings.WEBHOOK_PATH,
+                base_url=settings.WEBHOOK_BASE_URL,
+            )
+        else:
+            # Start the bot's polling loop.
+            await dp.start_polling(bot)
+    finally:
+        await RefreshScheduler.stop()
+        await OnboardingService.stop()
+        await storage.close()
 
 
 if __name__ == "__main__":
@@ -1 +1,5 @@
 from .company_model import CompanyModel
+from .company_page_model import CompanyPageModel
+from .fsm_state_model import FsmStateModel
+from .onboarding_job_model import OnboardingJobModel
+from .summary_cache_model import SummaryCacheModel
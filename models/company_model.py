@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, DateTime, Integer, String
 
 from utils.repository import Base
 
@@ -25,6 +25,11 @@ class CompanyModel(Base):
     """
     company_url = Column(String, unique=True)
 
+    """
+    Column to store the canonical URL of the company, identifying its website whatever the spelling of its URL.
+    """
+    canonical_url = Column(String, unique=True)
+
     """
     Column to store raw data fetched from the company's website (data after crawling).
     """
@@ -45,6 +50,36 @@ class CompanyModel(Base):
     """
     assistant_url = Column(String, unique=True)
 
+    """
+    Column to store the number of seconds between two refreshes of the company data, or NULL for the default interval.
+    """
+    refresh_interval = Column(Integer)
+
+    """
+    Column to store the moment the company data is due to be refreshed.
+    """
+    next_refresh_at = Column(DateTime, index=True)
+
+    """
+    Column to store the moment the company's website was last recrawled.
+    """
+    refreshed_at = Column(DateTime)
+
+    """
+    Column to store the ETag of the company's home page, sent back to validate it.
+    """
+    etag = Column(String)
+
+    """
+    Column to store the Last-Modified date of the company's home page, sent back to validate it.
+    """
+    last_modified = Column(String)
+
+    """
+    Column to store the hash of the company's home page, for sites without validators.
+    """
+    home_page_hash = Column(String)
+
     def to_dict(self):
         """
         Converts the CompanyModel instance into a dictionary representation,
@@ -56,6 +91,7 @@ class CompanyModel(Base):
         return {
             "company_name": self.company_name,
             "company_url": self.company_url,
+            "canonical_url": self.canonical_url,
             "web_site_raw_data": self.web_site_raw_data,
             "web_site_summary_data": self.web_site_summary_data,
             "assistant_id": self.assistant_id,
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+
+from utils.repository import Base
+
+
+class CompanyPageModel(Base):
+    """
+    Represents a crawled page of a company's website, so that a recrawl only processes the pages that changed.
+    """
+
+    __tablename__ = "company_page"
+    __table_args__ = (UniqueConstraint("company_id", "url"),)
+
+    """
+    Primary key column for uniquely identifying each page record.
+    """
+    id = Column(Integer, primary_key=True)
+
+    """
+    Column to store the identifier of the company the page belongs to.
+    """
+    company_id = Column(
+        Integer, ForeignKey("company.id", ondelete="CASCADE"), index=True
+    )
+
+    """
+    Column to store the URL of the page.
+    """
+    url = Column(String)
+
+    """
+    Column to store the hash of the cleaned text of the page.
+    """
+    content_hash = Column(String)
+
+    """
+    Column to store the hash of the page text as last seen by the refresh scheduler when validating the website.
+    """
+    validation_hash = Column(String)
+
+    """
+    Column to store the moment the page was last fetched.
+    """
+    fetched_at = Column(DateTime, default=datetime.utcnow)
+
+    """
+    Column to store the cleaned text of the page.
+    """
+    cleaned_text = Column(String)
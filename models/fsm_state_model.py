@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, String
+
+from utils.repository import Base
+
+
+class FsmStateModel(Base):
+    """
+    Represents the conversation state (FSM state and data) of a Telegram user in a chat.
+    """
+
+    __tablename__ = "fsm_state"
+
+    """
+    Primary key column storing the storage key built from the bot, chat and user IDs.
+    """
+    key = Column(String, primary_key=True)
+
+    """
+    Column to store the name of the current FSM state.
+    """
+    state = Column(String)
+
+    """
+    Column to store the data attached to the conversation.
+    """
+    data = Column(JSON)
+
+    """
+    Column to store the moment the state was last written.
+    """
+    updated_at = Column(DateTime, default=datetime.utcnow)
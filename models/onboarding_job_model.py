@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+
+from utils.repository import Base
+
+
+class OnboardingJobModel(Base):
+    """
+    Represents a background job creating an assistant for a company on behalf of a Telegram user.
+    """
+
+    __tablename__ = "onboarding_job"
+
+    """
+    Primary key column for uniquely identifying each job.
+    """
+    id = Column(Integer, primary_key=True)
+
+    """
+    Column to store the ID of the Telegram chat the job was requested from.
+    """
+    chat_id = Column(BigInteger)
+
+    """
+    Column to store the ID of the Telegram user who requested the job.
+    """
+    user_id = Column(BigInteger)
+
+    """
+    Column to store the ID of the Telegram message the job progress is edited into.
+    """
+    message_id = Column(BigInteger)
+
+    """
+    Column to store the name of the company.
+    """
+    company_name = Column(String)
+
+    """
+    Column to store the URL of the company.
+    """
+    company_url = Column(String)
+
+    """
+    Column to store the status of the job: pending, running, done or failed.
+    """
+    status = Column(String, index=True)
+
+    """
+    Column to store the current stage of the job.
+    """
+    stage = Column(String)
+
+    """
+    Column to store the ID of the worker running the job.
+    """
+    worker_id = Column(String)
+
+    """
+    Column to store the moment the lease of the worker on the job expires, unless it is renewed.
+    """
+    lease_expires_at = Column(DateTime, index=True)
+
+    """
+    Column to store the error message of a failed job.
+    """
+    error = Column(String)
+
+    """
+    Column to store the moment the job was created.
+    """
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    """
+    Column to store the moment the job was last updated.
+    """
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from utils.repository import Base
+
+
+class SummaryCacheModel(Base):
+    """
+    Represents a cached summary in the database, addressed by the hash of the summarized content.
+    """
+
+    __tablename__ = "summary_cache"
+
+    """
+    Primary key column for uniquely identifying each cached summary.
+    """
+    id = Column(Integer, primary_key=True)
+
+    """
+    Column to store the hash of the cleaned text, the prompt template and the model used for the summary.
+    """
+    content_hash = Column(String, unique=True)
+
+    """
+    Column to store the name of the model that produced the summary.
+    """
+    model = Column(String)
+
+    """
+    Column to store the summary itself.
+    """
+    summary = Column(String)
+
+    """
+    Column to store the moment the summary was cached.
+    """
+    created_at = Column(DateTime, default=datetime.utcnow)
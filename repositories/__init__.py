@@ -1 +1,5 @@
+from .company_page_repository import CompanyPageRepository
 from .company_respoitory import CompanyRepository
+from .fsm_state_repository import FsmStateRepository
+from .onboarding_job_repository import OnboardingJobRepository
+from .summary_cache_repository import SummaryCacheRepository
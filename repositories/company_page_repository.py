@@ -0,0 +1,131 @@
+from typing import Any, Dict, List
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from models import CompanyPageModel
+from utils.repository import async_session
+
+
+class CompanyPageRepository:
+    """
+    CompanyPageRepository is a class responsible for handling operations related to the CompanyPageModel.
+    It provides methods for saving, deleting and retrieving the crawled pages of companies.
+    """
+
+    model = CompanyPageModel
+
+    async def get_by_company_id(self, company_id: int):
+        """
+        Asynchronously retrieves the pages of a company from the database.
+
+        Parameters:
+        - company_id (int): The unique identifier for the company.
+
+        Returns:
+        - list: The pages of the company.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model).where(self.model.company_id == company_id)
+            )
+            return [page for page in result.scalars().all()]
+
+    async def get_validation_sample(self, company_id: int, limit: int):
+        """
+        Asynchronously retrieves the URLs and validation hashes of a random sample of a company's pages.
+
+        Parameters:
+        - company_id (int): The unique identifier for the company.
+        - limit (int): The maximum number of pages to retrieve.
+
+        Returns:
+        - list: Rows with the url and validation_hash of each sampled page.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model.url, self.model.validation_hash)
+                .where(self.model.company_id == company_id)
+                .order_by(func.random())
+                .limit(limit)
+            )
+            return [row for row in result.all()]
+
+    async def update_validation_hashes(self, company_id: int, hashes: Dict[str, str]):
+        """
+        Asynchronously stores the validation hashes of several pages of a company.
+
+        Parameters:
+        - company_id (int): The unique identifier for the company.
+        - hashes (Dict[str, str]): The validation hash of each page, by URL.
+
+        Returns:
+        - None
+        """
+
+        if len(hashes) == 0:
+            return
+
+        async with async_session() as session:
+            async with session.begin():
+                for url, validation_hash in hashes.items():
+                    await session.execute(
+                        update(self.model)
+                        .where(self.model.company_id == company_id, self.model.url == url)
+                        .values(validation_hash=validation_hash)
+                    )
+
+    async def upsert_many(self, pages_info: List[Dict[str, Any]]):
+        """
+        Asynchronously inserts or overwrites several pages in a single statement.
+
+        Parameters:
+        - pages_info (List[Dict[str, Any]]): Dictionaries containing the company_id, url, content_hash,
+          fetched_at and cleaned_text of each page.
+
+        Returns:
+        - None
+        """
+
+        if len(pages_info) == 0:
+            return
+
+        statement = insert(self.model).values(pages_info)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.model.company_id, self.model.url],
+            set_={
+                "content_hash": statement.excluded.content_hash,
+                "fetched_at": statement.excluded.fetched_at,
+                "cleaned_text": statement.excluded.cleaned_text,
+            },
+        )
+
+        async with async_session() as session:
+            async with session.begin():
+                await session.execute(statement)
+
+    async def delete_by_urls(self, company_id: int, urls: List[str]):
+        """
+        Asynchronously deletes the pages of a company with the given URLs.
+
+        Parameters:
+        - company_id (int): The unique identifier for the company.
+        - urls (List[str]): The URLs of the pages to delete.
+
+        Returns:
+        - None
+        """
+
+        if len(urls) == 0:
+            return
+
+        async with async_session() as session:
+            async with session.begin():
+                await session.execute(
+                    delete(self.model).where(
+                        self.model.company_id == company_id, self.model.url.in_(urls)
+                    )
+                )
@@ -1,3 +1,6 @@
+from datetime import datetime
+
+from sqlalchemy import or_, update
 from sqlalchemy.future import select
 
 from models import CompanyModel
@@ -146,3 +149,102 @@ class CompanyRepository:
                 return company
             else:
                 return None
+
+    async def get_by_canonical_url(self, canonical_url: str):
+        """
+        Asynchronously retrieves a company by its canonical URL from the database.
+
+        Parameters:
+        - canonical_url (str): The canonical URL of the company.
+
+        Returns:
+        - dict: A dictionary representing the company's data.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model).where(self.model.canonical_url == canonical_url)
+            )
+            company = result.scalars().first()
+            if company:
+                return company
+            else:
+                return None
+
+    async def get_by_assistant_id(self, assistant_id: str):
+        """
+        Asynchronously retrieves a company by the ID of its assistant from the database.
+
+        Parameters:
+        - assistant_id (str): The unique identifier of the company's assistant.
+
+        Returns:
+        - dict: A dictionary representing the company's data.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model).where(self.model.assistant_id == assistant_id)
+            )
+            company = result.scalars().first()
+            if company:
+                return company
+            else:
+                return None
+
+    async def get_due_for_refresh(self, now: datetime, after_id: int, limit: int):
+        """
+        Asynchronously retrieves a page of companies whose data is due to be refreshed or has never been scheduled.
+
+        Parameters:
+        - now (datetime): The current moment.
+        - after_id (int): The ID after which the page starts.
+        - limit (int): The maximum number of companies in the page.
+
+        Returns:
+        - list: A list of companies, ordered by ID.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model)
+                .where(
+                    self.model.id > after_id,
+                    or_(
+                        self.model.next_refresh_at.is_(None),
+                        self.model.next_refresh_at <= now,
+                    ),
+                )
+                .order_by(self.model.id)
+                .limit(limit)
+            )
+            return [company for company in result.scalars().all()]
+
+    async def claim_refresh(
+        self, company_id: int, expected_at: datetime, next_refresh_at: datetime
+    ):
+        """
+        Asynchronously moves the next refresh of a company, unless another instance has already moved it.
+
+        Parameters:
+        - company_id (int): The unique identifier for the company.
+        - expected_at (datetime): The next refresh moment read with the company, or None.
+        - next_refresh_at (datetime): The new next refresh moment.
+
+        Returns:
+        - bool: True if the refresh was claimed, False otherwise.
+        """
+
+        condition = (
+            self.model.next_refresh_at.is_(None)
+            if expected_at is None
+            else self.model.next_refresh_at == expected_at
+        )
+        async with async_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    update(self.model)
+                    .where(self.model.id == company_id, condition)
+                    .values(next_refresh_at=next_refresh_at)
+                )
+        return result.rowcount == 1
@@ -0,0 +1,65 @@
+from typing import Any, Dict, List
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from models import FsmStateModel
+from utils.repository import async_session
+
+
+class FsmStateRepository:
+    """
+    FsmStateRepository is a class responsible for handling operations related to the FsmStateModel.
+    It provides methods for saving and retrieving conversation states from the database.
+    """
+
+    model = FsmStateModel
+
+    async def get_by_key(self, key: str):
+        """
+        Asynchronously retrieves a conversation state by its storage key from the database.
+
+        Parameters:
+        - key (str): The storage key of the conversation.
+
+        Returns:
+        - FsmStateModel: The conversation state, or None if there is none.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model).where(self.model.key == key)
+            )
+            state = result.scalars().first()
+            if state:
+                return state
+            else:
+                return None
+
+    async def upsert_many(self, states_info: List[Dict[str, Any]]):
+        """
+        Asynchronously inserts or overwrites several conversation states in a single statement.
+
+        Parameters:
+        - states_info (List[Dict[str, Any]]): Dictionaries containing the key, state, data and updated_at of each conversation.
+
+        Returns:
+        - None
+        """
+
+        if len(states_info) == 0:
+            return
+
+        statement = insert(self.model).values(states_info)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.model.key],
+            set_={
+                "state": statement.excluded.state,
+                "data": statement.excluded.data,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+
+        async with async_session() as session:
+            async with session.begin():
+                await session.execute(statement)
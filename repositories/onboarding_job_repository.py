@@ -0,0 +1,160 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+
+from models import OnboardingJobModel
+from utils.repository import async_session
+
+
+class OnboardingJobRepository:
+    """
+    OnboardingJobRepository is a class responsible for handling operations related to the OnboardingJobModel.
+    It provides methods for saving, updating and retrieving onboarding jobs from the database.
+    """
+
+    model = OnboardingJobModel
+
+    async def insert(self, job_info):
+        """
+        Asynchronously inserts a new onboarding job into the database.
+
+        Parameters:
+        - job_info: A dictionary containing the job details.
+
+        Returns:
+        - OnboardingJobModel: The inserted job.
+        """
+
+        async with async_session() as session:
+            async with session.begin():
+                job = self.model(**job_info)
+                session.add(job)
+                await session.commit()
+
+        return job
+
+    async def update_by_info(self, job_id: int, job_info):
+        """
+        Asynchronously updates an onboarding job in the database.
+
+        Parameters:
+        - job_id (int): The unique identifier for the job to be updated.
+        - job_info: A dictionary containing the new job details.
+
+        Returns:
+        - None
+        """
+
+        async with async_session() as session:
+            async with session.begin():
+                job = await session.execute(
+                    select(self.model).where(self.model.id == job_id)
+                )
+                job = job.scalars().first()
+                if job:
+                    for attr, value in job_info.items():
+                        setattr(job, attr, value)
+                    await session.commit()
+                else:
+                    return None
+
+    def _claimable(self, now: datetime):
+        """
+        Builds the condition matching the jobs that may be claimed: pending jobs,
+        and running jobs whose worker has not renewed its lease in time.
+
+        Parameters:
+        - now (datetime): The current moment.
+
+        Returns:
+        - The SQL condition.
+        """
+
+        return or_(
+            self.model.status == "pending",
+            and_(
+                self.model.status == "running",
+                or_(
+                    self.model.lease_expires_at.is_(None),
+                    self.model.lease_expires_at < now,
+                ),
+            ),
+        )
+
+    async def get_claimable(self, now: datetime):
+        """
+        Asynchronously retrieves the jobs that are pending or whose worker has stopped renewing its lease.
+
+        Parameters:
+        - now (datetime): The current moment.
+
+        Returns:
+        - list: A list of claimable jobs, oldest first.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model)
+                .where(self._claimable(now))
+                .order_by(self.model.id)
+            )
+            return [job for job in result.scalars().all()]
+
+    async def claim(
+        self, job_id: int, worker_id: str, now: datetime, lease_expires_at: datetime
+    ):
+        """
+        Asynchronously marks a job as running for a worker, unless another worker holds a valid lease on it.
+
+        Parameters:
+        - job_id (int): The unique identifier for the job.
+        - worker_id (str): The ID of the worker claiming the job.
+        - now (datetime): The current moment.
+        - lease_expires_at (datetime): The moment the lease expires, unless it is renewed.
+
+        Returns:
+        - bool: True if the job was claimed, False otherwise.
+        """
+
+        async with async_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    update(self.model)
+                    .where(self.model.id == job_id, self._claimable(now))
+                    .values(
+                        status="running",
+                        worker_id=worker_id,
+                        lease_expires_at=lease_expires_at,
+                    )
+                )
+        return result.rowcount == 1
+
+    async def renew_lease(
+        self, job_id: int, worker_id: str, lease_expires_at: Optional[datetime]
+    ):
+        """
+        Asynchronously extends, or releases with None, the lease of a worker on a running job.
+
+        Parameters:
+        - job_id (int): The unique identifier for the job.
+        - worker_id (str): The ID of the worker holding the lease.
+        - lease_expires_at (Optional[datetime]): The new expiry of the lease, or None to release it.
+
+        Returns:
+        - bool: True if the worker still held the lease, False otherwise.
+        """
+
+        async with async_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    update(self.model)
+                    .where(
+                        self.model.id == job_id,
+                        self.model.status == "running",
+                        self.model.worker_id == worker_id,
+                    )
+                    .values(lease_expires_at=lease_expires_at)
+                )
+        return result.rowcount == 1
@@ -0,0 +1,59 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from models import SummaryCacheModel
+from utils.repository import async_session
+
+
+class SummaryCacheRepository:
+    """
+    SummaryCacheRepository is a class responsible for handling operations related to the SummaryCacheModel.
+    It provides methods for saving and retrieving cached summaries from the database.
+    """
+
+    model = SummaryCacheModel
+
+    async def insert(self, summary_info):
+        """
+        Asynchronously inserts a new cached summary into the database.
+
+        A summary that is already cached under the same hash is left untouched.
+
+        Parameters:
+        - summary_info: A dictionary containing the summary details.
+
+        Returns:
+        - SummaryCacheModel: The inserted summary, or None if it was already cached.
+        """
+
+        try:
+            async with async_session() as session:
+                async with session.begin():
+                    summary = self.model(**summary_info)
+                    session.add(summary)
+                    await session.commit()
+        except IntegrityError:
+            return None
+
+        return summary
+
+    async def get_by_content_hash(self, content_hash: str):
+        """
+        Asynchronously retrieves a cached summary by its content hash from the database.
+
+        Parameters:
+        - content_hash (str): The hash of the summarized content.
+
+        Returns:
+        - SummaryCacheModel: The cached summary, or None if there is none.
+        """
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(self.model).where(self.model.content_hash == content_hash)
+            )
+            summary = result.scalars().first()
+            if summary:
+                return summary
+            else:
+                return None
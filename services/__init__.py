@@ -1,3 +1,8 @@
 from .assistant_service import AssistantService
+from .semantic_cache_service import SemanticCacheService
 from .stt_service import SttService
+from .tts_cache_service import TtsCacheService
 from .tts_service import TtsService
+from .onboarding_service import OnboardingService
+from .refresh_scheduler import RefreshScheduler
+from .url_service import UrlService
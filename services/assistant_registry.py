@@ -0,0 +1,119 @@
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from assistant import Assistant
+
+
+class AssistantRegistry:
+    """
+    AssistantRegistry keeps the most recently used assistants in memory, bounded in size and in idle time.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        on_evict: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        """
+        Initializes an empty registry.
+
+        Parameters:
+        - max_size (int): The maximum number of assistants kept in memory.
+        - ttl (float): The number of seconds an unused assistant is kept in memory.
+        - on_evict (Optional[Callable[[str], None]], optional): Function called with the ID of every evicted assistant,
+          to release what is kept in memory along with it. Defaults to None.
+
+        Returns:
+        None
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[Assistant, float]]" = OrderedDict()
+        self._counters: Counter = Counter()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of assistants in memory.
+
+        Returns:
+        int: The number of assistants in memory.
+        """
+
+        return len(self._entries)
+
+    def get(self, assistant_id: str) -> Optional[Assistant]:
+        """
+        Retrieves an assistant by its ID, marking it as recently used.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant.
+
+        Returns:
+        Optional[Assistant]: The assistant, or None if it is not in memory or has expired.
+        """
+
+        entry = self._entries.get(assistant_id)
+        now = time.monotonic()
+        if entry is None or now - entry[1] > self.ttl:
+            if entry is not None:
+                del self._entries[assistant_id]
+                self._evicted(assistant_id)
+            self._counters["misses"] += 1
+            return None
+
+        self._entries[assistant_id] = (entry[0], now)
+        self._entries.move_to_end(assistant_id)
+        self._counters["hits"] += 1
+        return entry[0]
+
+    def put(self, assistant_id: str, assistant: Assistant) -> None:
+        """
+        Stores an assistant, evicting the least recently used ones beyond the size bound.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant.
+        - assistant (Assistant): The assistant to store.
+
+        Returns:
+        None
+        """
+
+        self._entries[assistant_id] = (assistant, time.monotonic())
+        self._entries.move_to_end(assistant_id)
+        while len(self._entries) > self.max_size:
+            evicted_id, _ = self._entries.popitem(last=False)
+            self._evicted(evicted_id)
+
+    def _evicted(self, assistant_id: str) -> None:
+        """
+        Counts an evicted assistant and notifies the eviction callback.
+
+        Parameters:
+        - assistant_id (str): The ID of the evicted assistant.
+
+        Returns:
+        None
+        """
+
+        self._counters["evictions"] += 1
+        if self.on_evict is not None:
+            self.on_evict(assistant_id)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns a snapshot of the registry counters.
+
+        Returns:
+        Dict[str, int]: The hits, misses and evictions counters and the current size.
+        """
+
+        return {
+            "hits": self._counters["hits"],
+            "misses": self._counters["misses"],
+            "evictions": self._counters["evictions"],
+            "size": len(self._entries),
+        }
@@ -1,14 +1,26 @@
+import asyncio
+import hashlib
 import os
-import time
-from typing import Optional
+import random
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
+import numpy as np
+from loguru import logger
 from openai import AsyncOpenAI
 
 from assistant import Assistant
-from repositories import CompanyRepository
+from models import CompanyModel
+from repositories import CompanyPageRepository, CompanyRepository
 from utils.functions import generate_uuid
+from utils.resilience import deadline
+from utils.singleflight import SingleFlight
 
+from .assistant_registry import AssistantRegistry
 from .search_service import SearchService
+from .semantic_cache_service import SemanticCacheService
+from .url_service import UrlService
 
 
 class AssistantService:
@@ -17,10 +29,27 @@ class AssistantService:
     facilitating their creation, retrieval, and interaction.
     """
 
-    # A dictionary mapping assistant IDs to Assistant objects.
-    _assistants = {}
+    # A dictionary containing configuration options for the service, such as retry delays and deadlines.
+    _config = {
+        "crawl_retry_delay": 90,
+        "request_deadline": 180,
+        "registry_max_size": 256,
+        "registry_ttl": 6 * 60 * 60,
+    }
+
+    # A bounded registry mapping assistant IDs to Assistant objects.
+    # The semantic cache of an assistant is dropped along with it.
+    _assistants = AssistantRegistry(
+        max_size=_config["registry_max_size"],
+        ttl=_config["registry_ttl"],
+        on_evict=SemanticCacheService.invalidate,
+    )
     # An OpenAI client for making requests to the speech service.
     _async_client = None
+    # A registry of in-flight assistant creations, keyed by company URL or ID.
+    _creations = SingleFlight()
+    # A registry of in-flight assistant rehydrations, keyed by assistant ID.
+    _rehydrations = SingleFlight()
 
     @classmethod
     def initialize(cls, async_client: AsyncOpenAI) -> None:
@@ -38,7 +67,52 @@ class AssistantService:
 
     @classmethod
     async def get_assistant(
-        cls, company_name: str, company_url: str, company_id: Optional[int] = None
+        cls,
+        company_name: str,
+        company_url: str,
+        company_id: Optional[int] = None,
+        on_stage: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> Assistant:
+        """
+        Retrieves or creates an assistant associated with a company based on the company's name or URL.
+
+        The company URL is resolved and canonicalized first, so every spelling of a website maps to the same company.
+        Concurrent calls for the same company (by canonical URL or ID) share a single creation pipeline,
+        whose stages are reported to the first caller only.
+
+        Parameters:
+        - company_name (str): The name of the company.
+        - company_url (str): The URL of the company.
+        - company_id (Optional[int], optional): The ID of the company. Defaults to None.
+        - on_stage (Optional[Callable], optional): Coroutine called with the name of each pipeline stage
+          ("crawling", "summarizing", "creating") as it starts. Defaults to None.
+
+        Returns:
+        Assistant: An instance of Assistant associated with the company.
+
+        Raises:
+        - Exception: If insufficient information is provided to generate an assistant.
+        """
+
+        key = f"id:{company_id}"
+        if company_url is not None:
+            # Unreachable websites keep their normalized URL, the crawl reports the error
+            company_url = await UrlService.resolve(company_url) or UrlService.normalize(
+                company_url
+            )
+            key = f"url:{UrlService.canonical_url(company_url)}"
+        return await cls._creations.do(
+            key,
+            lambda: cls._get_assistant(company_name, company_url, company_id, on_stage),
+        )
+
+    @classmethod
+    async def _get_assistant(
+        cls,
+        company_name: str,
+        company_url: str,
+        company_id: Optional[int] = None,
+        on_stage: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> Assistant:
         """
         Retrieves or creates an assistant associated with a company based on the company's name or URL.
@@ -49,6 +123,8 @@ class AssistantService:
         - company_name (str): The name of the company.
         - company_url (str): The URL of the company.
         - company_id (Optional[int], optional): The ID of the company. Defaults to None.
+        - on_stage (Optional[Callable], optional): Coroutine called with the name of each pipeline stage
+          ("crawling", "summarizing", "creating") as it starts. Defaults to None.
 
         Returns:
         Assistant: An instance of Assistant associated with the company.
@@ -71,32 +147,47 @@ class AssistantService:
             if company_data is None:
                 raise Exception("No assistant with such id.")
         else:
-            company_data = await company_repository.get_by_company_url(
-                company_url=company_url
+            canonical_url = UrlService.canonical_url(company_url)
+            company_data = await company_repository.get_by_canonical_url(
+                canonical_url=canonical_url
             )
 
             if company_data is None:
                 company_data = await company_repository.insert(
-                    {"company_name": company_name, "company_url": company_url}
+                    {
+                        "company_name": company_name,
+                        "company_url": company_url,
+                        "canonical_url": canonical_url,
+                    }
                 )
-        if (
-            company_data.assistant_id is not None
-            and company_data.assistant_id in cls._assistants
-        ):
-            return cls._assistants[company_data.assistant_id]
+        if company_data.assistant_id is not None:
+            assistant = await cls._load(company_data.assistant_id, company_data)
+            if assistant is not None:
+                return assistant
+
+        async def _report(stage: str) -> None:
+            if on_stage is not None:
+                await on_stage(stage)
 
         raw_data = None
         if company_data.web_site_raw_data is None:
+            await _report("crawling")
             company_data.web_site_summary_data = None
-            raw_data, _ = await SearchService.get_content_from_urls([company_url])
-
-            if raw_data is None or len(raw_data) == 0:
-                time.sleep(90)
-                raw_data, _ = await SearchService.get_content_from_urls([company_url])
-                if raw_data is None or len(raw_data) == 0:
-                    raise Exception(
-                        f"Error occured while getting info from company ({company_name})."
-                    )
+
+            # A failed crawl is retried once after a jittered pause, without blocking the event loop.
+            # Failures of a company website are not counted by a circuit breaker shared with other companies.
+            pages = await SearchService.crawl_pages(company_data.company_url)
+            if len(pages) == 0:
+                await asyncio.sleep(
+                    random.uniform(0.5, 1.0) * cls._config["crawl_retry_delay"]
+                )
+                pages = await SearchService.crawl_pages(company_data.company_url)
+            if len(pages) == 0:
+                raise Exception(
+                    f"Error occured while getting info from company ({company_name})."
+                )
+            await cls._save_pages(company_data.id, pages)
+            raw_data = ["\n".join([page["text"] for page in pages])]
             company_data.web_site_raw_data = raw_data[0]
 
             await company_repository.update_by_info(
@@ -108,6 +199,7 @@ class AssistantService:
 
         summary_text = None
         if company_data.web_site_summary_data is None:
+            await _report("summarizing")
             summary_text = company_data.web_site_summary_data = (
                 await SearchService.summarize_content(
                     company_url, source_texts=raw_data
@@ -124,30 +216,253 @@ class AssistantService:
         else:
             summary_text = company_data.web_site_summary_data
 
-        try:
-            file_path = f"./temp_files/{generate_uuid()}.txt"
-            with open(file_path, "w+") as file:
-                file.write(summary_text)
-
+        await _report("creating")
+        with cls._data_files(company_data) as file_paths:
             assistant = Assistant()
             await assistant.initialize(
                 async_client=cls._async_client,
                 company_name=company_data.company_name,
                 company_url=company_data.company_url,
-                data_file_paths=[file_path],
+                data_file_paths=file_paths,
             )
-            cls._assistants[await assistant.get_id()] = assistant
+            cls._assistants.put(await assistant.get_id(), assistant)
             company_data.assistant_id = await assistant.get_id()
 
             await company_repository.update_by_info(
                 company_data.id,
                 company_data.to_dict(),
             )
-        finally:
-            os.remove(file_path)
 
         return assistant
 
+    @staticmethod
+    @contextmanager
+    def _data_files(company_data: CompanyModel) -> Iterator[List[str]]:
+        """
+        Writes the company data an assistant answers from to temporary files, removed when the block exits.
+
+        Parameters:
+        - company_data (CompanyModel): The company record.
+
+        Returns:
+        Iterator[List[str]]: A context manager yielding the paths of the files.
+        """
+
+        # The local vector store indexes the raw website data along with its summary
+        data_texts = [str(company_data.web_site_summary_data)]
+        if Assistant.vector_store_backend() == "local":
+            data_texts.append(str(company_data.web_site_raw_data))
+
+        file_paths = []
+        try:
+            for text in data_texts:
+                file_path = f"./temp_files/{generate_uuid()}.txt"
+                with open(file_path, "w+") as file:
+                    file_paths.append(file_path)
+                    file.write(text)
+            yield file_paths
+        finally:
+            for file_path in file_paths:
+                os.remove(file_path)
+
+    @staticmethod
+    def _hash_text(text: str) -> str:
+        """
+        Computes the content hash of a page.
+
+        Parameters:
+        - text (str): The cleaned text of the page.
+
+        Returns:
+        str: The hex digest of the text.
+        """
+
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    async def _save_pages(cls, company_id: int, pages: List[Dict[str, str]]) -> None:
+        """
+        Stores crawled pages of a company with their content hashes.
+
+        Parameters:
+        - company_id (int): The ID of the company.
+        - pages (List[Dict[str, str]]): The pages, as returned by SearchService.crawl_pages.
+
+        Returns:
+        None
+        """
+
+        now = datetime.utcnow()
+        await CompanyPageRepository().upsert_many(
+            [
+                {
+                    "company_id": company_id,
+                    "url": page["url"],
+                    "content_hash": cls._hash_text(page["text"]),
+                    "fetched_at": now,
+                    "cleaned_text": page["text"],
+                }
+                for page in pages
+            ]
+        )
+
+    @classmethod
+    async def refresh(cls, company_id: int) -> bool:
+        """
+        Recrawls a company's website and brings its assistant up to date, re-summarizing only the pages
+        that are new or have changed since the last crawl and merging them into the existing summary.
+
+        Parameters:
+        - company_id (int): The ID of the company.
+
+        Returns:
+        bool: True if the company data changed, False otherwise.
+        """
+
+        company_repository = CompanyRepository()
+        page_repository = CompanyPageRepository()
+
+        company_data = await company_repository.get_by_id(company_id)
+        if company_data is None:
+            raise Exception("No company with such id.")
+
+        pages = await SearchService.crawl_pages(company_data.company_url)
+        if len(pages) == 0:
+            raise Exception(
+                f"Error occured while getting info from company ({company_data.company_name})."
+            )
+
+        # Comparing the crawled pages with the stored ones by their content hashes
+        stored_hashes = {
+            page.url: page.content_hash
+            for page in await page_repository.get_by_company_id(company_id)
+        }
+        changed_pages = [
+            page
+            for page in pages
+            if stored_hashes.get(page["url"]) != cls._hash_text(page["text"])
+        ]
+        crawled_urls = {page["url"] for page in pages}
+        removed_urls = [url for url in stored_hashes if url not in crawled_urls]
+
+        if len(changed_pages) == 0 and len(removed_urls) == 0:
+            logger.info(f"Company {company_id} has not changed since the last crawl.")
+            return False
+
+        logger.info(
+            f"Company {company_id}: {len(changed_pages)} of {len(pages)} pages changed, "
+            f"{len(removed_urls)} removed."
+        )
+
+        raw_data = "\n".join([page["text"] for page in pages])
+        if len(stored_hashes) == 0 or company_data.web_site_summary_data is None:
+            summary_text = await SearchService.summarize_content(
+                company_data.company_url, source_texts=[raw_data]
+            )
+        elif len(changed_pages) > 0:
+            summary_text = await SearchService.merge_summary(
+                company_data.company_url,
+                company_data.web_site_summary_data,
+                ["\n".join([page["text"] for page in changed_pages])],
+            )
+        else:
+            # Only removed pages, whose information cannot be told apart in the summary
+            summary_text = company_data.web_site_summary_data
+
+        if summary_text is None or len(summary_text) == 0:
+            raise Exception(
+                f"Error occured while summarizing data from company ({company_data.company_name})."
+            )
+
+        await cls._save_pages(company_id, changed_pages)
+        await page_repository.delete_by_urls(company_id, removed_urls)
+
+        company_data.web_site_raw_data = raw_data
+        company_data.web_site_summary_data = summary_text
+        await company_repository.update_by_info(
+            company_id,
+            {"web_site_raw_data": raw_data, "web_site_summary_data": summary_text},
+        )
+
+        # Replacing the data of the assistant and forgetting the answers given from the old data
+        if company_data.assistant_id is not None:
+            assistant = await cls._load(company_data.assistant_id, company_data)
+            if assistant is not None:
+                with cls._data_files(company_data) as file_paths:
+                    await assistant.update_data(file_paths)
+            SemanticCacheService.invalidate(company_data.assistant_id)
+
+        return True
+
+    @classmethod
+    async def _load(
+        cls, assistant_id: str, company_data: Optional[CompanyModel] = None
+    ) -> Optional[Assistant]:
+        """
+        Returns the assistant with the given ID from memory, or rehydrates it from its company record.
+
+        Rehydration retrieves the existing OpenAI assistant instead of creating a new one.
+        Concurrent rehydrations of the same assistant are coalesced.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant.
+        - company_data (Optional[CompanyModel], optional): The company record, if it is already loaded. Defaults to None.
+
+        Returns:
+        Optional[Assistant]: The assistant, or None if it cannot be restored.
+        """
+
+        assistant = cls._assistants.get(assistant_id)
+        if assistant is not None:
+            return assistant
+
+        async def _rehydrate() -> Optional[Assistant]:
+            company = company_data
+            if company is None:
+                company = await CompanyRepository().get_by_assistant_id(assistant_id)
+            if company is None:
+                return None
+
+            assistant = Assistant()
+            try:
+                # The local vector store is rebuilt from the company data if this instance does not have it
+                if Assistant.vector_store_backend() == "local":
+                    with cls._data_files(company) as file_paths:
+                        await assistant.restore(
+                            async_client=cls._async_client,
+                            company_name=company.company_name,
+                            company_url=company.company_url,
+                            assistant_id=assistant_id,
+                            data_file_paths=file_paths,
+                        )
+                else:
+                    await assistant.restore(
+                        async_client=cls._async_client,
+                        company_name=company.company_name,
+                        company_url=company.company_url,
+                        assistant_id=assistant_id,
+                    )
+            except Exception as e:
+                logger.error(f"Error while restoring assistant {assistant_id}: {e}")
+                return None
+
+            cls._assistants.put(assistant_id, assistant)
+            logger.info(f"Assistant {assistant_id} restored ({cls.registry_stats()}).")
+            return assistant
+
+        return await cls._rehydrations.do(assistant_id, _rehydrate)
+
+    @classmethod
+    def registry_stats(cls) -> Dict[str, int]:
+        """
+        Returns the counters of the in-memory assistant registry.
+
+        Returns:
+        Dict[str, int]: The hits, misses and evictions counters and the current size.
+        """
+
+        return cls._assistants.stats()
+
     @classmethod
     async def create_thread(cls, user_id: int) -> str:
         """
@@ -163,25 +478,136 @@ class AssistantService:
         thread = await cls._async_client.beta.threads.create()
         return thread
 
+    @classmethod
+    async def _answer_from_cache(
+        cls,
+        assistant: Assistant,
+        thread_id: str,
+        assistant_id: str,
+        prompt: str,
+        cacheable: bool,
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Answers a question from the semantic cache of an assistant, if it may be cached.
+
+        Cached answers are shared by all the users of an assistant, so only questions that cannot depend on
+        the earlier conversation, i.e. the first question of a thread, are answered from the cache or stored in it.
+        A cached answer is appended to the thread along with its question, so that the next questions
+        are answered in its context.
+
+        Parameters:
+        - assistant (Assistant): The assistant the question is asked to.
+        - thread_id (str): The ID of the thread the question is asked in.
+        - assistant_id (str): The ID of the assistant.
+        - prompt (str): The question.
+        - cacheable (bool): Whether the question opens the conversation of its thread.
+
+        Returns:
+        Tuple[Optional[str], Optional[np.ndarray]]: The cached answer, or None, and the embedding of the question,
+        or None if the answer must not be cached.
+        """
+
+        if not cacheable:
+            return None, None
+
+        cached, vector = await SemanticCacheService.get(assistant_id, prompt)
+        if cached is None:
+            return None, vector
+
+        try:
+            await assistant.add_exchange(thread_id, prompt, cached)
+        except Exception as e:
+            # Asking the assistant instead, as a follow-up question would otherwise miss this answer
+            logger.error(f"Error while adding a cached answer to thread {thread_id}: {e}")
+            return None, None
+        return cached, None
+
     @classmethod
     async def request(
-        cls, thread_id: str, prompt: str, assistant_id: int
+        cls, thread_id: str, prompt: str, assistant_id: int, cacheable: bool = False
     ) -> Optional[str]:
         """
         Sends a request to the specified assistant within a given thread and returns the assistant's response.
+        First questions of a thread similar to ones the assistant has already answered are answered
+        from the semantic cache.
 
         Parameters:
         - thread_id (str): The ID of the thread where the request should be sent.
         - prompt (str): The text prompt to send to the assistant.
         - assistant_id (int): The ID of the assistant to whom the request should be sent.
+        - cacheable (bool, optional): Whether the prompt opens the conversation of the thread,
+          so that it may be answered from the semantic cache. Defaults to False.
 
         Returns:
         Optional[str]: The assistant's response to the prompt, or None if the assistant ID is invalid.
         """
 
-        if assistant_id is None or assistant_id not in cls._assistants:
+        if assistant_id is None:
+            return None
+
+        assistant = await cls._load(assistant_id)
+        if assistant is None:
             return None
 
-        assistant = cls._assistants[assistant_id]
-        ans = await assistant.request(thread_id=thread_id, prompt=prompt)
+        # Similar questions asked earlier are answered from the semantic cache
+        cached, vector = await cls._answer_from_cache(
+            assistant, thread_id, assistant_id, prompt, cacheable
+        )
+        if cached is not None:
+            return cached
+
+        with deadline(cls._config["request_deadline"]):
+            ans = await assistant.request(thread_id=thread_id, prompt=prompt)
+
+        if vector is not None:
+            SemanticCacheService.store(assistant_id, vector, ans)
+        return ans
+
+    @classmethod
+    async def request_stream(
+        cls,
+        thread_id: str,
+        prompt: str,
+        assistant_id: int,
+        on_delta: Callable[[str], Awaitable[None]],
+        cacheable: bool = False,
+    ) -> Optional[str]:
+        """
+        Sends a request to the specified assistant within a given thread and streams the assistant's response.
+        First questions of a thread similar to ones the assistant has already answered are answered
+        from the semantic cache at once.
+
+        Parameters:
+        - thread_id (str): The ID of the thread where the request should be sent.
+        - prompt (str): The text prompt to send to the assistant.
+        - assistant_id (int): The ID of the assistant to whom the request should be sent.
+        - on_delta (Callable[[str], Awaitable[None]]): Coroutine called with every new piece of the response text.
+        - cacheable (bool, optional): Whether the prompt opens the conversation of the thread,
+          so that it may be answered from the semantic cache. Defaults to False.
+
+        Returns:
+        Optional[str]: The assistant's complete response to the prompt, or None if the assistant ID is invalid.
+        """
+
+        if assistant_id is None:
+            return None
+
+        assistant = await cls._load(assistant_id)
+        if assistant is None:
+            return None
+
+        # Similar questions asked earlier are answered from the semantic cache
+        cached, vector = await cls._answer_from_cache(
+            assistant, thread_id, assistant_id, prompt, cacheable
+        )
+        if cached is not None:
+            return cached
+
+        with deadline(cls._config["request_deadline"]):
+            ans = await assistant.request_stream(
+                thread_id=thread_id, prompt=prompt, on_delta=on_delta
+            )
+
+        if vector is not None:
+            SemanticCacheService.store(assistant_id, vector, ans)
         return ans
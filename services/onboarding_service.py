@@ -0,0 +1,402 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.utils.deep_linking import create_start_link
+from loguru import logger
+
+from models import OnboardingJobModel
+from repositories import CompanyRepository, OnboardingJobRepository
+from tg.states import ActivatedState
+from utils import Strings
+from utils.resilience import deadline
+
+from .assistant_service import AssistantService
+
+
+class OnboardingService:
+    """
+    OnboardingService creates company assistants in the background: jobs are persisted,
+    processed by a pool of asyncio workers and report their progress by editing a single Telegram message.
+
+    A worker claims a job with a lease that it renews while the job runs, so that several bot instances can
+    share the jobs: a job is only taken over once the instance running it has stopped renewing its lease.
+    """
+
+    # A dictionary containing configuration options for the service, such as the time budget of a job
+    # and the duration of the leases on jobs.
+    _config = {
+        "job_deadline": 3600,
+        "lease_duration": 120,
+        "lease_renew_interval": 30,
+        "recovery_interval": 60,
+    }
+
+    # The ID of this instance, recorded on the jobs it runs.
+    _worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    # A dictionary mapping job stages to the progress messages shown to the user.
+    _stage_messages = {
+        "queued": Strings.ONBOARDING_QUEUED_MSG,
+        "crawling": Strings.ONBOARDING_CRAWLING_MSG,
+        "summarizing": Strings.ONBOARDING_SUMMARIZING_MSG,
+        "creating": Strings.ONBOARDING_CREATING_MSG,
+        "done": Strings.ONBOARDING_DONE_MSG,
+    }
+
+    # The bot used to report progress to users.
+    _bot: Optional[Bot] = None
+    # The FSM storage in which the users' conversation state is kept.
+    _storage: Optional[BaseStorage] = None
+    # The number of jobs processed concurrently.
+    _workers_count = 1
+    # The queue of jobs waiting for a worker.
+    _queue: Optional[asyncio.Queue] = None
+    # The running worker tasks.
+    _workers: List[asyncio.Task] = []
+    # The IDs of the jobs queued or running in this instance.
+    _jobs: Set[int] = set()
+
+    @classmethod
+    def initialize(cls, bot: Bot, storage: BaseStorage, workers: int) -> None:
+        """
+        Initializes the OnboardingService with the bot, the FSM storage and the size of the worker pool.
+
+        Parameters:
+        - bot (Bot): The bot used to report progress to users.
+        - storage (BaseStorage): The FSM storage of the dispatcher.
+        - workers (int): The number of jobs processed concurrently.
+
+        Returns:
+        None
+        """
+
+        cls._bot = bot
+        cls._storage = storage
+        cls._workers_count = workers
+
+    @classmethod
+    async def start(cls) -> None:
+        """
+        Starts the worker pool and the recovery loop, which enqueues the jobs left unfinished
+        by a stopped instance once their lease has expired.
+
+        Returns:
+        None
+        """
+
+        cls._queue = asyncio.Queue()
+        cls._workers = [
+            asyncio.create_task(cls._work()) for _ in range(cls._workers_count)
+        ]
+        cls._workers.append(asyncio.create_task(cls._recover()))
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        Stops the worker pool. The leases on interrupted jobs are released,
+        so the jobs are resumed at once by the next instance looking for them.
+
+        Returns:
+        None
+        """
+
+        for worker in cls._workers:
+            worker.cancel()
+        await asyncio.gather(*cls._workers, return_exceptions=True)
+        cls._workers = []
+
+    @classmethod
+    def _enqueue(cls, job: OnboardingJobModel) -> None:
+        """
+        Enqueues a job for the worker pool, unless this instance already has it.
+
+        Parameters:
+        - job (OnboardingJobModel): The job to enqueue.
+
+        Returns:
+        None
+        """
+
+        if job.id in cls._jobs:
+            return
+        cls._jobs.add(job.id)
+        cls._queue.put_nowait(job)
+
+    @classmethod
+    async def _recover(cls) -> None:
+        """
+        Enqueues the claimable jobs, i.e. pending jobs and jobs whose lease has expired, periodically.
+
+        Returns:
+        None
+        """
+
+        while True:
+            try:
+                jobs = await OnboardingJobRepository().get_claimable(datetime.utcnow())
+                for job in jobs:
+                    if job.id not in cls._jobs:
+                        logger.info(
+                            f"Resuming onboarding job {job.id} ({job.company_url})."
+                        )
+                    cls._enqueue(job)
+            except Exception as e:
+                logger.error(f"Error while recovering onboarding jobs: {e}")
+            await asyncio.sleep(cls._config["recovery_interval"])
+
+    @classmethod
+    async def submit(
+        cls,
+        chat_id: int,
+        user_id: int,
+        message_id: int,
+        company_name: str,
+        company_url: str,
+    ) -> OnboardingJobModel:
+        """
+        Persists a new onboarding job and enqueues it for the worker pool.
+
+        Parameters:
+        - chat_id (int): The ID of the chat the job was requested from.
+        - user_id (int): The ID of the user who requested the job.
+        - message_id (int): The ID of the message the progress is edited into.
+        - company_name (str): The name of the company.
+        - company_url (str): The URL of the company.
+
+        Returns:
+        OnboardingJobModel: The persisted job.
+        """
+
+        job = await OnboardingJobRepository().insert(
+            {
+                "chat_id": chat_id,
+                "user_id": user_id,
+                "message_id": message_id,
+                "company_name": company_name,
+                "company_url": company_url,
+                "status": "pending",
+                "stage": "queued",
+            }
+        )
+        await cls._report(job, "queued")
+        cls._enqueue(job)
+        return job
+
+    @classmethod
+    async def _work(cls) -> None:
+        """
+        Takes jobs from the queue and processes them one at a time, forever.
+
+        Returns:
+        None
+        """
+
+        job_repository = OnboardingJobRepository()
+        while True:
+            job = await cls._queue.get()
+            try:
+                # Skipping the jobs another instance holds a valid lease on
+                claimed = await job_repository.claim(
+                    job.id, cls._worker_id, datetime.utcnow(), cls._lease_expiry()
+                )
+                if claimed:
+                    await cls._run(job)
+            except Exception as e:
+                logger.error(f"Error in onboarding job {job.id}: {e}")
+                # A worker must outlive any error, or the pool would silently shrink
+                try:
+                    await job_repository.update_by_info(
+                        job.id, {"status": "failed", "error": str(e)}
+                    )
+                except Exception as e:
+                    logger.error(f"Error while failing onboarding job {job.id}: {e}")
+            finally:
+                cls._jobs.discard(job.id)
+                cls._queue.task_done()
+
+    @classmethod
+    def _lease_expiry(cls) -> datetime:
+        """
+        Returns the expiry of a lease taken or renewed now.
+
+        Returns:
+        datetime: The expiry of the lease.
+        """
+
+        return datetime.utcnow() + timedelta(seconds=cls._config["lease_duration"])
+
+    @classmethod
+    async def _run(cls, job: OnboardingJobModel) -> None:
+        """
+        Processes a claimed job, renewing the lease on it until it ends.
+        The lease of an interrupted job is released, so that any instance can resume it at once.
+
+        Parameters:
+        - job (OnboardingJobModel): The claimed job.
+
+        Returns:
+        None
+        """
+
+        job_repository = OnboardingJobRepository()
+        process = asyncio.create_task(cls._process(job))
+        lease_lost = False
+
+        async def _heartbeat() -> None:
+            nonlocal lease_lost
+            while True:
+                await asyncio.sleep(cls._config["lease_renew_interval"])
+                try:
+                    renewed = await job_repository.renew_lease(
+                        job.id, cls._worker_id, cls._lease_expiry()
+                    )
+                except Exception as e:
+                    logger.error(
+                        f"Error while renewing lease on onboarding job {job.id}: {e}"
+                    )
+                    continue
+                if not renewed:
+                    # Another instance has taken the job over, so this one must stop working on it
+                    logger.warning(
+                        f"Lease on onboarding job {job.id} was lost, stopping the job."
+                    )
+                    lease_lost = True
+                    process.cancel()
+                    return
+
+        heartbeat = asyncio.create_task(_heartbeat())
+        try:
+            await process
+        except asyncio.CancelledError:
+            if lease_lost:
+                return
+            await job_repository.renew_lease(job.id, cls._worker_id, None)
+            raise
+        finally:
+            heartbeat.cancel()
+
+    @classmethod
+    async def _process(cls, job: OnboardingJobModel) -> None:
+        """
+        Creates the assistant for the job's company, activates it for the user and sends them the assistant link.
+
+        Parameters:
+        - job (OnboardingJobModel): The job to process.
+
+        Returns:
+        None
+        """
+
+        job_repository = OnboardingJobRepository()
+        key = StorageKey(bot_id=cls._bot.id, chat_id=job.chat_id, user_id=job.user_id)
+
+        try:
+            with deadline(cls._config["job_deadline"]):
+                assistant = await AssistantService.get_assistant(
+                    job.company_name,
+                    job.company_url,
+                    on_stage=lambda stage: cls._report(job, stage),
+                )
+
+            assistant_id = await assistant.get_id()
+            thread = await AssistantService.create_thread(job.user_id)
+
+            company_repository = CompanyRepository()
+            company = await company_repository.get_by_assistant_id(assistant_id)
+            company_id = company.id
+
+            link = await create_start_link(cls._bot, f"{company_id}", encode=True)
+            await company_repository.update_by_info(company_id, {"assistant_url": link})
+
+            # Activating the assistant last, so a failed job never leaves the user in the creating state
+            await cls._storage.set_state(key, ActivatedState.activated)
+            await cls._storage.set_data(
+                key, {"thread_id": thread.id, "assistant_id": assistant_id}
+            )
+        except Exception as e:
+            logger.error(f"Error: {e}")
+            await cls._fail(job, key, e)
+            return
+
+        await job_repository.update_by_info(job.id, {"status": "done"})
+        await cls._report(job, "done")
+        await cls._bot.send_message(
+            job.chat_id, f"{Strings.ASSISTANT_CREATED_MSG} {link}"
+        )
+
+    @classmethod
+    async def _fail(cls, job: OnboardingJobModel, key: StorageKey, error: Exception) -> None:
+        """
+        Marks a job as failed, lets the user enter a URL again and tells them the assistant could not be created.
+        Every step is attempted even if an earlier one fails.
+
+        Parameters:
+        - job (OnboardingJobModel): The failed job.
+        - key (StorageKey): The storage key of the user's conversation.
+        - error (Exception): The error the job failed with.
+
+        Returns:
+        None
+        """
+
+        try:
+            await OnboardingJobRepository().update_by_info(
+                job.id, {"status": "failed", "error": str(error)}
+            )
+        except Exception as e:
+            logger.error(f"Error while failing onboarding job {job.id}: {e}")
+
+        try:
+            await cls._storage.set_state(key, ActivatedState.wait_url)
+        except Exception as e:
+            logger.error(f"Error while resetting state of onboarding job {job.id}: {e}")
+
+        await cls._edit(job, Strings.ASSISTANT_IS_DEAD)
+
+    @classmethod
+    async def _report(cls, job: OnboardingJobModel, stage: str) -> None:
+        """
+        Records the job's current stage and shows it in the job's progress message.
+
+        Parameters:
+        - job (OnboardingJobModel): The job in progress.
+        - stage (str): The name of the stage that has started.
+
+        Returns:
+        None
+        """
+
+        if stage != job.stage:
+            job.stage = stage
+            await OnboardingJobRepository().update_by_info(job.id, {"stage": stage})
+        await cls._edit(
+            job, f"{Strings.ASSISTANT_CREATING_MSG}\n\n{cls._stage_messages[stage]}"
+        )
+
+    @classmethod
+    async def _edit(cls, job: OnboardingJobModel, text: str) -> None:
+        """
+        Replaces the text of the job's progress message. Progress edits are cosmetic,
+        so a failed edit, e.g. because of a rate limit or a network error, never fails the job.
+
+        Parameters:
+        - job (OnboardingJobModel): The job whose progress message is edited.
+        - text (str): The new text of the message.
+
+        Returns:
+        None
+        """
+
+        try:
+            await cls._bot.edit_message_text(
+                text=text, chat_id=job.chat_id, message_id=job.message_id
+            )
+        except (TelegramAPIError, asyncio.TimeoutError) as e:
+            logger.error(f"Error while editing onboarding job {job.id} progress: {e}")
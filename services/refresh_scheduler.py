@@ -0,0 +1,333 @@
+import asyncio
+import hashlib
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+from loguru import logger
+
+from config import settings
+from models import CompanyModel
+from repositories import CompanyPageRepository, CompanyRepository
+from utils.crawler import Crawler
+
+from .assistant_service import AssistantService
+
+
+class RefreshScheduler:
+    """
+    RefreshScheduler keeps company data fresh in the background: it walks the companies due for a refresh,
+    re-validates their websites with conditional requests and recrawls only the sites that changed.
+    """
+
+    # A dictionary containing configuration options for the scheduler, such as the refresh interval and the concurrency.
+    _config = {
+        "interval": 7 * 24 * 60 * 60,
+        "jitter": 0.2,
+        "max_age": 30 * 24 * 60 * 60,
+        "page_size": 50,
+        "concurrency": 3,
+        "poll_interval": 10 * 60,
+        "validation_timeout": 30,
+        "max_page_size": 5 * 1024 * 1024,
+        "validation_sample_size": 5,
+    }
+
+    # Counters of scheduled, skipped, refreshed, unchanged and failed companies.
+    _counters: Counter = Counter()
+
+    # The running scheduler task.
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls) -> None:
+        """
+        Starts the scheduler loop.
+
+        Returns:
+        None
+        """
+
+        cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        Stops the scheduler loop. An interrupted refresh is retried when the company is next due.
+
+        Returns:
+        None
+        """
+
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        await asyncio.gather(cls._task, return_exceptions=True)
+        cls._task = None
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Returns a snapshot of the scheduler counters.
+
+        Returns:
+        Dict[str, int]: The scheduled, skipped, refreshed, unchanged and failed counters.
+        """
+
+        return {
+            "scheduled": cls._counters["scheduled"],
+            "skipped": cls._counters["skipped"],
+            "refreshed": cls._counters["refreshed"],
+            "unchanged": cls._counters["unchanged"],
+            "failed": cls._counters["failed"],
+        }
+
+    @classmethod
+    async def _run(cls) -> None:
+        """
+        Walks the companies due for a refresh page by page, forever.
+
+        Returns:
+        None
+        """
+
+        while True:
+            try:
+                await cls._run_once()
+            except Exception as e:
+                logger.error(f"Error in refresh scheduler: {e}")
+            logger.info(f"Refresh scheduler stats: {cls.stats()}")
+            await asyncio.sleep(cls._config["poll_interval"])
+
+    @classmethod
+    async def _run_once(cls) -> None:
+        """
+        Processes every company due for a refresh, with bounded concurrency.
+
+        Returns:
+        None
+        """
+
+        company_repository = CompanyRepository()
+        semaphore = asyncio.Semaphore(cls._config["concurrency"])
+
+        async def _process(
+            session: aiohttp.ClientSession, company: CompanyModel
+        ) -> None:
+            async with semaphore:
+                try:
+                    await cls._process(session, company)
+                except Exception as e:
+                    cls._counters["failed"] += 1
+                    logger.error(f"Error while refreshing company {company.id}: {e}")
+
+        now = datetime.utcnow()
+        after_id = 0
+        async with aiohttp.ClientSession() as session:
+            while True:
+                companies = await company_repository.get_due_for_refresh(
+                    now, after_id, cls._config["page_size"]
+                )
+                if len(companies) == 0:
+                    return
+                await asyncio.gather(
+                    *[_process(session, company) for company in companies]
+                )
+                after_id = companies[-1].id
+
+    @classmethod
+    def _next_refresh_at(cls, company: CompanyModel, now: datetime) -> datetime:
+        """
+        Computes the next refresh moment of a company, jittered so companies do not refresh all at once.
+
+        Parameters:
+        - company (CompanyModel): The company.
+        - now (datetime): The current moment.
+
+        Returns:
+        datetime: The next refresh moment.
+        """
+
+        interval = company.refresh_interval or cls._config["interval"]
+        jitter = cls._config["jitter"]
+        return now + timedelta(seconds=interval * (1 + random.uniform(-jitter, jitter)))
+
+    @classmethod
+    async def _process(
+        cls, session: aiohttp.ClientSession, company: CompanyModel
+    ) -> None:
+        """
+        Refreshes a company if its website has changed since it was last crawled.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session used for the validation requests.
+        - company (CompanyModel): The company due for a refresh.
+
+        Returns:
+        None
+        """
+
+        company_repository = CompanyRepository()
+        now = datetime.utcnow()
+
+        # Moving the next refresh first, so another instance does not process the same company
+        claimed = await company_repository.claim_refresh(
+            company.id, company.next_refresh_at, cls._next_refresh_at(company, now)
+        )
+        if not claimed:
+            return
+
+        # Companies seen for the first time are only scheduled, spreading their first refresh over an interval
+        if company.next_refresh_at is None:
+            cls._counters["scheduled"] += 1
+            return
+
+        # Companies still being onboarded have nothing to refresh yet
+        if company.assistant_id is None or company.web_site_raw_data is None:
+            cls._counters["skipped"] += 1
+            return
+
+        changed, validators, page_hashes = await cls._validate(session, company)
+        max_age = timedelta(seconds=cls._config["max_age"])
+        too_old = company.refreshed_at is None or now - company.refreshed_at > max_age
+        if not changed and not too_old:
+            cls._counters["skipped"] += 1
+            await company_repository.update_by_info(company.id, validators)
+            await CompanyPageRepository().update_validation_hashes(company.id, page_hashes)
+            return
+
+        refreshed = await AssistantService.refresh(company.id)
+        cls._counters["refreshed" if refreshed else "unchanged"] += 1
+        await company_repository.update_by_info(
+            company.id, {**validators, "refreshed_at": now}
+        )
+        await CompanyPageRepository().update_validation_hashes(company.id, page_hashes)
+
+    @classmethod
+    async def _validate(
+        cls, session: aiohttp.ClientSession, company: CompanyModel
+    ) -> Tuple[bool, Dict[str, Optional[str]], Dict[str, str]]:
+        """
+        Checks whether the website of a company has changed. The home page is requested with its ETag and
+        Last-Modified validators and the hash of its text is compared when the server does not answer "Not Modified",
+        then a random sample of the stored pages is fetched and compared the same way, since most sites change
+        deeper pages without touching the home page. Pages seen for the first time are not counted as changed.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session used for the requests.
+        - company (CompanyModel): The company.
+
+        Returns:
+        Tuple[bool, Dict[str, Optional[str]], Dict[str, str]]: Whether the website has changed, the new validators
+        of the home page, and the new validation hashes of the sampled pages by URL.
+        """
+
+        headers = {}
+        if company.etag is not None:
+            headers["If-None-Match"] = company.etag
+        if company.last_modified is not None:
+            headers["If-Modified-Since"] = company.last_modified
+
+        async def _fetch() -> Tuple[
+            int, Dict[str, Optional[str]], Optional[bytes], Optional[str]
+        ]:
+            async with session.get(
+                company.company_url,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=cls._config["validation_timeout"]),
+            ) as response:
+                validators = {
+                    "etag": response.headers.get("ETag", company.etag),
+                    "last_modified": response.headers.get(
+                        "Last-Modified", company.last_modified
+                    ),
+                }
+                if response.status == 304:
+                    return response.status, validators, None, None
+                response.raise_for_status()
+                body = await response.content.read(cls._config["max_page_size"])
+                return response.status, validators, body, response.charset
+
+        # Company websites are not retried here, a failed validation is retried when the company is next due
+        status, validators, body, charset = await _fetch()
+        changed = False
+        if status != 304:
+            home_page_hash = await cls._hash_page(body, charset)
+            validators["home_page_hash"] = home_page_hash
+            changed = (
+                company.home_page_hash is not None
+                and home_page_hash != company.home_page_hash
+            )
+
+        # Re-validating a sample of the stored pages, recording their hashes even when the home page has changed
+        # so that a page changed by the refresh is not counted as changed again next time
+        page_hashes = {}
+        pages = await CompanyPageRepository().get_validation_sample(
+            company.id, cls._config["validation_sample_size"]
+        )
+        results = await asyncio.gather(
+            *[cls._validate_page(session, page.url) for page in pages]
+        )
+        for page, (removed, page_hash) in zip(pages, results):
+            if removed:
+                changed = True
+            elif page_hash is not None:
+                page_hashes[page.url] = page_hash
+                if page.validation_hash is not None and page_hash != page.validation_hash:
+                    changed = True
+        return changed, validators, page_hashes
+
+    @classmethod
+    async def _validate_page(
+        cls, session: aiohttp.ClientSession, url: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Fetches a stored page of a company and hashes its text.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session used for the request.
+        - url (str): The URL of the page.
+
+        Returns:
+        Tuple[bool, Optional[str]]: Whether the page has been removed, and the hash of its text,
+        or None if it could not be fetched.
+        """
+
+        try:
+            async with session.get(
+                url,
+                timeout=aiohttp.ClientTimeout(total=cls._config["validation_timeout"]),
+            ) as response:
+                if response.status in (404, 410):
+                    return True, None
+                response.raise_for_status()
+                body = await response.content.read(cls._config["max_page_size"])
+                charset = response.charset
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # A page that cannot be fetched right now says nothing about whether it changed
+            logger.warning(f"Error while validating page {url}: {e}")
+            return False, None
+
+        return False, await cls._hash_page(body, charset)
+
+    @staticmethod
+    async def _hash_page(body: bytes, charset: Optional[str]) -> str:
+        """
+        Hashes the visible text of a page rather than its markup, whose scripts and styles often carry
+        tokens that change on every request.
+
+        Parameters:
+        - body (bytes): The body of the page.
+        - charset (Optional[str]): The charset of the Content-Type header of the page, if any.
+
+        Returns:
+        str: The hex digest of the visible text of the page.
+        """
+
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(
+            settings.thread_executor, Crawler.extract_text, body, charset
+        )
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -1,16 +1,27 @@
+import asyncio
 import json
-import re
-import time
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
-import requests
+import aiohttp
+import tiktoken
+from cachetools import TTLCache
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_openai import ChatOpenAI
 from langchain_text_splitters import TokenTextSplitter
 from loguru import logger
 
 from config import settings
+from utils.bm25 import bm25_scores
+from utils.crawler import Crawler
+from utils.minhash import find_near_duplicates
+from utils.resilience import Resilience
+from utils.singleflight import SingleFlight
+from utils.text_cleaner import clean_text
+
+from .summary_cache_service import SummaryCacheService
+from .url_service import UrlService
 
 
 class SearchService:
@@ -30,6 +41,14 @@ class SearchService:
             Пожалуйста, выберите {articles_count} лучшие статьи из списка, 
             верните ТОЛЬКО массив URL-адресов, больше ничего не добавляйте. 
         """,
+        "search_api": "https://google.serper.dev/search",
+        "search_cache_size": 512,
+        "search_cache_ttl": 6 * 60 * 60,
+        # The number of results pre-ranked with BM25 that the model chooses from.
+        "search_candidates_count": 8,
+        # How many times the score of the last chosen result must exceed the next one for the model to be skipped.
+        "search_decisive_ratio": 2.0,
+        "search_snippet_length": 200,
         "summarize_prompt_model": "gpt-4o",
         "summarize_prompt_temperature": 0.1,
         "summarize_prompt_template": """
@@ -46,6 +65,24 @@ class SearchService:
         """,
         "summarize_chunk_size": 48000,
         "summarize_chunk_overlap": 500,
+        # Either "refine" (sequential accumulation) or "map_reduce" (parallel chunk summaries merged as a tree).
+        "summarize_mode": "refine",
+        "summarize_map_prompt_template": """
+            Ниже приведена часть информации с сайта {url} про компанию.
+            Твоя задача - очистить текст от лишнего и оставить только самое важное о компании,
+            её продуктах и услугах, контактах и условиях работы.
+            Информация с сайта:
+            {text}
+        """,
+        "summarize_reduce_prompt_template": """
+            Ниже приведены несколько сводок информации с сайта {url} про компанию.
+            Объедини их в одну сводку. Если некоторая информация повторяется в нескольких сводках, 
+            то не добавляй её снова, а обобщи её суть. Ничего важного не упускай.
+            Сводки:
+            {summaries}
+        """,
+        "summarize_map_reduce_concurrency": 4,
+        "summarize_reduce_fan_in": 4,
         "crawler_parameters": {
             "crawlerOptions": {
                 "excludes": ["blog/*"],
@@ -55,8 +92,43 @@ class SearchService:
             },
             "pageOptions": {"onlyMainContent": False},
         },
+        # The estimated Jaccard similarity from which a crawled page is dropped as a near-duplicate, None to keep all pages.
+        "dedup_threshold": 0.85,
+        "dedup_num_perm": 128,
+        "crawler_api": "https://api.firecrawl.dev/v0/",
+        "crawler_poll_backoff_factor": 2,
+        "crawler_poll_max_interval": 10,
+        "crawler_job_timeout": 900,
+        # The crawler used for company websites: "firecrawl" for the FireCrawl API, "native" for the built-in crawler.
+        "crawler_backend": "firecrawl",
+        "native_crawler_options": {
+            "concurrency": 8,
+            "per_host": 2,
+            "delay": 0.5,
+            "timeout": 15,
+            "max_page_size": 2 * 1024 * 1024,
+            "user_agent": "AiCompanyAssistantBot/1.0",
+        },
     }
 
+    # Chains built on first use and reused for every call, keyed by their configuration keys.
+    _chains = {}
+
+    # A token text splitter shared by all summarizations.
+    _text_splitter = None
+
+    # The tokenizer used to report the tokens saved by the near-duplicate filter and the search pre-ranking,
+    # created on first use.
+    _encoding = None
+
+    # A cache mapping normalized search queries to their search results.
+    _search_results = TTLCache(
+        maxsize=_config["search_cache_size"], ttl=_config["search_cache_ttl"]
+    )
+
+    # A registry of in-flight searches, keyed by normalized query.
+    _searches = SingleFlight()
+
     @staticmethod
     async def _clean_text(text: str) -> str:
         """
@@ -69,35 +141,76 @@ class SearchService:
         str: The cleaned text.
         """
 
-        text = re.sub(r"<[^>]+>", "", text)
-        text = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)
-        text = re.sub(r"!\[.*\]\(.*\)", "", text)
-        text = re.sub(r"\!\[.*?\]\(.*?\)", "", text)
-        text = re.sub(r"\[([^\]]+)\]\([^)]*\)", r"\1", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        text = re.sub(r"\[.*?\]\(.*?\)", "", text)
-        text = re.sub(r"<img.*?>", "", text)
-        text = re.sub(r"<a.*?>|</a>", "", text)
-        text = re.sub(r"\*+", "", text)
-        text = re.sub(r"#", "", text)
-        text = re.sub(r"=", "", text)
-        text = re.sub(r"-", "", text)
-        text = re.sub(r"\\", "", text)
-        text = re.sub(
-            r"\b\w+\.(jpg|jpeg|png|gif|bmp|pdf|doc|docx|xls|xlsx|ppt|pptx|webp)\b",
-            "",
-            text,
-            flags=re.IGNORECASE,
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(settings.thread_executor, clean_text, text)
+
+    @classmethod
+    async def _split_text(cls, text: str) -> List[str]:
+        """
+        Splits the text into token chunks for summarization, off the event loop.
+
+        Parameters:
+        - text (str): The text to split.
+
+        Returns:
+        List[str]: The text chunks.
+        """
+
+        loop = asyncio.get_running_loop()
+        if cls._text_splitter is None:
+            cls._text_splitter = await loop.run_in_executor(
+                settings.thread_executor,
+                lambda: TokenTextSplitter(
+                    chunk_size=cls._config["summarize_chunk_size"],
+                    chunk_overlap=cls._config["summarize_chunk_overlap"],
+                ),
+            )
+        return await loop.run_in_executor(
+            settings.thread_executor, cls._text_splitter.split_text, text
         )
-        text = re.sub(r"[\"']", "", text)
-        text = re.sub(r"\s+", " ", text)
-        text = text.strip()
-        return text
+
+    @classmethod
+    def _get_chain(
+        cls, template_key: str, model_key: str, temperature_key: str
+    ) -> Runnable:
+        """
+        Returns the prompt | llm | parser chain for the given configuration keys, building it on first use.
+
+        Every invocation of the chain goes through the "openai.chat" resilience endpoint.
+
+        Parameters:
+        - template_key (str): The configuration key of the prompt template.
+        - model_key (str): The configuration key of the model name.
+        - temperature_key (str): The configuration key of the model temperature.
+
+        Returns:
+        Runnable: The chain producing a string.
+        """
+
+        key = (template_key, model_key, temperature_key)
+        if key not in cls._chains:
+            llm = ChatOpenAI(
+                openai_api_key=settings.OPENAI_KEY,
+                model_name=cls._config[model_key],
+                temperature=cls._config[temperature_key],
+                http_async_client=settings.http_async_client,
+                # Retries are made by utils.resilience, so the model client itself must not multiply them.
+                max_retries=0,
+            )
+            prompt = PromptTemplate.from_template(cls._config[template_key])
+            chain = prompt | llm | StrOutputParser()
+
+            async def _invoke(inputs: Dict[str, Any], chain: Runnable = chain) -> str:
+                return await Resilience.call("openai.chat", chain.ainvoke, inputs)
+
+            # Wrapping the chain keeps retries per input, even inside abatch.
+            cls._chains[key] = RunnableLambda(_invoke)
+        return cls._chains[key]
 
     @staticmethod
     async def _check_if_valid(url: str) -> bool:
         """
-        Checks if a given URL is valid by attempting to access it and verifying the HTTP status code.
+        Checks if a given URL is valid by checking that the website it points to is reachable.
 
         Parameters:
         - url (str): The URL to check.
@@ -106,124 +219,345 @@ class SearchService:
         bool: True if the URL is valid, False otherwise.
         """
 
+        # Probing without downloading the page, and reusing the probes made while canonicalizing the URL
+        valid = await UrlService.resolve(url) is not None
+        logger.info(f"{url}: url is {'valid' if valid else 'not valid'}.")
+        return valid
+
+    @classmethod
+    async def _crawl(
+        cls, session: aiohttp.ClientSession, url: str, timeout: float
+    ) -> List[Dict[str, Any]]:
+        """
+        Starts a FireCrawl job for the given URL and polls its status with exponential backoff until the job ends.
+        With the native crawler backend, crawls the URL directly instead.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session authorized against the FireCrawl API.
+        - url (str): The URL to crawl.
+        - timeout (float): The initial delay between status checks.
+
+        Returns:
+        List[Dict[str, Any]]: The pages returned by the crawl job (empty if the job failed or returned nothing).
+        """
+
+        if cls._config["crawler_backend"] == "native":
+            return await cls._crawl_native(url)
+
+        api = cls._config["crawler_api"]
+
+        async def _request(method: str, api_url: str, **kwargs: Any) -> Dict[str, Any]:
+            async with session.request(method, api_url, **kwargs) as response:
+                response.raise_for_status()
+                return await response.json()
+
+        response_json = await Resilience.call(
+            "firecrawl",
+            _request,
+            "POST",
+            f"{api}crawl",
+            json={"url": url, **cls._config["crawler_parameters"]},
+        )
+        jobId = response_json["jobId"]
+        logger.info(f"Current Job Id: {jobId}")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + cls._config["crawler_job_timeout"]
+        delay = timeout
+
+        while loop.time() < deadline:
+            try:
+                response_json = await Resilience.call(
+                    "firecrawl", _request, "GET", f"{api}crawl/status/{jobId}"
+                )
+            except Exception as e:
+                logger.error(f"Error while checking crawl job with id {jobId}: {e}")
+                break
+
+            status = response_json["status"]
+            if status == "completed":
+                data = response_json["data"]
+                if data is not None and isinstance(data, list) and len(data) > 0:
+                    return data
+                if data is None or len(data) == 0:
+                    logger.error(f"Crawl job ended with empty data")
+                else:
+                    logger.error(f'Crawl job ended with error: {data["error"]}')
+                return []
+            elif status not in ["active", "paused", "pending", "queued"]:
+                logger.error(f"Crawl job failed or was stopped. Status: {status}")
+                break
+
+            # Backing off exponentially so long crawls do not hammer the status endpoint
+            await asyncio.sleep(delay)
+            delay = min(
+                delay * cls._config["crawler_poll_backoff_factor"],
+                cls._config["crawler_poll_max_interval"],
+            )
+        else:
+            logger.error(f"Crawl job with id {jobId} timed out.")
+
         try:
-            response: Optional[requests.Response] = requests.get(url, stream=True)
-            if response.status_code == 200:
-                logger.info(f"{url}: url is valid.")
-                return True
-            else:
-                logger.error(f"{url}: url is notvalid.")
-                return False
-        except requests.exceptions.RequestException as e:
-            logger.error(
-                f"{url}: url is notvalid. Error occurred while accessing the website: {e}."
+            await Resilience.call(
+                "firecrawl", _request, "DELETE", f"{api}crawl/cancel/{jobId}"
             )
-            return False
+        except Exception as e:
+            logger.error(f"Error while cancelling crawl job with id {jobId}: {e}")
+        return []
 
-    @staticmethod
+    @classmethod
+    async def _crawl_native(cls, url: str) -> List[Dict[str, Any]]:
+        """
+        Crawls the given URL with the built-in crawler, using the FireCrawl crawler options.
+
+        Parameters:
+        - url (str): The URL to crawl.
+
+        Returns:
+        List[Dict[str, Any]]: The crawled pages, in the FireCrawl format (empty if the crawl failed).
+        """
+
+        crawler = Crawler(**cls._config["native_crawler_options"])
+        started = asyncio.get_running_loop().time()
+        try:
+            pages = await asyncio.wait_for(
+                crawler.crawl(url, **cls._config["crawler_parameters"]["crawlerOptions"]),
+                timeout=cls._config["crawler_job_timeout"],
+            )
+        except Exception as e:
+            logger.error(f"Error while crawling {url}: {e}")
+            return []
+
+        elapsed = asyncio.get_running_loop().time() - started
+        logger.info(f"Native crawl of {url}: {len(pages)} pages in {elapsed:.1f}s.")
+        return pages
+
+    @classmethod
+    async def _deduplicate_pages(
+        cls, url: str, pages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Drops the crawled pages that are near-duplicates of an earlier page of the same crawl,
+        such as language variants, pagination and tag pages.
+
+        Parameters:
+        - url (str): The crawled URL.
+        - pages (List[Dict[str, Any]]): The crawled pages, in crawl order.
+
+        Returns:
+        List[Dict[str, Any]]: The pages left.
+        """
+
+        threshold = cls._config["dedup_threshold"]
+        if threshold is None or len(pages) < 2:
+            return pages
+
+        def _deduplicate() -> Tuple[List[Dict[str, Any]], int]:
+            texts = [page.get("markdown") or "" for page in pages]
+            duplicates = set(
+                find_near_duplicates(
+                    texts, threshold, num_perm=cls._config["dedup_num_perm"]
+                )
+            )
+            if len(duplicates) == 0:
+                return pages, 0
+
+            removed_tokens = sum(cls._count_tokens(texts[i]) for i in duplicates)
+            kept = [page for i, page in enumerate(pages) if i not in duplicates]
+            return kept, removed_tokens
+
+        loop = asyncio.get_running_loop()
+        kept, removed_tokens = await loop.run_in_executor(
+            settings.thread_executor, _deduplicate
+        )
+        if len(kept) < len(pages):
+            logger.info(
+                f"Crawl of {url}: dropped {len(pages) - len(kept)} near-duplicate pages "
+                f"of {len(pages)}, {removed_tokens} tokens removed."
+            )
+        return kept
+
+    @classmethod
     async def get_content_from_urls(
-        urls: List[str], timeout: float = 0.5, jobs_limit: int = 3
+        cls,
+        urls: List[str],
+        timeout: float = 0.5,
+        jobs_limit: int = 3,
+        on_job_completed: Optional[
+            Callable[[str, List[str]], Awaitable[None]]
+        ] = None,
     ) -> Tuple[List[str], List[List[str]]]:
         """
         Asynchronously fetches content from multiple URLs using FireCrawl API, processes the content, and returns it.
 
+        Crawl jobs run concurrently on the event loop, at most `jobs_limit` at a time. A failed job is logged and skipped.
+
         Parameters:
         - urls (List[str]): A list of URLs to fetch content from.
-        - timeout (float, optional): Timeout value for checking job status. Defaults to 0.5.
+        - timeout (float, optional): Initial delay between job status checks. Defaults to 0.5.
         - jobs_limit (int, optional): Maximum number of concurrent jobs. Defaults to 3.
+        - on_job_completed (Optional[Callable], optional): Coroutine called with the processed text and source URLs
+          of each job as soon as it finishes. Defaults to None.
 
         Returns:
         Tuple[List[str], List[List[str]]]: A tuple containing a list of processed texts and a list of corresponding source URLs.
         """
 
-        async def _check_job(
-            jobId: str,
-            all_data: List[str],
-            all_source_urls: List[List[str]],
-            timeout: float,
-        ) -> bool:
-            api = f"https://api.firecrawl.dev/v0/crawl/status/{jobId}"
-            headers = {"Authorization": f"Bearer {settings.FIRE_CRAWL_KEY}"}
-            response: requests.Response = requests.request("GET", api, headers=headers)
-
-            if response.status_code == 200:
-                response_json = response.json()
-                status = response_json["status"]
-                if status == "completed":
-                    data = []
-                    source_urls = []
-                    if (
-                        response_json["data"] is not None
-                        and isinstance(response_json["data"], list)
-                        and len(response_json["data"]) > 0
-                    ):
-                        for result in response_json["data"]:
-                            source_urls.append(result["metadata"]["sourceURL"])
-                            data.append(result["markdown"])
-                        data = "\n".join(data)
-                        data = await SearchService._clean_text(data)
-                        logger.info(f"Job with id {jobId} data:\n{data}")
-                        logger.info(f"Job with id {jobId} source URLs:\n{source_urls}")
-                        all_data.append(data)
-                        all_source_urls.append(source_urls)
-                    else:
-                        if (
-                            response_json["data"] is None
-                            or len(response_json["data"]) == 0
-                        ):
-                            logger.error(f"Crawl job ended with empty data")
-                        else:
-                            logger.error(
-                                f'Crawl job ended with error: {response_json["data"]["error"]}'
-                            )
-                    return True
-                elif status in ["active", "paused", "pending", "queued"]:
-                    time.sleep(timeout)
-                    return False
-                else:
-                    api = f"https://api.firecrawl.dev/v0/crawl/cancel/{jobId}"
-                    headers = {"Authorization": f"Bearer {settings.FIRE_CRAWL_KEY}"}
-                    response: requests.Response = requests.request(
-                        "DELETE", api, headers=headers
-                    )
-                    logger.error(f"Crawl job failed or was stopped. Status: {status}")
-                    return True
-
         all_data: List[str] = []
         all_source_urls: List[List[str]] = []
 
-        jobs: Set[str] = set()
-        jobs_to_remove: Set[str] = set()
+        semaphore = asyncio.Semaphore(jobs_limit)
 
-        for url in urls:
-            crawl_job_id = settings.firecrawl_app.crawl_url(
-                url,
-                params=SearchService._config["crawler_parameters"],
-                wait_until_done=False,
-            )
+        async def _run_job(session: aiohttp.ClientSession, url: str) -> None:
+            async with semaphore:
+                pages = await cls._crawl(session, url, timeout)
+
+            if len(pages) == 0:
+                return
+
+            pages = await cls._deduplicate_pages(url, pages)
 
-            jobs.add(crawl_job_id["jobId"])
-            logger.info(f"Current Job Id: {crawl_job_id['jobId']}")
+            source_urls = [page["metadata"]["sourceURL"] for page in pages]
+            data = "\n".join([page["markdown"] for page in pages])
+            data = await cls._clean_text(data)
+            logger.info(f"Crawl of {url} data:\n{data}")
+            logger.info(f"Crawl of {url} source URLs:\n{source_urls}")
+            all_data.append(data)
+            all_source_urls.append(source_urls)
 
-            while len(jobs) == jobs_limit:
-                for jobId in jobs:
-                    if await _check_job(jobId, all_data, all_source_urls, timeout):
-                        jobs_to_remove.add(jobId)
-                jobs = jobs.difference(jobs_to_remove)
+            if on_job_completed is not None:
+                await on_job_completed(data, source_urls)
 
-        while len(jobs) > 0:
-            for jobId in jobs:
-                if await _check_job(jobId, all_data, all_source_urls, timeout):
-                    jobs_to_remove.add(jobId)
-            jobs = jobs.difference(jobs_to_remove)
+        headers = {"Authorization": f"Bearer {settings.FIRE_CRAWL_KEY}"}
+        async with aiohttp.ClientSession(headers=headers) as session:
+            results = await asyncio.gather(
+                *[_run_job(session, url) for url in urls], return_exceptions=True
+            )
+
+        # A failed job only loses its own URL, the content of the other jobs is still returned
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error while crawling {url}: {result}")
+            elif isinstance(result, BaseException):
+                raise result
 
         return all_data, all_source_urls
 
+    @classmethod
+    async def crawl_pages(cls, url: str, timeout: float = 0.5) -> List[Dict[str, str]]:
+        """
+        Crawls a website and returns its pages separately, each with its cleaned text.
+
+        Parameters:
+        - url (str): The URL to crawl.
+        - timeout (float, optional): The initial delay between crawl status checks. Defaults to 0.5.
+
+        Returns:
+        List[Dict[str, str]]: The pages, as dictionaries with the "url" and the cleaned "text" of each page.
+        """
+
+        headers = {"Authorization": f"Bearer {settings.FIRE_CRAWL_KEY}"}
+        async with aiohttp.ClientSession(headers=headers) as session:
+            pages = await cls._crawl(session, url, timeout)
+
+        pages = await cls._deduplicate_pages(url, pages)
+        texts = await asyncio.gather(
+            *[cls._clean_text(page.get("markdown") or "") for page in pages]
+        )
+
+        result = {}
+        for page, text in zip(pages, texts):
+            page_url = page["metadata"]["sourceURL"]
+            if len(text.strip()) > 0 and page_url not in result:
+                result[page_url] = {"url": page_url, "text": text}
+        return list(result.values())
+
+    @classmethod
+    async def merge_summary(
+        cls, url: str, summary_text: str, source_texts: List[str]
+    ) -> str:
+        """
+        Summarizes new source texts and merges them into an existing summary.
+
+        Parameters:
+        - url (str): The URL of the content to summarize.
+        - summary_text (str): The existing summary.
+        - source_texts (List[str]): The new source texts.
+
+        Returns:
+        str: The merged summary.
+        """
+
+        new_summary_text = await cls.summarize_content(url, source_texts)
+        if new_summary_text is None or len(new_summary_text) == 0:
+            return summary_text
+
+        chain = cls._get_chain(
+            "summarize_prompt_template",
+            "summarize_prompt_model",
+            "summarize_prompt_temperature",
+        )
+        return await chain.ainvoke(
+            {"summary_text": summary_text, "text": new_summary_text, "url": url}
+        )
+
+    @classmethod
+    def _count_tokens(cls, text: str) -> int:
+        """
+        Counts the tokens of a text with the cl100k_base tokenizer.
+
+        Parameters:
+        - text (str): The text.
+
+        Returns:
+        int: The number of tokens.
+        """
+
+        if cls._encoding is None:
+            cls._encoding = tiktoken.get_encoding("cl100k_base")
+        return len(cls._encoding.encode(text, disallowed_special=()))
+
+    @classmethod
+    async def _search(cls, query: str) -> Dict[str, Any]:
+        """
+        Searches the web with the Serper API. Results are cached by query, and concurrent searches
+        for the same query share one request.
+
+        Parameters:
+        - query (str): The search query.
+
+        Returns:
+        Dict[str, Any]: The search results returned by Serper.
+        """
+
+        key = " ".join(query.lower().split())
+        response_json = cls._search_results.get(key)
+        if response_json is not None:
+            return response_json
+
+        async def _request() -> Dict[str, Any]:
+            headers = {"X-API-KEY": settings.SER_KEY}
+            async with aiohttp.ClientSession(headers=headers) as session:
+                async with session.post(
+                    cls._config["search_api"], json={"q": query}
+                ) as response:
+                    response.raise_for_status()
+                    return await response.json()
+
+        response_json = await cls._searches.do(
+            key, lambda: Resilience.call("serper", _request)
+        )
+        cls._search_results[key] = response_json
+        return response_json
+
     @classmethod
     async def search_articles(cls, query: str, articles_count: int) -> List[str]:
         """
         Searches for articles related to a given query and returns the best article URLs.
 
+        The results are pre-ranked with BM25 over their titles and snippets. The model only chooses among
+        the best candidates, and is not asked at all when the ranking leaves no doubt.
+
         Parameters:
         - query (str): The search query.
         - articles_count (int): The number of top articles to return.
@@ -232,40 +566,124 @@ class SearchService:
         List[str]: A list of URLs to the top articles matching the query.
         """
 
-        async def _find_best_article_urls(
-            response_json: Dict[str, Any], query: str, articles_count: int
-        ) -> List[Dict[str, str]]:
-            llm = ChatOpenAI(
-                openai_api_key=settings.OPENAI_KEY,
-                model_name=cls._config["search_model"],
-                temperature=cls._config["search_temperature"],
+        if articles_count <= 0:
+            return []
+
+        response_json = await cls._search(query)
+        results = [
+            result for result in response_json.get("organic", []) if result.get("link")
+        ]
+        if len(results) <= articles_count:
+            return [result["link"] for result in results]
+
+        # Ranking the results locally, best first
+        documents = [
+            f"{result.get('title', '')} {result.get('snippet', '')}" for result in results
+        ]
+        ranked = sorted(
+            zip(bm25_scores(query, documents), results),
+            key=lambda item: item[0],
+            reverse=True,
+        )
+        full_tokens = cls._count_tokens(json.dumps(response_json, ensure_ascii=False))
+
+        # Skipping the model when the chosen results clearly outscore the others
+        last_chosen = ranked[articles_count - 1][0]
+        first_left = ranked[articles_count][0]
+        decisive_ratio = cls._config["search_decisive_ratio"]
+        if last_chosen > 0 and last_chosen >= decisive_ratio * first_left:
+            logger.info(
+                f"Search for {query!r}: ranking is decisive, "
+                f"{full_tokens} prompt tokens saved."
             )
-
-            prompt = PromptTemplate.from_template(cls._config["search_prompt_template"])
-            chain = prompt | llm | StrOutputParser()
-            urls = chain.invoke(
-                {
-                    "response": response_json,
-                    "query": query,
-                    "articles_count": articles_count,
-                }
+            return [result["link"] for _, result in ranked[:articles_count]]
+
+        # Passing the model a compact list of the best candidates instead of the raw results
+        snippet_length = cls._config["search_snippet_length"]
+        candidates = "\n".join(
+            f"{index}. {result.get('title', '')} — {result['link']}\n"
+            f"{result.get('snippet', '')[:snippet_length]}"
+            for index, (_, result) in enumerate(
+                ranked[: cls._config["search_candidates_count"]], start=1
             )
-            return json.loads(urls)
+        )
+        logger.info(
+            f"Search for {query!r}: "
+            f"{full_tokens - cls._count_tokens(candidates)} prompt tokens saved."
+        )
 
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({"q": query})
-        headers = {"X-API-KEY": settings.SER_KEY, "Content-Type": "application/json"}
-        response = requests.request("POST", url, headers=headers, data=payload)
+        chain = cls._get_chain(
+            "search_prompt_template", "search_model", "search_temperature"
+        )
+        urls = await chain.ainvoke(
+            {
+                "response": candidates,
+                "query": query,
+                "articles_count": articles_count,
+            }
+        )
+        return json.loads(urls)
 
-        urls = await _find_best_article_urls(response, query, articles_count)
+    @classmethod
+    async def _summarize_map_reduce(cls, url: str, chunks: List[str]) -> str:
+        """
+        Summarizes chunks concurrently and merges the partial summaries level by level until one summary remains.
+
+        The number of sequential LLM round-trips grows with the logarithm of the number of chunks.
 
-        return urls
+        Parameters:
+        - url (str): The URL of the summarized content.
+        - chunks (List[str]): The text chunks to summarize.
+
+        Returns:
+        str: The summarized content.
+        """
+
+        map_chain = cls._get_chain(
+            "summarize_map_prompt_template",
+            "summarize_prompt_model",
+            "summarize_prompt_temperature",
+        )
+        reduce_chain = cls._get_chain(
+            "summarize_reduce_prompt_template",
+            "summarize_prompt_model",
+            "summarize_prompt_temperature",
+        )
+        batch_config = {"max_concurrency": cls._config["summarize_map_reduce_concurrency"]}
+
+        summaries = await map_chain.abatch(
+            [{"text": chunk, "url": url} for chunk in chunks], config=batch_config
+        )
+
+        fan_in = cls._config["summarize_reduce_fan_in"]
+        while len(summaries) > 1:
+            groups = [summaries[i : i + fan_in] for i in range(0, len(summaries), fan_in)]
+            # A trailing group of one summary has nothing to merge with and moves up a level as is.
+            reduced = await reduce_chain.abatch(
+                [
+                    {"summaries": "\n\n".join(group), "url": url}
+                    for group in groups
+                    if len(group) > 1
+                ],
+                config=batch_config,
+            )
+            if len(groups[-1]) == 1:
+                reduced.append(groups[-1][0])
+            summaries = reduced
+            logger.info(f"Reduced to {len(summaries)} partial summaries.")
+
+        summary_text = summaries[0] if len(summaries) > 0 else ""
+        logger.info(f"Summary text:\n{summary_text}\n")
+        return summary_text
 
     @classmethod
     async def summarize_content(cls, url: str, source_texts: List[str]) -> str:
         """
         Summarizes content from a given URL along with additional source texts, combining and condensing the information.
 
+        Summaries are cached by the hash of the source texts, the prompt template and the model,
+        so unchanged content is never sent to the LLM twice.
+
         Parameters:
         - url (str): The URL of the content to summarize.
         - source_texts (List[str]): A list of additional source texts to include in the summary.
@@ -277,26 +695,58 @@ class SearchService:
         if source_texts is None:
             return None
 
-        llm = ChatOpenAI(
-            openai_api_key=settings.OPENAI_KEY,
-            model_name=cls._config["summarize_prompt_model"],
-            temperature=cls._config["summarize_prompt_temperature"],
-        )
+        if cls._config["summarize_mode"] == "map_reduce":
+            prompt_template = (
+                cls._config["summarize_map_prompt_template"]
+                + cls._config["summarize_reduce_prompt_template"]
+            )
+        else:
+            prompt_template = cls._config["summarize_prompt_template"]
+        model = cls._config["summarize_prompt_model"]
+
+        cache_key = SummaryCacheService.make_key(source_texts, prompt_template, model)
+        summary_text = await SummaryCacheService.get(cache_key)
+        if summary_text is not None:
+            logger.info(f"Summary of {url} is taken from cache.")
+            return summary_text
+
+        summary_text = await cls._summarize(url, source_texts)
+        if summary_text is not None and len(summary_text) > 0:
+            await SummaryCacheService.set(cache_key, model, summary_text)
+
+        return summary_text
+
+    @classmethod
+    async def _summarize(cls, url: str, source_texts: List[str]) -> str:
+        """
+        Summarizes the source texts with the LLM in the configured summarization mode.
+
+        Parameters:
+        - url (str): The URL of the content to summarize.
+        - source_texts (List[str]): A list of source texts to summarize.
+
+        Returns:
+        str: The summarized content.
+        """
 
-        prompt = PromptTemplate.from_template(cls._config["summarize_prompt_template"])
-        chain = prompt | llm | StrOutputParser()
+        if cls._config["summarize_mode"] == "map_reduce":
+            chunks = []
+            for text in source_texts:
+                chunks.extend(await cls._split_text(text))
+            return await cls._summarize_map_reduce(url, chunks)
 
-        text_splitter = TokenTextSplitter(
-            chunk_size=cls._config["summarize_chunk_size"],
-            chunk_overlap=cls._config["summarize_chunk_overlap"],
+        chain = cls._get_chain(
+            "summarize_prompt_template",
+            "summarize_prompt_model",
+            "summarize_prompt_temperature",
         )
 
         summary_text = ""
 
         for text in source_texts:
-            chunks = text_splitter.split_text(text)
+            chunks = await cls._split_text(text)
             for chunk in chunks:
-                summary_text = chain.invoke(
+                summary_text = await chain.ainvoke(
                     {"summary_text": summary_text, "text": chunk, "url": url}
                 )
                 logger.info(f"Summary text:\n{summary_text}\n")
@@ -0,0 +1,117 @@
+import time
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """
+    SemanticCache keeps the answers of one assistant indexed by the normalized embeddings of their questions,
+    so a question similar enough to an earlier one is answered without running the assistant.
+    """
+
+    def __init__(self, dimension: int, max_size: int, ttl: float) -> None:
+        """
+        Initializes an empty cache.
+
+        Parameters:
+        - dimension (int): The dimension of the question embeddings.
+        - max_size (int): The maximum number of answers kept.
+        - ttl (float): The number of seconds an answer is kept.
+
+        Returns:
+        None
+        """
+
+        self.dimension = dimension
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._index = faiss.IndexFlatIP(dimension)
+        self._vectors: List[np.ndarray] = []
+        self._answers: List[str] = []
+        self._created_at: List[float] = []
+
+    def __len__(self) -> int:
+        """
+        Returns the number of answers in the cache, including the expired ones not yet compacted.
+
+        Returns:
+        int: The number of answers in the cache.
+        """
+
+        return len(self._answers)
+
+    def search(
+        self, vector: np.ndarray, threshold: float, k: int = 4
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Finds the answer of the most similar question that has not expired.
+
+        Parameters:
+        - vector (np.ndarray): The normalized embedding of the question.
+        - threshold (float): The minimum cosine similarity of a match.
+        - k (int, optional): The number of nearest questions considered. Defaults to 4.
+
+        Returns:
+        Optional[Tuple[str, float]]: The answer and its similarity, or None if there is no match.
+        """
+
+        if len(self._answers) == 0:
+            return None
+
+        scores, ids = self._index.search(
+            vector.reshape(1, -1), min(k, len(self._answers))
+        )
+        now = time.monotonic()
+        for score, id in zip(scores[0], ids[0]):
+            if score < threshold:
+                break
+            if id >= 0 and now - self._created_at[id] <= self.ttl:
+                return self._answers[id], float(score)
+        return None
+
+    def add(self, vector: np.ndarray, answer: str) -> None:
+        """
+        Stores the answer of a question, dropping the expired and the oldest answers beyond the size bound.
+
+        Parameters:
+        - vector (np.ndarray): The normalized embedding of the question.
+        - answer (str): The answer to the question.
+
+        Returns:
+        None
+        """
+
+        if len(self._answers) >= self.max_size:
+            self._compact()
+
+        self._index.add(vector.reshape(1, -1))
+        self._vectors.append(vector)
+        self._answers.append(answer)
+        self._created_at.append(time.monotonic())
+
+    def _compact(self) -> None:
+        """
+        Rebuilds the index without the expired answers, keeping at most three quarters of the size bound.
+
+        Returns:
+        None
+        """
+
+        now = time.monotonic()
+        limit = max(1, self.max_size * 3 // 4)
+        keep = [
+            i
+            for i, created_at in enumerate(self._created_at)
+            if now - created_at <= self.ttl
+        ][-limit:]
+
+        self._vectors = [self._vectors[i] for i in keep]
+        self._answers = [self._answers[i] for i in keep]
+        self._created_at = [self._created_at[i] for i in keep]
+
+        self._index = faiss.IndexFlatIP(self.dimension)
+        if len(self._vectors) > 0:
+            self._index.add(np.vstack(self._vectors))
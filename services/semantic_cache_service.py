@@ -0,0 +1,198 @@
+import re
+from collections import Counter
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from loguru import logger
+from openai import AsyncOpenAI
+
+from utils.resilience import Resilience
+
+from .semantic_cache import SemanticCache
+
+
+class SemanticCacheService:
+    """
+    SemanticCacheService answers questions that are semantically close to questions an assistant has already answered,
+    keeping a separate faiss index of question embeddings for every assistant.
+
+    The answers of an assistant are shared by all its users, so only context-free questions are cached:
+    callers only pass the greeting and the first question of a conversation, tracked by a flag in the FSM data,
+    and questions carrying personal details such as e-mail addresses, phone or order numbers are never cached.
+    A cached answer is appended to the thread, so the questions that follow it keep their context.
+    """
+
+    # Matches e-mail addresses and long numbers, such as phone, order or card numbers.
+    _personal_pattern = re.compile(r"\S+@\S+\.\w+|\d[\d\s()+-]{4,}\d")
+
+    # A dictionary containing configuration options for the cache, such as the embedding model and the similarity threshold.
+    _config = {
+        "embedding_model": "text-embedding-3-small",
+        "similarity_threshold": 0.93,
+        "max_size": 1024,
+        "ttl": 24 * 60 * 60,
+        "max_question_length": 1000,
+    }
+
+    # A dictionary mapping assistant IDs to their caches.
+    _caches: Dict[str, SemanticCache] = {}
+
+    # Counters of hits, misses, stored answers and errors.
+    _counters: Counter = Counter()
+
+    # An OpenAI client for making requests to the embeddings service.
+    _async_client = None
+
+    @classmethod
+    def initialize(cls, async_client: AsyncOpenAI) -> None:
+        """
+        Initializes the SemanticCacheService with an instance of AsyncOpenAI.
+
+        Parameters:
+        - async_client (AsyncOpenAI): An instance of AsyncOpenAI to use for making requests to the embeddings service.
+
+        Returns:
+        None
+        """
+
+        cls._async_client = async_client
+
+    @classmethod
+    async def embed(cls, question: str) -> Optional[np.ndarray]:
+        """
+        Computes the normalized embedding of a question.
+
+        Parameters:
+        - question (str): The question.
+
+        Returns:
+        Optional[np.ndarray]: The embedding, or None if the question is not worth caching or carries personal details.
+        """
+
+        question = " ".join(question.split()).lower()
+        if len(question) == 0 or len(question) > cls._config["max_question_length"]:
+            return None
+        if cls._personal_pattern.search(question):
+            return None
+
+        response = await Resilience.call(
+            "openai.embeddings",
+            cls._async_client.embeddings.create,
+            model=cls._config["embedding_model"],
+            input=question,
+        )
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    @classmethod
+    def lookup(cls, assistant_id: str, vector: np.ndarray) -> Optional[str]:
+        """
+        Retrieves the cached answer of a question similar to the given one.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant the question is asked to.
+        - vector (np.ndarray): The embedding of the question.
+
+        Returns:
+        Optional[str]: The cached answer, or None if there is none.
+        """
+
+        cache = cls._caches.get(assistant_id)
+        match = (
+            cache.search(vector, cls._config["similarity_threshold"])
+            if cache is not None
+            else None
+        )
+        if match is None:
+            cls._counters["misses"] += 1
+            return None
+
+        cls._counters["hits"] += 1
+        return match[0]
+
+    @classmethod
+    def store(cls, assistant_id: str, vector: np.ndarray, answer: str) -> None:
+        """
+        Caches the answer of a question.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant that answered the question.
+        - vector (np.ndarray): The embedding of the question.
+        - answer (str): The answer to the question.
+
+        Returns:
+        None
+        """
+
+        cache = cls._caches.get(assistant_id)
+        if cache is None:
+            cache = cls._caches[assistant_id] = SemanticCache(
+                dimension=len(vector),
+                max_size=cls._config["max_size"],
+                ttl=cls._config["ttl"],
+            )
+        cache.add(vector, answer)
+        cls._counters["stores"] += 1
+
+    @classmethod
+    def invalidate(cls, assistant_id: str) -> None:
+        """
+        Drops the cached answers of an assistant, e.g. after its company data has been refreshed.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant.
+
+        Returns:
+        None
+        """
+
+        if cls._caches.pop(assistant_id, None) is not None:
+            cls._counters["invalidations"] += 1
+
+    @classmethod
+    async def get(
+        cls, assistant_id: str, question: str
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Embeds a question and retrieves the cached answer of a similar one. Failures are counted and treated as misses.
+
+        Parameters:
+        - assistant_id (str): The ID of the assistant the question is asked to.
+        - question (str): The question.
+
+        Returns:
+        Tuple[Optional[str], Optional[np.ndarray]]: The cached answer, or None, and the embedding of the question,
+        to be passed to `store` once the question is answered.
+        """
+
+        try:
+            vector = await cls.embed(question)
+        except Exception as e:
+            cls._counters["errors"] += 1
+            logger.error(f"Error while embedding question for the semantic cache: {e}")
+            return None, None
+
+        if vector is None:
+            return None, None
+        return cls.lookup(assistant_id, vector), vector
+
+    @classmethod
+    def stats(cls) -> Dict[str, Union[int, float]]:
+        """
+        Returns a snapshot of the cache counters.
+
+        Returns:
+        Dict[str, Union[int, float]]: The hits, misses, stores, invalidations and errors counters,
+        the hit rate and the number of cached answers.
+        """
+
+        lookups = cls._counters["hits"] + cls._counters["misses"]
+        return {
+            "hits": cls._counters["hits"],
+            "misses": cls._counters["misses"],
+            "stores": cls._counters["stores"],
+            "invalidations": cls._counters["invalidations"],
+            "errors": cls._counters["errors"],
+            "hit_rate": cls._counters["hits"] / lookups if lookups > 0 else 0.0,
+            "size": sum(len(cache) for cache in cls._caches.values()),
+        }
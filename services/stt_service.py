@@ -1,5 +1,12 @@
+import asyncio
+from typing import Optional
+
+from cachetools import LRUCache
 from openai import AsyncOpenAI
 
+from utils.audio import decode_to_pcm, find_split_points, to_wav
+from utils.resilience import Resilience
+
 
 class SttService:
     """
@@ -9,8 +16,18 @@ class SttService:
     # A dictionary containing configuration options for the speech service, such as the model to use.
     _config = {
         "model": "whisper-1",
+        "max_file_size": 20 * 1024 * 1024,
+        "transcripts_cache_size": 1024,
+        "long_audio_min_duration": 90,
+        "sample_rate": 16000,
+        "segment_duration": 45,
+        "segment_search_duration": 10,
+        "segment_concurrency": 4,
     }
 
+    # An in-memory LRU mapping Telegram file unique IDs to the transcripts of the voice messages.
+    _transcripts = LRUCache(maxsize=_config["transcripts_cache_size"])
+
     # An OpenAI client for making requests to the speech service.
     _async_client = None
 
@@ -29,12 +46,50 @@ class SttService:
         cls._async_client = async_client
 
     @classmethod
-    async def speech_to_text(cls, path_to_file: str) -> str:
+    def is_too_large(cls, size: Optional[int]) -> bool:
+        """
+        Checks whether an audio file exceeds the size accepted for transcription.
+
+        Parameters:
+        - size (Optional[int]): The size of the audio file in bytes, if known.
+
+        Returns:
+        - bool: True if the audio file is too large, False otherwise.
+        """
+
+        return size is not None and size > cls._config["max_file_size"]
+
+    @classmethod
+    def get_transcript(cls, cache_key: str) -> Optional[str]:
         """
-        Converts the speech in the given audio file to text.
+        Retrieves the cached transcript of an audio file.
 
         Parameters:
-        - path_to_file (str): The path to the audio file containing the speech to be converted.
+        - cache_key (str): The key identifying the audio file, e.g. its Telegram file unique ID.
+
+        Returns:
+        - Optional[str]: The transcript, or None if the audio file has not been transcribed yet.
+        """
+
+        return cls._transcripts.get(cache_key)
+
+    @classmethod
+    async def speech_to_text(
+        cls,
+        audio: bytes,
+        file_name: str = "voice.ogg",
+        cache_key: Optional[str] = None,
+        duration: Optional[float] = None,
+    ) -> str:
+        """
+        Converts the speech in the given audio to text. Audio longer than the configured duration is split
+        at quiet points and its segments are transcribed concurrently.
+
+        Parameters:
+        - audio (bytes): The content of the audio file containing the speech to be converted.
+        - file_name (str, optional): The name of the audio file, which tells the service its format. Defaults to "voice.ogg".
+        - cache_key (Optional[str], optional): The key under which the transcript is cached. Defaults to None.
+        - duration (Optional[float], optional): The duration of the audio in seconds, if known. Defaults to None.
 
         Returns:
         - str: The transcription of the speech as text.
@@ -48,9 +103,72 @@ class SttService:
                 "async_client must be initialized before calling speech_to_text."
             )
 
-        with open(path_to_file, "rb") as audio_file:
-            transcription = await cls._async_client.audio.transcriptions.create(
-                model=cls._config["model"], file=audio_file, response_format="text"
-            )
+        if cache_key is not None and (text := cls.get_transcript(cache_key)) is not None:
+            return text
+
+        transcription = None
+        if duration is not None and duration >= cls._config["long_audio_min_duration"]:
+            transcription = await cls._transcribe_long(audio)
+        if transcription is None:
+            transcription = await cls._transcribe(audio, file_name)
 
+        if cache_key is not None:
+            cls._transcripts[cache_key] = transcription
         return transcription
+
+    @classmethod
+    async def _transcribe(cls, audio: bytes, file_name: str) -> str:
+        """
+        Transcribes an audio file in a single request.
+
+        Parameters:
+        - audio (bytes): The content of the audio file.
+        - file_name (str): The name of the audio file.
+
+        Returns:
+        - str: The transcription of the speech as text.
+        """
+
+        return await Resilience.call(
+            "openai.audio",
+            cls._async_client.audio.transcriptions.create,
+            model=cls._config["model"],
+            file=(file_name, audio),
+            response_format="text",
+        )
+
+    @classmethod
+    async def _transcribe_long(cls, audio: bytes) -> Optional[str]:
+        """
+        Transcribes long audio by splitting it at quiet points and transcribing the segments concurrently.
+
+        Parameters:
+        - audio (bytes): The content of the audio file.
+
+        Returns:
+        - Optional[str]: The transcription of the speech as text, or None if the audio could not be decoded.
+        """
+
+        sample_rate = cls._config["sample_rate"]
+        samples = await decode_to_pcm(audio, sample_rate)
+        if samples is None:
+            return None
+
+        points = find_split_points(
+            samples,
+            sample_rate,
+            cls._config["segment_duration"],
+            cls._config["segment_search_duration"],
+        )
+        bounds = [0, *points, len(samples)]
+        semaphore = asyncio.Semaphore(cls._config["segment_concurrency"])
+
+        async def _transcribe_segment(index: int) -> str:
+            async with semaphore:
+                segment = to_wav(samples[bounds[index] : bounds[index + 1]], sample_rate)
+                return await cls._transcribe(segment, f"segment_{index}.wav")
+
+        texts = await asyncio.gather(
+            *[_transcribe_segment(index) for index in range(len(bounds) - 1)]
+        )
+        return " ".join(text.strip() for text in texts if text.strip())
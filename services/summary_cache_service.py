@@ -0,0 +1,83 @@
+import hashlib
+from typing import List, Optional
+
+from cachetools import LRUCache
+
+from repositories import SummaryCacheRepository
+
+
+class SummaryCacheService:
+    """
+    SummaryCacheService caches summaries by the hash of the summarized text, the prompt template and the model,
+    keeping recently used summaries in memory in front of the database table.
+    """
+
+    # A dictionary containing configuration options for the cache, such as the in-memory capacity.
+    _config = {
+        "lru_size": 128,
+    }
+
+    # An in-memory LRU mapping content hashes to summaries.
+    _lru = LRUCache(maxsize=_config["lru_size"])
+
+    @staticmethod
+    def make_key(source_texts: List[str], prompt_template: str, model: str) -> str:
+        """
+        Computes the content address of a summary.
+
+        Parameters:
+        - source_texts (List[str]): The cleaned texts to summarize.
+        - prompt_template (str): The prompt template (or templates) used for summarization.
+        - model (str): The name of the summarization model.
+
+        Returns:
+        str: The hex digest identifying the summary.
+        """
+
+        digest = hashlib.sha256()
+        for part in [model, prompt_template, *source_texts]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[str]:
+        """
+        Retrieves a cached summary, looking in memory first and in the database second.
+
+        Parameters:
+        - key (str): The content address of the summary.
+
+        Returns:
+        Optional[str]: The cached summary, or None if there is none.
+        """
+
+        summary = cls._lru.get(key)
+        if summary is not None:
+            return summary
+
+        cached = await SummaryCacheRepository().get_by_content_hash(key)
+        if cached is None:
+            return None
+
+        cls._lru[key] = cached.summary
+        return cached.summary
+
+    @classmethod
+    async def set(cls, key: str, model: str, summary: str) -> None:
+        """
+        Stores a summary in memory and in the database.
+
+        Parameters:
+        - key (str): The content address of the summary.
+        - model (str): The name of the summarization model.
+        - summary (str): The summary to store.
+
+        Returns:
+        None
+        """
+
+        cls._lru[key] = summary
+        await SummaryCacheRepository().insert(
+            {"content_hash": key, "model": model, "summary": summary}
+        )
@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Union
+
+from cachetools import LRUCache
+
+from config import settings
+
+
+class TtsCacheService:
+    """
+    TtsCacheService caches synthesized speech by the hash of the normalized text and the voice options.
+    Recently used audio is kept in memory in front of a size-capped directory on disk, and once a voice message
+    has been sent its Telegram file ID is remembered so repeats are sent without uploading the audio again.
+    """
+
+    # A dictionary containing configuration options for the cache, such as the in-memory capacity and the disk quota.
+    _config = {
+        "lru_size": 64,
+        "file_ids_size": 4096,
+        "directory": "./tts_cache",
+        "max_disk_bytes": 256 * 1024 * 1024,
+    }
+
+    # An in-memory LRU mapping cache keys to audio.
+    _audio = LRUCache(maxsize=_config["lru_size"])
+
+    # An in-memory LRU mapping cache keys to the Telegram file IDs of the sent voice messages.
+    _file_ids = LRUCache(maxsize=_config["file_ids_size"])
+
+    # Counters of hits in each tier and of misses.
+    _counters: Counter = Counter()
+
+    @staticmethod
+    def make_key(text: str, model: str, voice: str, response_format: str) -> str:
+        """
+        Computes the cache key of a speech, ignoring differences in whitespace.
+
+        Parameters:
+        - text (str): The text of the speech.
+        - model (str): The name of the TTS model.
+        - voice (str): The name of the voice.
+        - response_format (str): The audio format.
+
+        Returns:
+        str: The hex digest identifying the speech.
+        """
+
+        digest = hashlib.sha256()
+        for part in [model, voice, response_format, " ".join(text.split())]:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def _path(cls, key: str, extension: str) -> str:
+        """
+        Returns the path of a cache file.
+
+        Parameters:
+        - key (str): The cache key.
+        - extension (str): The extension of the file, "audio" or "file_id".
+
+        Returns:
+        str: The path of the file.
+        """
+
+        return os.path.join(cls._config["directory"], f"{key}.{extension}")
+
+    @staticmethod
+    async def _run(fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Runs a blocking file operation in the shared thread executor.
+
+        Parameters:
+        - fn (Callable): The function to run.
+        - *args: The arguments of the function.
+
+        Returns:
+        Any: The result of the function.
+        """
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(settings.thread_executor, fn, *args)
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        """
+        Reads a cache file, marking it as recently used.
+
+        Parameters:
+        - path (str): The path of the file.
+
+        Returns:
+        Optional[bytes]: The content of the file, or None if it does not exist.
+        """
+
+        try:
+            with open(path, "rb") as file:
+                content = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return content
+
+    @classmethod
+    def _write(cls, path: str, content: bytes) -> None:
+        """
+        Writes a cache file atomically, then evicts the least recently used files beyond the disk quota.
+
+        Parameters:
+        - path (str): The path of the file.
+        - content (bytes): The content of the file.
+
+        Returns:
+        None
+        """
+
+        os.makedirs(cls._config["directory"], exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+        entries = []
+        total = 0
+        with os.scandir(cls._config["directory"]) as it:
+            for entry in it:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= cls._config["max_disk_bytes"]:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @classmethod
+    async def get_file_id(cls, key: str) -> Optional[str]:
+        """
+        Retrieves the Telegram file ID of a sent speech.
+
+        Parameters:
+        - key (str): The cache key of the speech.
+
+        Returns:
+        Optional[str]: The file ID, or None if the speech has not been sent yet.
+        """
+
+        file_id = cls._file_ids.get(key)
+        if file_id is None:
+            content = await cls._run(cls._read, cls._path(key, "file_id"))
+            if content is None:
+                return None
+            file_id = content.decode("utf-8")
+            cls._file_ids[key] = file_id
+
+        cls._counters["file_id_hits"] += 1
+        return file_id
+
+    @classmethod
+    async def set_file_id(cls, key: str, file_id: str) -> None:
+        """
+        Remembers the Telegram file ID of a sent speech.
+
+        Parameters:
+        - key (str): The cache key of the speech.
+        - file_id (str): The file ID of the voice message.
+
+        Returns:
+        None
+        """
+
+        if cls._file_ids.get(key) == file_id:
+            return
+        cls._file_ids[key] = file_id
+        await cls._run(cls._write, cls._path(key, "file_id"), file_id.encode("utf-8"))
+
+    @classmethod
+    async def forget_file_id(cls, key: str) -> None:
+        """
+        Forgets the Telegram file ID of a speech, e.g. after Telegram has rejected it.
+
+        Parameters:
+        - key (str): The cache key of the speech.
+
+        Returns:
+        None
+        """
+
+        cls._file_ids.pop(key, None)
+        try:
+            await cls._run(os.remove, cls._path(key, "file_id"))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    async def get_audio(cls, key: str) -> Optional[bytes]:
+        """
+        Retrieves a cached speech, looking in memory first and on disk second.
+
+        Parameters:
+        - key (str): The cache key of the speech.
+
+        Returns:
+        Optional[bytes]: The audio, or None if it is not cached.
+        """
+
+        audio = cls._audio.get(key)
+        if audio is not None:
+            cls._counters["memory_hits"] += 1
+            return audio
+
+        audio = await cls._run(cls._read, cls._path(key, "audio"))
+        if audio is None:
+            cls._counters["misses"] += 1
+            return None
+
+        cls._counters["disk_hits"] += 1
+        cls._audio[key] = audio
+        return audio
+
+    @classmethod
+    async def set_audio(cls, key: str, audio: bytes) -> None:
+        """
+        Stores a speech in memory and on disk.
+
+        Parameters:
+        - key (str): The cache key of the speech.
+        - audio (bytes): The audio of the speech.
+
+        Returns:
+        None
+        """
+
+        cls._audio[key] = audio
+        await cls._run(cls._write, cls._path(key, "audio"), audio)
+
+    @classmethod
+    def stats(cls) -> Dict[str, Union[int, float]]:
+        """
+        Returns a snapshot of the cache counters.
+
+        Returns:
+        Dict[str, Union[int, float]]: The hits of each tier, the misses and the overall hit rate.
+        """
+
+        hits = (
+            cls._counters["file_id_hits"]
+            + cls._counters["memory_hits"]
+            + cls._counters["disk_hits"]
+        )
+        total = hits + cls._counters["misses"]
+        return {
+            "file_id_hits": cls._counters["file_id_hits"],
+            "memory_hits": cls._counters["memory_hits"],
+            "disk_hits": cls._counters["disk_hits"],
+            "misses": cls._counters["misses"],
+            "hit_rate": hits / total if total > 0 else 0.0,
+        }
@@ -1,7 +1,15 @@
-import uuid
+import asyncio
+import re
+from typing import List
 
 from openai import AsyncOpenAI
 
+from config import settings
+from utils.audio import concat_ogg
+from utils.resilience import Resilience
+
+from .tts_cache_service import TtsCacheService
+
 
 class TtsService:
     """
@@ -12,8 +20,14 @@ class TtsService:
     _config = {
         "model": "tts-1",
         "voice": "nova",
+        "response_format": "opus",
+        "segment_max_chars": 800,
+        "segment_concurrency": 4,
     }
 
+    # Matches the whitespace following the end of a sentence.
+    _sentence_end_pattern = re.compile(r"(?<=[.!?…;])\s+|\n+")
+
     # An OpenAI client for making requests to the speech service.
     _async_client = None
 
@@ -32,15 +46,17 @@ class TtsService:
         cls._async_client = async_client
 
     @classmethod
-    async def text_to_speech(cls, text: str) -> str:
+    async def text_to_speech(cls, text: str) -> bytes:
         """
-        Converts the provided text to speech and saves it as an MP3 file.
+        Converts the provided text to speech in the Ogg/Opus format used by Telegram voice messages,
+        reusing the cached audio of the same text if there is one. The text is split into sentence segments which are synthesized concurrently,
+        so long answers take about as long as their slowest segment.
 
         Parameters:
         - text (str): The text to convert to speech.
 
         Returns:
-        - str: The path to the generated MP3 file.
+        - bytes: The audio of the speech.
 
         Raises:
         - ValueError: If the async_client is not initialized before calling this method.
@@ -51,9 +67,96 @@ class TtsService:
                 "async_client must be initialized before calling speech_to_text."
             )
 
-        path_to_file = str(uuid.uuid4()) + ".mp3"
-        async with cls._async_client.audio.speech.with_streaming_response.create(
-            model=cls._config["model"], voice=cls._config["voice"], input=text
-        ) as model:
-            await model.stream_to_file(path_to_file)
-        return path_to_file
+        key = cls.cache_key(text)
+        audio = await TtsCacheService.get_audio(key)
+        if audio is not None:
+            return audio
+
+        segments = cls._split(text)
+        semaphore = asyncio.Semaphore(cls._config["segment_concurrency"])
+
+        async def _synthesize(segment: str) -> bytes:
+            async with semaphore:
+                response = await Resilience.call(
+                    "openai.audio",
+                    cls._async_client.audio.speech.create,
+                    model=cls._config["model"],
+                    voice=cls._config["voice"],
+                    input=segment,
+                    response_format=cls._config["response_format"],
+                )
+                return response.content
+
+        # Synthesizing the segments concurrently, then remuxing them into a single Ogg stream in memory
+        segments_audio = await asyncio.gather(
+            *[_synthesize(segment) for segment in segments]
+        )
+        if len(segments_audio) == 1:
+            audio = segments_audio[0]
+        else:
+            loop = asyncio.get_running_loop()
+            audio = await loop.run_in_executor(
+                settings.thread_executor, concat_ogg, segments_audio
+            )
+
+        await TtsCacheService.set_audio(key, audio)
+        return audio
+
+    @classmethod
+    def cache_key(cls, text: str) -> str:
+        """
+        Computes the key under which the speech of a text is cached with the current voice options.
+
+        Parameters:
+        - text (str): The text of the speech.
+
+        Returns:
+        - str: The cache key of the speech.
+        """
+
+        return TtsCacheService.make_key(
+            text,
+            cls._config["model"],
+            cls._config["voice"],
+            cls._config["response_format"],
+        )
+
+    @classmethod
+    def _split(cls, text: str) -> List[str]:
+        """
+        Splits a text into segments of whole sentences, each short enough to be synthesized quickly.
+
+        Parameters:
+        - text (str): The text to split.
+
+        Returns:
+        - List[str]: The segments of the text, in order.
+        """
+
+        max_chars = cls._config["segment_max_chars"]
+
+        segments = []
+        current = ""
+        for sentence in cls._sentence_end_pattern.split(text.strip()):
+            # Sentences longer than a segment are cut at the last space that fits
+            while len(sentence) > max_chars:
+                index = sentence.rfind(" ", 0, max_chars)
+                if index <= 0:
+                    index = max_chars
+                head, sentence = sentence[:index], sentence[index:].strip()
+                if current:
+                    segments.append(current)
+                    current = ""
+                segments.append(head)
+
+            if not sentence:
+                continue
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                segments.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+
+        if current:
+            segments.append(current)
+        return segments
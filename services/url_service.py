@@ -0,0 +1,230 @@
+import asyncio
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+from cachetools import TTLCache
+from loguru import logger
+
+from utils.singleflight import SingleFlight
+
+
+class UrlService:
+    """
+    UrlService canonicalizes company URLs, so that every spelling of a website maps to the same company:
+    it normalizes the scheme, host, path and query of a URL and follows its redirects.
+    """
+
+    # A dictionary containing configuration options for the service, such as the tracking parameters and the probe timeout.
+    _config = {
+        "tracking_parameters": {
+            "fbclid",
+            "gclid",
+            "yclid",
+            "ysclid",
+            "msclkid",
+            "dclid",
+            "_openstat",
+            "ref",
+            "roistat",
+        },
+        "tracking_prefixes": ("utm_", "mc_", "pk_"),
+        "probe_timeout": 10,
+        "max_redirects": 10,
+        "user_agent": "AiCompanyAssistantBot/1.0",
+        "cache_size": 4096,
+        "cache_ttl": 24 * 60 * 60,
+    }
+
+    # A cache mapping normalized URLs to the URLs they resolve to.
+    _resolved: TTLCache = TTLCache(
+        maxsize=_config["cache_size"], ttl=_config["cache_ttl"]
+    )
+
+    # A registry of in-flight probes, keyed by normalized URL.
+    _probes = SingleFlight()
+
+    # Counters of cache hits, probes and unreachable URLs.
+    _counters: Counter = Counter()
+
+    @classmethod
+    def normalize(cls, url: str) -> str:
+        """
+        Normalizes a URL: lowercases its scheme and host, drops the default port, the fragment,
+        the trailing slash and the tracking parameters, and sorts the remaining query parameters.
+
+        Parameters:
+        - url (str): The URL.
+
+        Returns:
+        str: The normalized URL.
+        """
+
+        parts = urlsplit(url.strip())
+        scheme = (parts.scheme or "http").lower()
+        host = (parts.hostname or "").rstrip(".")
+
+        # Encoding internationalized domains, e.g. ".рф", the way they are resolved
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+
+        try:
+            port = parts.port
+        except ValueError:
+            port = None
+        netloc = host
+        if port is not None and (scheme, port) not in (("http", 80), ("https", 443)):
+            netloc = f"{host}:{port}"
+
+        path = parts.path.rstrip("/")
+        query = urlencode(
+            sorted(
+                (name, value)
+                for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                if not cls._is_tracking_parameter(name)
+            )
+        )
+        return urlunsplit((scheme, netloc, path or ("/" if query else ""), query, ""))
+
+    @classmethod
+    def canonical_url(cls, url: str) -> str:
+        """
+        Returns the canonical form of a URL, identifying a website whatever its scheme or "www." prefix.
+
+        Parameters:
+        - url (str): The URL.
+
+        Returns:
+        str: The canonical URL.
+        """
+
+        parts = urlsplit(cls.normalize(url))
+        netloc = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+        return urlunsplit(("https", netloc, parts.path, parts.query, ""))
+
+    @classmethod
+    async def resolve(cls, url: str) -> Optional[str]:
+        """
+        Follows the redirects of a URL and returns the normalized URL the website is served from,
+        trying HTTPS first. Results are cached, and concurrent calls for the same URL share one probe.
+
+        Parameters:
+        - url (str): The URL.
+
+        Returns:
+        Optional[str]: The resolved URL, or None if the website is unreachable.
+        """
+
+        url = cls.normalize(url)
+        resolved = cls._resolved.get(url)
+        if resolved is not None:
+            cls._counters["hits"] += 1
+            return resolved
+
+        resolved = await cls._probes.do(url, lambda: cls._resolve(url))
+        if resolved is not None:
+            # The resolved URL resolves to itself, which spares a probe when it is resolved again
+            cls._resolved[url] = cls._resolved[resolved] = resolved
+        return resolved
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Returns a snapshot of the service counters.
+
+        Returns:
+        Dict[str, int]: The hits, probes and unreachable counters and the number of cached URLs.
+        """
+
+        return {
+            "hits": cls._counters["hits"],
+            "probes": cls._counters["probes"],
+            "unreachable": cls._counters["unreachable"],
+            "size": len(cls._resolved),
+        }
+
+    @classmethod
+    async def _resolve(cls, url: str) -> Optional[str]:
+        """
+        Probes a normalized URL, trying its HTTPS variant first.
+
+        Parameters:
+        - url (str): The normalized URL.
+
+        Returns:
+        Optional[str]: The normalized URL the website is served from, or None if it is unreachable.
+        """
+
+        candidates = [url]
+        if url.startswith("http://"):
+            candidates.insert(0, "https://" + url[len("http://") :])
+
+        headers = {"User-Agent": cls._config["user_agent"]}
+        async with aiohttp.ClientSession(headers=headers) as session:
+            for candidate in candidates:
+                cls._counters["probes"] += 1
+                final_url = await cls._probe(session, candidate)
+                if final_url is not None:
+                    return cls.normalize(final_url)
+
+        cls._counters["unreachable"] += 1
+        logger.info(f"{url}: url is unreachable.")
+        return None
+
+    @classmethod
+    async def _probe(cls, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """
+        Requests a URL with HEAD, falling back to a GET whose body is not read when the HEAD request fails.
+
+        Any HTTP response makes the website reachable, whatever its status: bot-protected sites answer
+        the probe with 403, 429 or 503 and can still be crawled. Only DNS, connection and TLS failures do not.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session used for the requests.
+        - url (str): The URL.
+
+        Returns:
+        Optional[str]: The URL reached after the redirects, or None if the website did not answer.
+        """
+
+        timeout = aiohttp.ClientTimeout(total=cls._config["probe_timeout"])
+        for method in ("HEAD", "GET"):
+            try:
+                async with session.request(
+                    method,
+                    url,
+                    allow_redirects=True,
+                    max_redirects=cls._config["max_redirects"],
+                    timeout=timeout,
+                ) as response:
+                    if response.status >= 400:
+                        logger.info(f"{url}: {method} returned status {response.status}.")
+                    return str(response.url)
+            except aiohttp.ClientConnectorError as e:
+                # DNS, connection and TLS failures, there is no point in a GET to the same host
+                logger.info(f"{url}: {method} failed: {e}")
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # Servers mishandling HEAD may still serve the page
+                logger.info(f"{url}: {method} failed: {e}")
+        return None
+
+    @classmethod
+    def _is_tracking_parameter(cls, name: str) -> bool:
+        """
+        Checks whether a query parameter only tracks the origin of a visit.
+
+        Parameters:
+        - name (str): The name of the parameter.
+
+        Returns:
+        bool: True if the parameter is a tracking parameter, False otherwise.
+        """
+
+        name = name.lower()
+        return name in cls._config["tracking_parameters"] or name.startswith(
+            cls._config["tracking_prefixes"]
+        )
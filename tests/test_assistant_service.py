@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import contextmanager
+
+from models import CompanyModel
+from repositories import CompanyPageRepository, CompanyRepository
+from services import assistant_service
+from services.assistant_service import AssistantService
+from services.search_service import SearchService
+from services.url_service import UrlService
+
+
+class _FakeAssistant:
+    """
+    An assistant that is created without calling OpenAI, counting its creations.
+    """
+
+    created = 0
+
+    async def initialize(self, async_client, company_name, company_url, data_file_paths):
+        # Leaving time for the other callers to arrive while the assistant is being created
+        await asyncio.sleep(0.05)
+        _FakeAssistant.created += 1
+
+    async def get_id(self) -> str:
+        return "asst_test"
+
+    @classmethod
+    def vector_store_backend(cls) -> str:
+        return "openai"
+
+
+def test_concurrent_callers_share_one_assistant_creation(monkeypatch):
+    _FakeAssistant.created = 0
+    calls = {"crawl": 0, "summarize": 0}
+    companies = {}
+
+    async def _resolve(url):
+        return url
+
+    async def _get_by_canonical_url(self, canonical_url):
+        return companies.get(canonical_url)
+
+    async def _insert(self, company_info):
+        company = CompanyModel(id=1, **company_info)
+        companies[company.canonical_url] = company
+        return company
+
+    async def _update_by_info(self, company_id, company_info):
+        return None
+
+    async def _upsert_many(self, pages_info):
+        return None
+
+    async def _crawl_pages(url):
+        calls["crawl"] += 1
+        await asyncio.sleep(0.05)
+        return [{"url": url, "text": "Company data"}]
+
+    async def _summarize_content(url, source_texts):
+        calls["summarize"] += 1
+        return "Company summary"
+
+    @contextmanager
+    def _data_files(company_data):
+        yield []
+
+    monkeypatch.setattr(UrlService, "resolve", _resolve)
+    monkeypatch.setattr(CompanyRepository, "get_by_canonical_url", _get_by_canonical_url)
+    monkeypatch.setattr(CompanyRepository, "insert", _insert)
+    monkeypatch.setattr(CompanyRepository, "update_by_info", _update_by_info)
+    monkeypatch.setattr(CompanyPageRepository, "upsert_many", _upsert_many)
+    monkeypatch.setattr(SearchService, "crawl_pages", _crawl_pages)
+    monkeypatch.setattr(SearchService, "summarize_content", _summarize_content)
+    monkeypatch.setattr(assistant_service, "Assistant", _FakeAssistant)
+    monkeypatch.setattr(AssistantService, "_data_files", staticmethod(_data_files))
+
+    async def _run():
+        return await asyncio.gather(
+            *[
+                AssistantService.get_assistant("Company", "https://company.example/")
+                for _ in range(50)
+            ]
+        )
+
+    assistants = asyncio.run(_run())
+
+    assert _FakeAssistant.created == 1
+    assert calls == {"crawl": 1, "summarize": 1}
+    assert all(assistant is assistants[0] for assistant in assistants)
+    assert not AssistantService._creations.in_flight("url:https://company.example")
@@ -0,0 +1,80 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.crawler import Crawler
+
+_ROBOTS = "User-agent: *\nDisallow: /private/\n"
+
+_PAGES = {
+    "/": (
+        "<html><head><title>Home</title></head><body>"
+        "<p>Welcome home</p>"
+        '<a href="/about">About</a> <a href="/blog/post">Blog</a> '
+        '<a href="/private/secret">Secret</a> <a href="/ru">RU</a> '
+        '<a href="https://other.example/">Other</a>'
+        "</body></html>"
+    ).encode("utf-8"),
+    "/about": b"<html><body><p>About us</p><script>var hidden = 1;</script></body></html>",
+    "/blog/post": b"<html><body><p>Blog post</p></body></html>",
+    "/private/secret": b"<html><body><p>Secret page</p></body></html>",
+    "/ru": (
+        '<html><head><meta charset="windows-1251"><title>Компания</title></head>'
+        "<body><p>Привет, мир</p></body></html>"
+    ).encode("cp1251"),
+}
+
+
+def _fixture_site(requested: list) -> web.Application:
+    """
+    Builds a small website with a robots.txt, a page in a blog section and a page declaring its charset in a meta tag.
+    The paths of the pages requested are appended to `requested`.
+    """
+
+    async def _robots(request: web.Request) -> web.Response:
+        return web.Response(text=_ROBOTS)
+
+    async def _page(request: web.Request) -> web.Response:
+        requested.append(request.path)
+        if request.path not in _PAGES:
+            raise web.HTTPNotFound()
+        # The charset is left out of the header, so the crawler must read the one declared by the page
+        return web.Response(
+            body=_PAGES[request.path], headers={"Content-Type": "text/html"}
+        )
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", _robots)
+    app.router.add_get("/{path:.*}", _page)
+    return app
+
+
+def test_crawl_honours_robots_excludes_and_meta_charset():
+    requested = []
+    app = _fixture_site(requested)
+
+    async def _run():
+        async with TestServer(app) as server:
+            crawler = Crawler(delay=0.0)
+            return await crawler.crawl(str(server.make_url("/")), excludes=["blog/*"])
+
+    pages = asyncio.run(_run())
+    texts = {page["metadata"]["sourceURL"].split("/", 3)[3]: page for page in pages}
+
+    assert set(texts) == {"", "about", "ru"}
+    assert "/private/secret" not in requested
+    assert "/blog/post" not in requested
+
+    assert "Welcome home" in texts[""]["markdown"]
+    assert texts[""]["metadata"]["title"] == "Home"
+    assert "var hidden" not in texts["about"]["markdown"]
+    assert "Привет, мир" in texts["ru"]["markdown"]
+    assert texts["ru"]["metadata"]["title"] == "Компания"
+
+
+def test_extract_text_uses_the_declared_charset():
+    text = Crawler.extract_text(_PAGES["/ru"])
+
+    assert "Привет, мир" in text
+    assert "Компания" not in text
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from models import FsmStateModel
+from tg.states import ActivatedState
+from tg.storage.db_storage import DbStorage
+
+
+class _FakeFsmStateRepository:
+    """
+    An FsmStateRepository keeping the rows in memory and counting the statements it runs.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.reads = 0
+        self.writes = 0
+
+    async def get_by_key(self, key):
+        self.reads += 1
+        await asyncio.sleep(0)
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return FsmStateModel(key=key, state=row["state"], data=json.loads(row["data"]))
+
+    async def upsert_many(self, states_info):
+        self.writes += 1
+        await asyncio.sleep(0)
+        for state_info in states_info:
+            self.rows[state_info["key"]] = {
+                "state": state_info["state"],
+                "data": json.dumps(state_info["data"]),
+            }
+
+
+def _storage(repository):
+    storage = DbStorage()
+    storage._repository = repository
+    return storage
+
+
+def _key(user_id):
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+async def _conversation(storage, user_id):
+    """
+    Runs the FSM operations of an activated conversation and returns what the storage reads back.
+    """
+
+    key = _key(user_id)
+    before = (await storage.get_state(key), await storage.get_data(key))
+    await storage.set_state(key, ActivatedState.activated)
+    await storage.set_data(key, {"thread_id": f"thread_{user_id}", "assistant_id": "asst"})
+    data = await storage.get_data(key)
+    data["first_question_answered"] = True
+    await storage.set_data(key, data)
+    return before, await storage.get_state(key), await storage.get_data(key)
+
+
+def test_db_storage_behaves_like_memory_storage():
+    async def _run(storage):
+        results = await asyncio.gather(
+            *[_conversation(storage, user_id) for user_id in range(20)]
+        )
+        await storage.close()
+        return results
+
+    repository = _FakeFsmStateRepository()
+
+    assert asyncio.run(_run(_storage(repository))) == asyncio.run(
+        _run(MemoryStorage())
+    )
+    # Concurrent updates are flushed together instead of one statement per update
+    assert repository.writes < 20
+
+
+def test_states_written_by_another_instance_are_read():
+    repository = _FakeFsmStateRepository()
+    first, second = _storage(repository), _storage(repository)
+    key = _key(1)
+
+    async def _run():
+        assert await second.get_state(key) is None
+        await first.set_state(key, ActivatedState.activated)
+        await first.set_data(key, {"thread_id": "thread_1"})
+        state, data = await second.get_state(key), await second.get_data(key)
+        await first.close()
+        await second.close()
+        return state, data
+
+    assert asyncio.run(_run()) == (ActivatedState.activated.state, {"thread_id": "thread_1"})
+
+
+def test_failed_flush_is_raised_and_not_cached():
+    class _FailingRepository(_FakeFsmStateRepository):
+        async def upsert_many(self, states_info):
+            raise ConnectionError("Database is unavailable")
+
+    repository = _FailingRepository()
+    storage = _storage(repository)
+    storage.cache_ttl = 60
+    key = _key(1)
+
+    async def _run():
+        with pytest.raises(ConnectionError):
+            await storage.set_state(key, ActivatedState.activated)
+        return await storage.get_state(key)
+
+    assert asyncio.run(_run()) is None
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from assistant.local_vector_store import LocalVectorStore
+
+_TOPICS = {
+    "pricing": "Our robots cost 1000 dollars per month with free delivery and support.",
+    "contacts": "Call our office in Berlin or write to the sales team by email.",
+    "careers": "We hire engineers and designers who love building warehouse robots.",
+}
+
+
+class _FakeEmbeddings:
+    """
+    An embeddings endpoint hashing the words of each text into a vector, so texts sharing words are close.
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    async def create(self, model, input):
+        self.requests.append(list(input))
+        data = []
+        for text in input:
+            vector = np.zeros(64, dtype=np.float32)
+            for word in text.lower().split():
+                vector[zlib.crc32(word.strip(".,?").encode()) % 64] += 1
+            data.append(SimpleNamespace(embedding=vector.tolist()))
+        return SimpleNamespace(data=data)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """
+    Keeps the stores in a temporary directory and returns a client whose embeddings endpoint is faked.
+    """
+
+    monkeypatch.setitem(LocalVectorStore._config, "directory", str(tmp_path))
+    monkeypatch.setitem(LocalVectorStore._config, "chunk_size", 100)
+    monkeypatch.setitem(LocalVectorStore._config, "chunk_overlap", 0)
+    monkeypatch.setitem(LocalVectorStore._config, "embedding_batch_size", 2)
+    return SimpleNamespace(embeddings=_FakeEmbeddings())
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "company.txt"
+    path.write_text("\n\n".join(_TOPICS.values()))
+    return str(path)
+
+
+def test_store_round_trip(client, data_file):
+    async def _run():
+        store = LocalVectorStore()
+        await store.initialization("Company", [data_file], "Use the passages.", client)
+
+        loaded = LocalVectorStore()
+        await loaded.load(store.id, "Use the passages.", client)
+        return store, loaded, await loaded.search("How much do the robots cost per month?", k=1)
+
+    store, loaded, passages = asyncio.run(_run())
+
+    assert loaded.name == "Company"
+    assert passages == [_TOPICS["pricing"]]
+    # Three chunks are embedded in batches of two
+    assert [len(request) for request in client.embeddings.requests[:2]] == [2, 1]
+
+
+def test_missing_store_is_rebuilt_under_its_id(client, data_file):
+    async def _run():
+        store = LocalVectorStore()
+        with pytest.raises(FileNotFoundError):
+            await store.load("missing", "Use the passages.", client)
+
+        rebuilt = LocalVectorStore()
+        await rebuilt.initialization(
+            "Company", [data_file], "Use the passages.", client, store_id="missing"
+        )
+        loaded = LocalVectorStore()
+        await loaded.load("missing", "Use the passages.", client)
+        return await loaded.search("Where is your office?", k=1)
+
+    assert asyncio.run(_run()) == [_TOPICS["contacts"]]
+
+
+def test_deleted_store_cannot_be_loaded(client, data_file):
+    async def _run():
+        store = LocalVectorStore()
+        await store.initialization("Company", [data_file], "Use the passages.", client)
+        await store.delete()
+        await store.delete()
+        return store
+
+    store = asyncio.run(_run())
+
+    assert not os.path.exists(os.path.join(LocalVectorStore._config["directory"], store.id))
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(LocalVectorStore().load(store.id, "Use the passages.", client))
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from cachetools import TTLCache
+from langchain_core.language_models import SimpleChatModel
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services import search_service
+from services.search_service import SearchService
+from services.summary_cache_service import SummaryCacheService
+from utils.singleflight import SingleFlight
+
+_RESULTS = {
+    "organic": [
+        {
+            "title": "Acme robots pricing",
+            "link": "https://acme.example/pricing",
+            "snippet": "Acme robots pricing and plans",
+        },
+        {
+            "title": "Acme robots reviews",
+            "link": "https://acme.example/reviews",
+            "snippet": "Acme robots reviews from customers",
+        },
+        {
+            "title": "Weather today",
+            "link": "https://weather.example/",
+            "snippet": "Sunny with light wind",
+        },
+        {"title": "No link"},
+    ]
+}
+
+
+class _FakeChain:
+    """
+    A chain answering with fixed URLs and recording its inputs instead of asking the model.
+    """
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.inputs = []
+
+    async def ainvoke(self, inputs):
+        self.inputs.append(inputs)
+        return json.dumps(self.answer)
+
+
+@pytest.fixture
+def serper(monkeypatch):
+    """
+    Serves the Serper search API locally and returns the list of the queries it received.
+    """
+
+    queries = []
+
+    async def _search(request: web.Request) -> web.Response:
+        queries.append((await request.json())["q"])
+        await asyncio.sleep(0.05)
+        return web.json_response(_RESULTS)
+
+    app = web.Application()
+    app.router.add_post("/search", _search)
+    server = TestServer(app)
+
+    monkeypatch.setattr(
+        SearchService, "_search_results", TTLCache(maxsize=16, ttl=60)
+    )
+    monkeypatch.setattr(SearchService, "_searches", SingleFlight())
+    # The tokenizer downloads its vocabulary, so tokens are counted as words
+    monkeypatch.setattr(
+        SearchService, "_count_tokens", classmethod(lambda cls, text: len(text.split()))
+    )
+
+    def _run(coro_fn):
+        async def _serve():
+            async with server:
+                monkeypatch.setitem(
+                    SearchService._config, "search_api", str(server.make_url("/search"))
+                )
+                return await coro_fn()
+
+        return asyncio.run(_serve())
+
+    return queries, _run
+
+
+def test_decisive_ranking_skips_the_model(monkeypatch, serper):
+    queries, run = serper
+
+    def _get_chain(*args):
+        raise AssertionError("The model must not be asked.")
+
+    monkeypatch.setattr(SearchService, "_get_chain", classmethod(_get_chain))
+
+    urls = run(lambda: SearchService.search_articles("acme robots", 2))
+
+    assert urls == ["https://acme.example/pricing", "https://acme.example/reviews"]
+    assert queries == ["acme robots"]
+
+
+def test_model_chooses_among_ranked_candidates(monkeypatch, serper):
+    queries, run = serper
+    chain = _FakeChain(["https://acme.example/reviews"])
+    monkeypatch.setattr(SearchService, "_get_chain", classmethod(lambda cls, *args: chain))
+
+    urls = run(lambda: SearchService.search_articles("acme robots", 1))
+
+    assert urls == ["https://acme.example/reviews"]
+    assert len(chain.inputs) == 1
+    candidates = chain.inputs[0]["response"]
+    assert candidates.index("acme.example") < candidates.index("weather.example")
+    assert "No link" not in candidates
+
+
+def test_searches_are_shared_and_cached(monkeypatch, serper):
+    queries, run = serper
+
+    async def _search_twice():
+        first = await asyncio.gather(
+            *[SearchService.search_articles("Acme  robots", 3) for _ in range(10)]
+        )
+        second = await SearchService.search_articles("acme robots", 3)
+        return first, second
+
+    first, second = run(_search_twice)
+
+    assert queries == ["Acme  robots"]
+    assert all(urls == second for urls in first)
+    assert len(second) == 3
+
+
+def _fake_firecrawl(polls: dict) -> web.Application:
+    """
+    Builds a FireCrawl API whose jobs complete on their second status check, except that the job
+    of a URL on the "broken.example" host is rejected when it is started.
+    The number of status checks of each job is counted in `polls`.
+    """
+
+    async def _start(request: web.Request) -> web.Response:
+        url = (await request.json())["url"]
+        if "broken.example" in url:
+            return web.json_response({"error": "Unsupported URL"}, status=400)
+        polls[url] = 0
+        return web.json_response({"jobId": url})
+
+    async def _status(request: web.Request) -> web.Response:
+        url = request.match_info["job_id"]
+        polls[url] += 1
+        if polls[url] < 2:
+            return web.json_response({"status": "active", "data": None})
+        page = {
+            "markdown": f"The content of {url}",
+            "metadata": {"sourceURL": f"{url}/about"},
+        }
+        return web.json_response({"status": "completed", "data": [page]})
+
+    app = web.Application()
+    app.router.add_post("/crawl", _start)
+    app.router.add_get("/crawl/status/{job_id:.+}", _status)
+    return app
+
+
+def test_failed_job_does_not_lose_other_jobs(monkeypatch):
+    polls = {}
+    completed = []
+    urls = ["https://one.example", "https://broken.example", "https://two.example"]
+
+    async def _on_job_completed(data, source_urls):
+        completed.append(source_urls)
+
+    async def _run():
+        async with TestServer(_fake_firecrawl(polls)) as server:
+            monkeypatch.setitem(SearchService._config, "crawler_backend", "firecrawl")
+            monkeypatch.setitem(
+                SearchService._config, "crawler_api", str(server.make_url("/"))
+            )
+            return await SearchService.get_content_from_urls(
+                urls, timeout=0.01, on_job_completed=_on_job_completed
+            )
+
+    all_data, all_source_urls = asyncio.run(_run())
+
+    assert sorted(all_source_urls) == [
+        ["https://one.example/about"],
+        ["https://two.example/about"],
+    ]
+    assert sorted(completed) == sorted(all_source_urls)
+    assert all("The content of" in data for data in all_data)
+    assert polls == {"https://one.example": 2, "https://two.example": 2}
+
+
+def test_cancelled_crawl_is_not_swallowed(monkeypatch):
+    async def _crawl(session, url, timeout):
+        raise asyncio.CancelledError()
+
+    monkeypatch.setattr(SearchService, "_crawl", _crawl)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(SearchService.get_content_from_urls(["https://one.example"]))
+
+
+class _SlowChatModel(SimpleChatModel):
+    """
+    A chat model whose synchronous call blocks like a slow network request.
+    """
+
+    delay: float = 0.1
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-chat-model"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        time.sleep(self.delay)
+        return "Summary"
+
+
+def test_summary_does_not_block_the_event_loop(monkeypatch):
+    async def _get(key):
+        return None
+
+    async def _set(key, model, summary):
+        return None
+
+    monkeypatch.setattr(SummaryCacheService, "get", _get)
+    monkeypatch.setattr(SummaryCacheService, "set", _set)
+    monkeypatch.setattr(SearchService, "_chains", {})
+    monkeypatch.setitem(SearchService._config, "summarize_mode", "refine")
+    monkeypatch.setattr(
+        search_service, "ChatOpenAI", lambda **kwargs: _SlowChatModel()
+    )
+    # The token splitter downloads its vocabulary, so the text is split by characters
+    monkeypatch.setattr(
+        SearchService,
+        "_text_splitter",
+        RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=0),
+    )
+
+    async def _run():
+        lags = []
+
+        async def _probe():
+            # Measuring how late the loop wakes a handler that sleeps for a short interval
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        probe = asyncio.create_task(_probe())
+        started = time.perf_counter()
+        summary = await SearchService.summarize_content(
+            "https://acme.example", ["Acme makes robots. " * 50] * 3
+        )
+        elapsed = time.perf_counter() - started
+        probe.cancel()
+        return summary, elapsed, lags
+
+    summary, elapsed, lags = asyncio.run(_run())
+
+    assert summary == "Summary"
+    # Six chunks are summarized one after the other
+    assert elapsed >= 6 * 0.1
+    assert len(lags) > 10
+    assert max(lags) < 0.05
@@ -0,0 +1,101 @@
+import asyncio
+import io
+import random
+import shutil
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services.stt_service import SttService
+from utils.audio import find_split_points, to_wav
+
+_SAMPLE_RATE = 16000
+
+
+def _speech(seconds: float, pause_every: float = 7.0, pause: float = 1.0) -> np.ndarray:
+    """
+    Synthesizes speech-like audio: noisy tones interrupted by a silent pause every few seconds.
+    """
+
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * _SAMPLE_RATE)) / _SAMPLE_RATE
+    samples = 8000 * np.sin(2 * np.pi * 220 * t) + rng.normal(0, 1000, len(t))
+    samples[(t % pause_every) >= pause_every - pause] = 0
+    return samples.astype(np.int16)
+
+
+class _FakeTranscriptions:
+    """
+    A transcription endpoint answering with the name of the transcribed file after a random delay,
+    so the segments finish out of order.
+    """
+
+    def __init__(self):
+        self.files = []
+        self.running = 0
+        self.max_running = 0
+
+    async def create(self, model, file, response_format):
+        name, audio = file
+        self.files.append((name, audio))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(random.uniform(0.01, 0.05))
+        self.running -= 1
+        return f"{name}\n"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """
+    Replaces the OpenAI client of the service with one whose transcription endpoint is faked.
+    """
+
+    client = SimpleNamespace(audio=SimpleNamespace(transcriptions=_FakeTranscriptions()))
+    monkeypatch.setattr(SttService, "_async_client", client)
+    return client
+
+
+def test_split_points_fall_in_pauses():
+    samples = _speech(300)
+
+    points = find_split_points(samples, _SAMPLE_RATE, 45, 10)
+
+    assert 5 <= len(points) <= 7
+    assert points == sorted(points)
+    for point in points:
+        # The frame starting at a split point is silent
+        assert not samples[point : point + int(0.03 * _SAMPLE_RATE)].any()
+
+
+def test_short_voice_note_is_sent_whole(client):
+    audio = to_wav(_speech(10), _SAMPLE_RATE)
+
+    text = asyncio.run(SttService.speech_to_text(audio, "voice.ogg", duration=10))
+
+    assert text == "voice.ogg\n"
+    assert client.audio.transcriptions.files == [("voice.ogg", audio)]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_long_voice_note_is_transcribed_in_order(client):
+    samples = _speech(300)
+    transcriptions = client.audio.transcriptions
+
+    text = asyncio.run(
+        SttService.speech_to_text(to_wav(samples, _SAMPLE_RATE), "voice.ogg", duration=300)
+    )
+
+    names = [f"segment_{index}.wav" for index in range(len(transcriptions.files))]
+    assert len(names) > 1
+    assert text == " ".join(names)
+    assert transcriptions.max_running <= SttService._config["segment_concurrency"]
+
+    # The segments cover the whole recording without overlapping
+    lengths = []
+    for _, audio in transcriptions.files:
+        with wave.open(io.BytesIO(audio)) as file:
+            lengths.append(file.getnframes())
+    assert sum(lengths) == len(samples)
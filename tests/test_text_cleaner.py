@@ -0,0 +1,81 @@
+import random
+import re
+
+from utils.text_cleaner import clean_text
+
+
+def _legacy_clean_text(text: str) -> str:
+    """
+    The multi-pass cleaner that clean_text replaced, kept as the reference of its output.
+    """
+
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)
+    text = re.sub(r"!\[.*\]\(.*\)", "", text)
+    text = re.sub(r"\!\[.*?\]\(.*?\)", "", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]*\)", r"\1", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    text = re.sub(r"\[.*?\]\(.*?\)", "", text)
+    text = re.sub(r"<img.*?>", "", text)
+    text = re.sub(r"<a.*?>|</a>", "", text)
+    text = re.sub(r"\*+", "", text)
+    text = re.sub(r"#", "", text)
+    text = re.sub(r"=", "", text)
+    text = re.sub(r"-", "", text)
+    text = re.sub(r"\\", "", text)
+    text = re.sub(
+        r"\b\w+\.(jpg|jpeg|png|gif|bmp|pdf|doc|docx|xls|xlsx|ppt|pptx|webp)\b",
+        "",
+        text,
+        flags=re.IGNORECASE,
+    )
+    text = re.sub(r"[\"']", "", text)
+    text = re.sub(r"\s+", " ", text)
+    text = text.strip()
+    return text
+
+
+# A page as the crawler returns it, in markdown with leftover HTML.
+_PAGE = """
+# ООО «Ромашка» — доставка цветов
+
+![логотип](https://example.com/static/logo.png) [Главная](/) | [Каталог](/catalog) | [Контакты](/contacts)
+
+<div class="banner"><img src="/banner.jpg" alt="Весенняя распродажа"></div>
+
+## О компании
+
+Мы работаем с **2010** года и доставляем *свежие* цветы по всему городу.
+Скачайте [прайс-лист](/files/price.pdf) или каталог catalog_2024.PDF.
+
+* Букеты от 1 500 ₽
+* Доставка — 2 часа
+* Телефон: +7 (495) 123-45-67
+
+![баннер [акция]](https://example.com/img/sale.webp "Скидки") Подробнее [тут](https://example.com/sale?a=1&b=2).
+<a href="/about">О нас</a> \\ "Цитата" и 'кавычки' ===
+"""
+
+# Fragments combined at random into synthetic pages, including unbalanced and nested markup.
+_FRAGMENTS = [
+    "text", "Текст", " ", "  ", "\n", "\t", "\n\n", "<", ">", "<div>", "</a>", "<a href='x'>", "<img src=a.png>",
+    "<>", "![", "]", "(", ")", "](", "[", "![alt](img.png)", "[link](http://x.y/z)", "[a [b] c](d)",
+    "![a](b) ![c](d)", "*", "**", "#", "=", "-", "\\", "'", '"', "file.PDF", "photo.jpeg", "doc.docx",
+    "name.txt", "a.b", " ", " ", "　", "\x1c", "—", "ё", "1.png2", "_x_.gif",
+]  # fmt: skip
+
+
+def _random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(0, 60)))
+
+
+def test_clean_text_matches_legacy_cleaner_on_a_page():
+    assert clean_text(_PAGE) == _legacy_clean_text(_PAGE)
+    assert clean_text(_PAGE * 50) == _legacy_clean_text(_PAGE * 50)
+
+
+def test_clean_text_matches_legacy_cleaner_on_synthetic_pages():
+    rng = random.Random(2024)
+    for _ in range(20000):
+        text = _random_text(rng)
+        assert clean_text(text) == _legacy_clean_text(text), repr(text)
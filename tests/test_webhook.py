@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from tg.webhook import WebhookServer
+
+_HANDLER_DELAY = 0.05
+
+
+def _update(update_id: int) -> dict:
+    """
+    Builds a synthetic text message update.
+    """
+
+    user = {"id": update_id, "is_bot": False, "first_name": "User"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id, "type": "private"},
+            "from": user,
+            "text": "Hello",
+        },
+    }
+
+
+def _dispatcher(stats: dict) -> Dispatcher:
+    """
+    Builds a dispatcher whose message handler waits like a slow request and records how many handlers run at once.
+    """
+
+    router = Router()
+
+    @router.message()
+    async def _handler(message: Message) -> None:
+        stats["running"] += 1
+        stats["max_running"] = max(stats["max_running"], stats["running"])
+        await asyncio.sleep(_HANDLER_DELAY)
+        stats["running"] -= 1
+        stats["handled"].append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+def test_updates_are_acknowledged_at_once_and_processed_concurrently():
+    stats = {"running": 0, "max_running": 0, "handled": []}
+    updates_count, concurrency = 200, 20
+    server = WebhookServer(
+        _dispatcher(stats), Bot("123456:test"), concurrency=concurrency, secret="secret"
+    )
+    app = web.Application()
+    app.router.add_post("/webhook", server.handle)
+
+    async def _run():
+        async with TestServer(app) as test_server, ClientSession() as session:
+            url = str(test_server.make_url("/webhook"))
+            headers = {"X-Telegram-Bot-Api-Secret-Token": "secret"}
+
+            async def _post(update_id: int, headers: dict = headers) -> int:
+                async with session.post(url, json=_update(update_id), headers=headers) as response:
+                    return response.status
+
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*[_post(i) for i in range(updates_count)])
+            acknowledged = time.perf_counter() - started
+
+            unauthorized = await _post(updates_count, headers={})
+            await server.drain()
+            processed = time.perf_counter() - started
+            closing = await _post(updates_count + 1)
+        await server.bot.session.close()
+        return statuses, acknowledged, processed, unauthorized, closing
+
+    statuses, acknowledged, processed, unauthorized, closing = asyncio.run(_run())
+    print(
+        f"{updates_count} updates acknowledged in {acknowledged:.2f}s, "
+        f"processed at {updates_count / processed:.0f} updates/s"
+    )
+
+    assert statuses == [200] * updates_count
+    assert unauthorized == 401
+    assert closing == 503
+    assert sorted(stats["handled"]) == list(range(updates_count))
+    assert stats["max_running"] == concurrency
+    # Processing one update at a time would take the handler delay for every update
+    assert processed < updates_count * _HANDLER_DELAY / 4
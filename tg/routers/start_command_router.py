@@ -1,17 +1,16 @@
-import os
-
 from aiogram import Router
 from aiogram.filters import CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import StorageKey
-from aiogram.types import FSInputFile, Message
+from aiogram.types import Message
 from aiogram.utils.deep_linking import decode_payload
 from loguru import logger
 from telegram.constants import ParseMode
 
 from config import settings
-from services import AssistantService, TtsService
+from services import AssistantService
 from tg.states import ActivatedState
+from tg.voice import answer_voice, start_speech
 from utils import Strings
 
 # Initialize the router and bot instance
@@ -63,19 +62,18 @@ async def cmd_start(message: Message, command: CommandObject, state: FSMContext)
 
         await message.answer(Strings.ASSISTANT_ACTIVATED_MSG)
 
+        # The greeting opens the thread and is the same for every user, so it may be answered from the cache
+        # without counting as the user's first question
         response = await AssistantService.request(
-            thread.id, Strings.ASSISTANT_HELLO_MSG, await assistant.get_id()
+            thread.id,
+            Strings.ASSISTANT_HELLO_MSG,
+            await assistant.get_id(),
+            cacheable=True,
         )
 
-        await message.answer(response, parse_mode=ParseMode.MARKDOWN)
-
+        # Converting the answer to speech while the text is being sent
+        speech = start_speech(response)
         try:
-            response_audio_file_path = await TtsService.text_to_speech(response)
-            response = FSInputFile(response_audio_file_path)
-            await message.answer_voice(response)
-        except Exception as e:
-            logger.error(
-                f"Error in start_command_router while converting answer to audio: {e}"
-            )
+            await message.answer(response, parse_mode=ParseMode.MARKDOWN)
         finally:
-            os.remove(response_audio_file_path)
+            await answer_voice(message, speech)
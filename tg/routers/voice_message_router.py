@@ -1,17 +1,15 @@
-import os
-import pathlib
-
 from aiogram import F
 from aiogram.dispatcher.router import Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.storage.base import StorageKey
-from aiogram.types import FSInputFile, Message
+from aiogram.types import Message
 from loguru import logger
-from telegram.constants import ParseMode
 
 from config import settings
-from services import AssistantService, SttService, TtsService
+from services import AssistantService
 from tg.states import ActivatedState
+from tg.streaming import MessageStreamer
+from tg.voice import answer_voice, start_speech, transcribe_voice
 from utils import Strings
 
 # Initialize the router and bot instance
@@ -22,9 +20,9 @@ bot = settings.bot
 @router.message(ActivatedState.activated, F.voice)
 async def voice_message(message: Message, state: FSMContext):
     """
-    Handles voice messages by downloading the voice message, converting it to text with the SttService,
-    processing the text with the AssistantService, converting the response to speech with the TtsService,
-    and sending the speech audio back to the user.
+    Handles voice messages by converting the voice message to text in memory with the SttService,
+    streaming the AssistantService's answer to the text into a progressively edited message,
+    converting the response to speech with the TtsService, and sending the speech audio back to the user.
 
     Parameters:
     - message (Message): The message object received from the user.
@@ -33,40 +31,44 @@ async def voice_message(message: Message, state: FSMContext):
     - None
     """
 
-    await message.answer(Strings.WAIT_MSG)
-
-    file = await bot.get_file(message.voice.file_id)
-    file_on_disk = pathlib.Path("", f"{message.voice.file_id}.ogg")
-    await bot.download_file(file.file_path, destination=file_on_disk)
+    streamer = MessageStreamer(message)
+    await streamer.start()
 
     try:
-        text = await SttService.speech_to_text(file_on_disk)
+        text = await transcribe_voice(message)
+        if text is None:
+            await streamer.finalize(Strings.VOICE_IS_TOO_LARGE_MSG)
+            return
 
-        data = await state.storage.get_data(
-            StorageKey(
-                bot_id=bot.id,
-                user_id=message.from_user.id,
-                chat_id=message.chat.id,
-            )
+        key = StorageKey(
+            bot_id=bot.id,
+            user_id=message.from_user.id,
+            chat_id=message.chat.id,
         )
+        data = await state.storage.get_data(key)
 
-        response = await AssistantService.request(
-            data["thread_id"], text, data["assistant_id"]
+        # Only the first question of a conversation is context-free, so only it may be answered from the cache
+        first_question = not data.get("first_question_answered", False)
+        response = await AssistantService.request_stream(
+            data["thread_id"],
+            text,
+            data["assistant_id"],
+            on_delta=streamer.push,
+            cacheable=first_question,
         )
+        if response is None:
+            await streamer.finalize(Strings.ASSISTANT_IS_DEAD)
+            return
+        if first_question:
+            await state.storage.set_data(
+                key, {**data, "first_question_answered": True}
+            )
 
-        await message.answer(response, parse_mode=ParseMode.MARKDOWN)
-
+        # Converting the answer to speech while the text is being sent
+        speech = start_speech(response)
         try:
-            response_audio_file_path = await TtsService.text_to_speech(response)
-            response = FSInputFile(response_audio_file_path)
-            await message.answer_voice(response)
-        except Exception as e:
-            logger.error(
-                f"Error in voice_message_router while converting answer to audio: {e}"
-            )
+            await streamer.finalize(response)
         finally:
-            os.remove(response_audio_file_path)
+            await answer_voice(message, speech)
     except Exception as e:
         logger.error(f"Error in voice_message_router: {e}")
-    finally:
-        os.remove(file_on_disk)
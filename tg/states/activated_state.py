@@ -9,4 +9,5 @@ class ActivatedState(StatesGroup):
 
     wait_name = State()
     wait_url = State()
+    creating = State()
     activated = State()
@@ -0,0 +1 @@
+from .db_storage import DbStorage
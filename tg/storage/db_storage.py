@@ -0,0 +1,290 @@
+import asyncio
+import copy
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from loguru import logger
+
+from repositories import FsmStateRepository
+
+
+class DbStorage(BaseStorage):
+    """
+    DbStorage keeps the FSM state of conversations in the database so it survives restarts and is shared
+    between bot instances. Writes issued within a short window are flushed together in a single statement.
+
+    States are read from the database every time by default, since consecutive updates of a user may be handled
+    by different instances. A single instance deployment may cache them for a few seconds instead, trading
+    one read per update for states that can be that many seconds stale if another instance writes them.
+    """
+
+    def __init__(self, flush_interval: float = 0.01, cache_ttl: float = 0.0) -> None:
+        """
+        Initializes the storage.
+
+        Parameters:
+        - flush_interval (float, optional): The number of seconds writes are gathered before being flushed. Defaults to 0.01.
+        - cache_ttl (float, optional): The number of seconds a cached state is trusted before being re-read,
+          which bounds how stale a state written by another instance can be. States waiting to be flushed
+          are always served from the cache. Defaults to 0.0, i.e. no caching.
+
+        Returns:
+        None
+        """
+
+        self.flush_interval = flush_interval
+        self.cache_ttl = cache_ttl
+
+        self._repository = FsmStateRepository()
+        # A dictionary mapping storage keys to their state, data, write version and the moment they were cached.
+        # Entries are dropped once stale, so the cache only holds the recently active conversations.
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._swept_at = time.monotonic()
+        self._pending: Set[str] = set()
+        self._flush_future: Optional[asyncio.Future] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+
+    @staticmethod
+    def _build_key(key: StorageKey) -> str:
+        """
+        Builds the database key of a conversation.
+
+        Parameters:
+        - key (StorageKey): The storage key of the conversation.
+
+        Returns:
+        str: The database key.
+        """
+
+        return ":".join(
+            str(part)
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                getattr(key, "business_connection_id", None),
+                key.destiny,
+            )
+        )
+
+    async def _entry(self, key: str) -> Dict[str, Any]:
+        """
+        Returns the cached entry of a conversation, loading it from the database if it is missing or stale.
+
+        Parameters:
+        - key (str): The database key of the conversation.
+
+        Returns:
+        Dict[str, Any]: The entry holding the state and the data of the conversation.
+        """
+
+        self._sweep()
+        entry = self._cache.get(key)
+        # Entries waiting to be flushed are newer than the database rows.
+        if entry is not None and (
+            key in self._pending or time.monotonic() - entry["cached_at"] < self.cache_ttl
+        ):
+            return entry
+
+        row = await self._repository.get_by_key(key)
+        entry = {
+            "state": row.state if row is not None else None,
+            "data": (row.data or {}) if row is not None else {},
+            "version": 0,
+            "cached_at": time.monotonic(),
+        }
+        self._cache[key] = entry
+        return entry
+
+    def _sweep(self) -> None:
+        """
+        Drops the stale entries that are not waiting to be flushed, at most once per cache TTL.
+
+        Returns:
+        None
+        """
+
+        now = time.monotonic()
+        if now - self._swept_at < self.cache_ttl:
+            return
+        self._swept_at = now
+
+        stale = [
+            key
+            for key, entry in self._cache.items()
+            if key not in self._pending and now - entry["cached_at"] >= self.cache_ttl
+        ]
+        for key in stale:
+            del self._cache[key]
+
+    async def _write(self, key: str) -> None:
+        """
+        Schedules the cached entry of a conversation to be written and waits until its batch is flushed.
+
+        Parameters:
+        - key (str): The database key of the conversation.
+
+        Returns:
+        None
+        """
+
+        entry = self._cache[key]
+        entry["cached_at"] = time.monotonic()
+        entry["version"] += 1
+        self._pending.add(key)
+        if self._flush_future is None:
+            self._flush_future = asyncio.get_running_loop().create_future()
+            task = asyncio.create_task(self._flush_later(self._flush_future))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        await asyncio.shield(self._flush_future)
+
+    async def _flush_later(self, future: asyncio.Future) -> None:
+        """
+        Waits for the flush window to close, then writes all pending entries at once.
+
+        Parameters:
+        - future (asyncio.Future): The future resolved once the batch is written.
+
+        Returns:
+        None
+        """
+
+        await asyncio.sleep(self.flush_interval)
+        await self._flush(future)
+
+    async def _flush(self, future: Optional[asyncio.Future]) -> None:
+        """
+        Writes all pending entries in a single statement.
+
+        Parameters:
+        - future (Optional[asyncio.Future]): The future of the batch, resolved with the outcome of the write.
+
+        Returns:
+        None
+        """
+
+        # Flushes run one at a time, so an older batch can never overwrite a newer one.
+        async with self._flush_lock:
+            pending, self._pending = self._pending, set()
+            if future is self._flush_future:
+                self._flush_future = None
+
+            rows = []
+            versions = {}
+            try:
+                now = datetime.utcnow()
+                for key in pending:
+                    entry = self._cache.get(key)
+                    if entry is None:
+                        continue
+                    versions[key] = entry["version"]
+                    rows.append(
+                        {
+                            "key": key,
+                            "state": entry["state"],
+                            "data": entry["data"],
+                            "updated_at": now,
+                        }
+                    )
+                await self._repository.upsert_many(rows)
+            except Exception as e:
+                error = e
+            else:
+                error = None
+
+        if error is not None:
+            logger.error(f"Error while flushing {len(rows)} FSM states: {error}")
+            # Dropping the entries that were not written, unless they have been rewritten since,
+            # in which case the next batch writes them
+            for key, version in versions.items():
+                entry = self._cache.get(key)
+                if entry is not None and entry["version"] == version:
+                    del self._cache[key]
+            if future is not None and not future.done():
+                future.set_exception(error)
+            return
+
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """
+        Sets the FSM state of a conversation.
+
+        Parameters:
+        - key (StorageKey): The storage key of the conversation.
+        - state (StateType, optional): The new state, or None to reset it. Defaults to None.
+
+        Returns:
+        None
+        """
+
+        db_key = self._build_key(key)
+        entry = await self._entry(db_key)
+        entry["state"] = state.state if isinstance(state, State) else state
+        await self._write(db_key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """
+        Returns the FSM state of a conversation.
+
+        Parameters:
+        - key (StorageKey): The storage key of the conversation.
+
+        Returns:
+        Optional[str]: The name of the current state, or None.
+        """
+
+        entry = await self._entry(self._build_key(key))
+        return entry["state"]
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        """
+        Replaces the data of a conversation.
+
+        Parameters:
+        - key (StorageKey): The storage key of the conversation.
+        - data (Dict[str, Any]): The new data, which must be JSON-serializable.
+
+        Returns:
+        None
+        """
+
+        db_key = self._build_key(key)
+        entry = await self._entry(db_key)
+        entry["data"] = copy.deepcopy(data)
+        await self._write(db_key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """
+        Returns a copy of the data of a conversation.
+
+        Parameters:
+        - key (StorageKey): The storage key of the conversation.
+
+        Returns:
+        Dict[str, Any]: The data of the conversation.
+        """
+
+        entry = await self._entry(self._build_key(key))
+        return copy.deepcopy(entry["data"])
+
+    async def close(self) -> None:
+        """
+        Flushes the pending writes. The storage can be closed more than once.
+
+        Returns:
+        None
+        """
+
+        for task in list(self._flush_tasks):
+            task.cancel()
+        if self._pending:
+            await self._flush(self._flush_future)
+        self._flush_future = None
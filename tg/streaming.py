@@ -0,0 +1,184 @@
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+from loguru import logger
+from telegram.constants import ParseMode
+
+from utils import Strings
+
+# The maximum length of a Telegram message.
+MESSAGE_LIMIT = 4096
+
+# The number of times a final edit is attempted when Telegram asks to wait.
+FINAL_EDIT_ATTEMPTS = 3
+
+# Matches the file citation markers the assistant puts in its answers, e.g. "【4:0†source】".
+_CITATION_PATTERN = re.compile(r"【[^】]*】?")
+
+
+class MessageStreamer:
+    """
+    MessageStreamer shows an answer while it is being generated by progressively editing a single Telegram message,
+    at most once per interval so the chat stays within Telegram's rate limits.
+    """
+
+    def __init__(self, message: Message, interval: float = 1.0) -> None:
+        """
+        Initializes the streamer.
+
+        Parameters:
+        - message (Message): The user's message the answer is replied to.
+        - interval (float, optional): The minimum number of seconds between two edits. Defaults to 1.0.
+
+        Returns:
+        None
+        """
+
+        self.message = message
+        self.interval = interval
+
+        self._reply: Optional[Message] = None
+        self._text = ""
+        self._shown = ""
+        self._edited_at = 0.0
+        self._blocked_until = 0.0
+
+    async def start(self) -> None:
+        """
+        Sends the wait message that is later replaced by the answer.
+
+        Returns:
+        None
+        """
+
+        self._reply = await self.message.answer(Strings.WAIT_MSG)
+        self._edited_at = time.monotonic()
+
+    async def push(self, delta: str) -> None:
+        """
+        Appends a piece of the answer and shows the text received so far if the last edit is old enough.
+
+        Parameters:
+        - delta (str): The new piece of the answer.
+
+        Returns:
+        None
+        """
+
+        self._text += delta
+
+        now = time.monotonic()
+        if now - self._edited_at < self.interval or now < self._blocked_until:
+            return
+
+        text = _CITATION_PATTERN.sub("", self._text).strip()[:MESSAGE_LIMIT]
+        if len(text) == 0 or text == self._shown:
+            return
+
+        self._edited_at = now
+        try:
+            await self._reply.edit_text(text)
+            self._shown = text
+        except TelegramRetryAfter as e:
+            # Skipping the edits until the flood wait is over, the next one will show all the text.
+            self._blocked_until = now + e.retry_after
+        except TelegramBadRequest as e:
+            logger.error(f"Error while streaming the answer: {e}")
+
+    async def finalize(self, text: str) -> None:
+        """
+        Replaces the streamed text with the final answer, sending the parts beyond the message limit as new messages.
+
+        Parameters:
+        - text (str): The final answer.
+
+        Returns:
+        None
+        """
+
+        # Telegram rejects empty messages, so an empty answer is replaced with an apology
+        if len(text.strip()) == 0:
+            text = Strings.EMPTY_ANSWER_MSG
+        parts = self._split(text)
+
+        delay = self._blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        await self._show(parts[0])
+        for part in parts[1:]:
+            try:
+                await self._retry(
+                    lambda: self.message.answer(part, parse_mode=ParseMode.MARKDOWN)
+                )
+            except TelegramBadRequest:
+                await self._retry(lambda: self.message.answer(part))
+
+    async def _show(self, text: str) -> None:
+        """
+        Edits the reply message into the given text, formatted as Markdown if Telegram accepts it.
+
+        Parameters:
+        - text (str): The text to show.
+
+        Returns:
+        None
+        """
+
+        try:
+            await self._retry(
+                lambda: self._reply.edit_text(text, parse_mode=ParseMode.MARKDOWN)
+            )
+        except TelegramBadRequest:
+            # The answer is not valid Markdown, or it is already shown as is.
+            if text != self._shown:
+                await self._retry(lambda: self._reply.edit_text(text))
+        self._shown = text
+
+    @staticmethod
+    async def _retry(action: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Performs a Telegram request, waiting and trying again while Telegram asks to slow down.
+        Unlike the streamed edits, the final answer cannot be skipped.
+
+        Parameters:
+        - action (Callable[[], Awaitable[Any]]): A function making the request.
+
+        Returns:
+        Any: The result of the request.
+        """
+
+        for attempt in range(FINAL_EDIT_ATTEMPTS):
+            try:
+                return await action()
+            except TelegramRetryAfter as e:
+                if attempt == FINAL_EDIT_ATTEMPTS - 1:
+                    raise
+                logger.warning(f"Telegram asked to wait {e.retry_after} s before answering.")
+                await asyncio.sleep(e.retry_after)
+
+    @staticmethod
+    def _split(text: str) -> List[str]:
+        """
+        Splits a text into parts fitting into a Telegram message, preferably at line breaks.
+
+        Parameters:
+        - text (str): The text to split.
+
+        Returns:
+        List[str]: The parts of the text.
+        """
+
+        parts = []
+        while len(text) > MESSAGE_LIMIT:
+            index = text.rfind("\n", 0, MESSAGE_LIMIT)
+            if index <= 0:
+                index = MESSAGE_LIMIT
+            parts.append(text[:index])
+            text = text[index:].lstrip("\n")
+        parts.append(text)
+        return parts
@@ -0,0 +1,109 @@
+import asyncio
+import io
+from typing import Optional, Tuple, Union
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+from loguru import logger
+
+from config import settings
+from services import SttService, TtsCacheService, TtsService
+
+
+async def transcribe_voice(message: Message) -> Optional[str]:
+    """
+    Converts a voice message to text, downloading it into memory unless it has been transcribed before.
+
+    Parameters:
+    - message (Message): The message containing the voice note.
+
+    Returns:
+    Optional[str]: The transcript, or None if the voice note exceeds the size limit.
+    """
+
+    voice = message.voice
+    text = SttService.get_transcript(voice.file_unique_id)
+    if text is not None:
+        return text
+
+    if SttService.is_too_large(voice.file_size):
+        return None
+
+    bot = settings.bot
+    file = await bot.get_file(voice.file_id)
+    buffer = await bot.download_file(file.file_path, destination=io.BytesIO())
+    audio = buffer.getvalue()
+    if SttService.is_too_large(len(audio)):
+        return None
+
+    return await SttService.speech_to_text(
+        audio,
+        file_name="voice.ogg",
+        cache_key=voice.file_unique_id,
+        duration=voice.duration,
+    )
+
+
+def start_speech(text: str) -> asyncio.Task:
+    """
+    Starts converting an answer to speech in the background, so the synthesis overlaps with sending the text.
+
+    Parameters:
+    - text (str): The answer to convert to speech.
+
+    Returns:
+    asyncio.Task: The task resolving to the text, its cache key and either the Telegram file ID
+    of the same speech sent before or the audio of the answer.
+    """
+
+    return asyncio.create_task(_speech(text))
+
+
+async def _speech(text: str) -> Tuple[str, str, Union[str, bytes]]:
+    """
+    Looks up the Telegram file ID of an answer's speech, synthesizing the speech if it has never been sent.
+
+    Parameters:
+    - text (str): The answer to convert to speech.
+
+    Returns:
+    Tuple[str, str, Union[str, bytes]]: The text, the cache key and the file ID or the audio.
+    """
+
+    key = TtsService.cache_key(text)
+    file_id = await TtsCacheService.get_file_id(key)
+    if file_id is not None:
+        return text, key, file_id
+    return text, key, await TtsService.text_to_speech(text)
+
+
+async def answer_voice(message: Message, speech: asyncio.Task) -> None:
+    """
+    Waits for the speech of an answer and sends it as a voice message, remembering its Telegram file ID.
+
+    Parameters:
+    - message (Message): The user's message the voice message is replied to.
+    - speech (asyncio.Task): The task started by `start_speech`.
+
+    Returns:
+    None
+    """
+
+    try:
+        text, key, voice = await speech
+
+        if isinstance(voice, str):
+            try:
+                await message.answer_voice(voice)
+                return
+            except TelegramBadRequest as e:
+                # The file ID is no longer valid, so the audio is uploaded again.
+                logger.warning(f"Cached voice file ID is rejected: {e}")
+                await TtsCacheService.forget_file_id(key)
+                voice = await TtsService.text_to_speech(text)
+
+        sent = await message.answer_voice(BufferedInputFile(voice, filename="answer.ogg"))
+        if sent.voice is not None:
+            await TtsCacheService.set_file_id(key, sent.voice.file_id)
+    except Exception as e:
+        logger.error(f"Error while converting answer to audio: {e}")
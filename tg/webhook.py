@@ -0,0 +1,156 @@
+import asyncio
+import signal
+from typing import Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+from loguru import logger
+
+
+class WebhookServer:
+    """
+    WebhookServer receives Telegram updates over HTTP, acknowledges them at once and processes them
+    in the background with bounded concurrency, so several replicas can run behind a load balancer.
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        concurrency: int,
+        secret: Optional[str] = None,
+        drain_timeout: float = 30.0,
+    ) -> None:
+        """
+        Initializes the webhook server.
+
+        Parameters:
+        - dp (Dispatcher): The dispatcher the updates are fed to.
+        - bot (Bot): The bot the updates belong to.
+        - concurrency (int): The maximum number of updates processed at the same time.
+        - secret (Optional[str], optional): The secret token Telegram must send with every update. Defaults to None.
+        - drain_timeout (float, optional): The number of seconds in-flight updates are awaited on shutdown. Defaults to 30.0.
+
+        Returns:
+        None
+        """
+
+        self.dp = dp
+        self.bot = bot
+        self.secret = secret
+        self.drain_timeout = drain_timeout
+
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._closing = False
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Acknowledges an update and schedules its processing.
+
+        Parameters:
+        - request (web.Request): The HTTP request sent by Telegram.
+
+        Returns:
+        web.Response: 200 once the update is scheduled, 401 for a wrong secret, 503 while shutting down.
+        """
+
+        if self._closing:
+            # Telegram redelivers unacknowledged updates, possibly to another replica.
+            return web.Response(status=503)
+
+        if (
+            self.secret is not None
+            and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret
+        ):
+            return web.Response(status=401)
+
+        update = Update.model_validate(await request.json(), context={"bot": self.bot})
+
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        """
+        Feeds an update to the dispatcher once a processing slot is free.
+
+        Parameters:
+        - update (Update): The update to process.
+
+        Returns:
+        None
+        """
+
+        async with self._semaphore:
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                logger.error(f"Error while processing update {update.update_id}: {e}")
+
+    async def drain(self) -> None:
+        """
+        Stops accepting updates and waits for the in-flight ones to be processed.
+
+        Returns:
+        None
+        """
+
+        self._closing = True
+        if len(self._tasks) == 0:
+            return
+
+        logger.info(f"Draining {len(self._tasks)} updates...")
+        _, pending = await asyncio.wait(set(self._tasks), timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if len(pending) > 0:
+            logger.error(f"{len(pending)} updates were cancelled while draining.")
+
+    async def run(self, host: str, port: int, path: str, base_url: str) -> None:
+        """
+        Registers the webhook with Telegram and serves updates until the process is asked to stop.
+
+        Parameters:
+        - host (str): The interface to listen on.
+        - port (int): The port to listen on.
+        - path (str): The URL path of the webhook.
+        - base_url (str): The public URL of the service behind which the webhook path is exposed.
+
+        Returns:
+        None
+        """
+
+        app = web.Application()
+        app.router.add_post(path, self.handle)
+
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+
+        await self.bot.set_webhook(
+            f"{base_url.rstrip('/')}{path}",
+            secret_token=self.secret,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook is served on {host}:{port}{path}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except NotImplementedError:
+                # Signal handlers are not available on Windows event loops.
+                pass
+
+        try:
+            await stop.wait()
+        finally:
+            await self.drain()
+            await runner.cleanup()
+            await self.bot.session.close()
@@ -0,0 +1,275 @@
+import asyncio
+import io
+import wave
+from typing import List, Optional
+
+import numpy as np
+from loguru import logger
+
+
+async def decode_to_pcm(audio: bytes, sample_rate: int = 16000) -> Optional[np.ndarray]:
+    """
+    Decodes an audio file to mono 16-bit PCM samples with ffmpeg.
+
+    Parameters:
+    - audio (bytes): The content of the audio file.
+    - sample_rate (int, optional): The sample rate of the decoded audio. Defaults to 16000.
+
+    Returns:
+    Optional[np.ndarray]: The samples, or None if ffmpeg is not installed or cannot decode the audio.
+    """
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-i",
+            "pipe:0",
+            "-f",
+            "s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(sample_rate),
+            "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        logger.warning("ffmpeg is not installed, audio cannot be decoded.")
+        return None
+
+    stdout, stderr = await process.communicate(audio)
+    if process.returncode != 0:
+        logger.error(f"ffmpeg failed to decode audio: {stderr.decode(errors='ignore')}")
+        return None
+
+    return np.frombuffer(stdout, dtype=np.int16)
+
+
+def _ogg_crc_table() -> List[int]:
+    """
+    Builds the lookup table of the Ogg page checksum, a CRC-32 with the 0x04C11DB7 polynomial.
+
+    Returns:
+    List[int]: The checksum of every byte value.
+    """
+
+    table = []
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_OGG_CRC_TABLE = _ogg_crc_table()
+
+# The samples in an Opus frame at 48 kHz, by the configuration number in the TOC byte of a packet.
+_OPUS_FRAME_SAMPLES = (
+    [480, 960, 1920, 2880] * 3 + [480, 960] * 2 + [120, 240, 480, 960] * 4
+)
+
+
+def _ogg_crc(page: bytes) -> int:
+    """
+    Computes the checksum of an Ogg page whose checksum field is zeroed.
+
+    Parameters:
+    - page (bytes): The page.
+
+    Returns:
+    int: The checksum.
+    """
+
+    crc = 0
+    table = _OGG_CRC_TABLE
+    for byte in page:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ byte]
+    return crc
+
+
+def _opus_samples(packet: bytes) -> int:
+    """
+    Returns the number of 48 kHz samples an Opus packet decodes to.
+
+    Parameters:
+    - packet (bytes): The packet.
+
+    Returns:
+    int: The number of samples.
+    """
+
+    if len(packet) == 0:
+        return 0
+    frames = packet[0] & 0x03
+    if frames == 3:
+        frames = packet[1] & 0x3F if len(packet) > 1 else 0
+    elif frames != 0:
+        frames = 2
+    else:
+        frames = 1
+    return _OPUS_FRAME_SAMPLES[packet[0] >> 3] * frames
+
+
+def concat_ogg(parts: List[bytes]) -> bytes:
+    """
+    Joins Ogg/Opus files into a single logical stream in memory, without re-encoding them.
+
+    Simply concatenating the files would produce a chained Ogg stream, which some players stop playing
+    at the end of the first file. Instead, the headers of the first file are kept, and the audio pages of
+    the others are appended with the serial number of the first, continuing page numbers and granule positions.
+
+    Parameters:
+    - parts (List[bytes]): The contents of the Ogg/Opus files, in order.
+
+    Returns:
+    bytes: The joined file.
+
+    Raises:
+    - ValueError: If a part is not a valid Ogg/Opus file.
+    """
+
+    output = bytearray()
+    serial = None
+    sequence = 0
+    offset = 0
+
+    for index, part in enumerate(parts):
+        last_part = index == len(parts) - 1
+
+        # Reading the pages of the part
+        pages = []
+        position = 0
+        while position < len(part):
+            if part[position : position + 4] != b"OggS" or position + 27 > len(part):
+                raise ValueError("Invalid Ogg page.")
+            segments_count = part[position + 26]
+            lacing = part[position + 27 : position + 27 + segments_count]
+            body_start = position + 27 + segments_count
+            body_end = body_start + sum(lacing)
+            if body_end > len(part):
+                raise ValueError("Truncated Ogg page.")
+            pages.append((part[position:body_start], part[body_start:body_end]))
+            position = body_end
+        if len(pages) == 0:
+            raise ValueError("Empty Ogg file.")
+
+        packets = 0
+        packet = bytearray()
+        samples = 0
+        for page_index, (header, body) in enumerate(pages):
+            # The identification and comment headers end their pages, so the audio starts on a new page
+            header_page = packets < 2
+
+            # Counting the samples decoded from the packets completed on the page
+            body_position = 0
+            for size in header[27:]:
+                packet += body[body_position : body_position + size]
+                body_position += size
+                if size < 255:
+                    if packets >= 2:
+                        samples += _opus_samples(bytes(packet))
+                    packets += 1
+                    packet = bytearray()
+
+            # The headers are only kept from the first part
+            if header_page and index > 0:
+                continue
+
+            header = bytearray(header)
+            if serial is None:
+                serial = bytes(header[14:18])
+            header[14:18] = serial
+            header[18:22] = sequence.to_bytes(4, "little")
+            sequence += 1
+
+            # Only the last page of the last part ends the stream and keeps the end trimming of the audio
+            last_page = last_part and page_index == len(pages) - 1
+            if not last_part:
+                header[5] &= ~0x04
+            granule = int.from_bytes(header[6:14], "little", signed=True)
+            if not header_page and granule != -1:
+                granule = offset + (granule if last_page else samples)
+                header[6:14] = granule.to_bytes(8, "little", signed=True)
+
+            header[22:26] = bytes(4)
+            header[22:26] = _ogg_crc(bytes(header) + body).to_bytes(4, "little")
+            output += header
+            output += body
+
+        offset += samples
+
+    return bytes(output)
+
+
+def find_split_points(
+    samples: np.ndarray,
+    sample_rate: int,
+    segment_seconds: float,
+    search_seconds: float,
+    frame_seconds: float = 0.03,
+) -> List[int]:
+    """
+    Finds where to split audio into segments of about the given length, choosing the quietest frame
+    around each boundary so words are not cut in half.
+
+    Parameters:
+    - samples (np.ndarray): The PCM samples.
+    - sample_rate (int): The sample rate of the samples.
+    - segment_seconds (float): The target length of a segment.
+    - search_seconds (float): How far from the target boundary, in either direction, the split may move.
+    - frame_seconds (float, optional): The length of the frames whose energy is compared. Defaults to 0.03.
+
+    Returns:
+    List[int]: The sample indices at which the audio is split, in increasing order.
+    """
+
+    frame = max(1, int(sample_rate * frame_seconds))
+    frames_count = len(samples) // frame
+    if frames_count == 0:
+        return []
+
+    # The mean energy of every frame, computed at once
+    frames = samples[: frames_count * frame].astype(np.float32).reshape(frames_count, frame)
+    energy = np.mean(frames * frames, axis=1)
+
+    segment_frames = max(1, int(segment_seconds / frame_seconds))
+    search_frames = int(search_seconds / frame_seconds)
+
+    points = []
+    start = 0
+    while frames_count - start > segment_frames + search_frames:
+        target = start + segment_frames
+        low = max(start + 1, target - search_frames)
+        high = min(frames_count, target + search_frames + 1)
+        split = low + int(np.argmin(energy[low:high]))
+        points.append(split * frame)
+        start = split
+
+    return points
+
+
+def to_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    Encodes mono 16-bit PCM samples as a WAV file.
+
+    Parameters:
+    - samples (np.ndarray): The PCM samples.
+    - sample_rate (int): The sample rate of the samples.
+
+    Returns:
+    bytes: The content of the WAV file.
+    """
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(samples.astype(np.int16).tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,65 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+# Matches the words of a text.
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits a text into lowercase words.
+
+    Parameters:
+    - text (str): The text.
+
+    Returns:
+    List[str]: The words of the text.
+    """
+
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def bm25_scores(
+    query: str, documents: List[str], k1: float = 1.5, b: float = 0.75
+) -> List[float]:
+    """
+    Scores documents against a query with Okapi BM25, the documents themselves serving as the corpus.
+
+    Parameters:
+    - query (str): The query.
+    - documents (List[str]): The documents.
+    - k1 (float, optional): The term frequency saturation. Defaults to 1.5.
+    - b (float, optional): The document length normalization. Defaults to 0.75.
+
+    Returns:
+    List[float]: The score of every document, higher is more relevant.
+    """
+
+    if len(documents) == 0:
+        return []
+
+    terms = set(tokenize(query))
+    frequencies = [Counter(tokenize(document)) for document in documents]
+    lengths = [sum(frequency.values()) for frequency in frequencies]
+    average_length = sum(lengths) / len(lengths) or 1.0
+
+    # The smoothed inverse document frequency, positive even for terms found in most documents
+    count = len(documents)
+    idf = {}
+    for term in terms:
+        containing = sum(1 for frequency in frequencies if term in frequency)
+        idf[term] = math.log(1 + (count - containing + 0.5) / (containing + 0.5))
+
+    scores = []
+    for frequency, length in zip(frequencies, lengths):
+        score = 0.0
+        for term in terms:
+            tf = frequency.get(term, 0)
+            if tf == 0:
+                continue
+            norm = k1 * (1 - b + b * length / average_length)
+            score += idf[term] * tf * (k1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
@@ -0,0 +1,414 @@
+import asyncio
+import codecs
+import fnmatch
+import re
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+from loguru import logger
+
+
+class _TextExtractor(HTMLParser):
+    """
+    _TextExtractor collects the visible text and the links of an HTML page while it is being fed.
+    """
+
+    # Tags whose content is not visible text.
+    _skipped_tags = {"script", "style", "noscript", "template", "svg", "head"}
+
+    # Tags that start a new line of text.
+    _block_tags = {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+        "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+        "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+    }  # fmt: skip
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty extractor.
+
+        Returns:
+        None
+        """
+
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+        self.title = ""
+        self._parts: List[str] = []
+        self._skipped_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in self._skipped_tags:
+            self._skipped_depth += 1
+        elif tag in self._block_tags:
+            self._parts.append("\n")
+
+        if tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._skipped_tags and self._skipped_depth > 0:
+            self._skipped_depth -= 1
+        elif tag in self._block_tags:
+            self._parts.append("\n")
+
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self.title += data
+        if self._skipped_depth == 0:
+            self._parts.append(data)
+
+    @property
+    def text(self) -> str:
+        """
+        Returns the text collected so far, one block per line.
+
+        Returns:
+        str: The text of the page.
+        """
+
+        lines = (" ".join(line.split()) for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+class Crawler:
+    """
+    Crawler is a native asynchronous website crawler: it walks the pages of a site breadth-first,
+    honours robots.txt, spaces out the requests to every host and extracts the text of the pages while downloading them.
+    """
+
+    # The number of leading bytes of a page searched for the charset it declares, as browsers do.
+    _sniff_size = 4096
+
+    # Matches the charset declared by a <meta charset> or a <meta http-equiv="Content-Type"> tag.
+    _meta_charset_pattern = re.compile(
+        rb"<meta[^>]+charset\s*=\s*[\"']?\s*([a-zA-Z0-9_.:-]+)", re.IGNORECASE
+    )
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        per_host: int = 2,
+        delay: float = 0.5,
+        timeout: float = 15.0,
+        max_page_size: int = 2 * 1024 * 1024,
+        user_agent: str = "AiCompanyAssistantBot/1.0",
+    ) -> None:
+        """
+        Initializes the crawler.
+
+        Parameters:
+        - concurrency (int, optional): The maximum number of pages downloaded at the same time. Defaults to 8.
+        - per_host (int, optional): The maximum number of connections to a single host. Defaults to 2.
+        - delay (float, optional): The minimum number of seconds between two requests to a host,
+          unless robots.txt asks for more. Defaults to 0.5.
+        - timeout (float, optional): The number of seconds a page download may take. Defaults to 15.0.
+        - max_page_size (int, optional): The number of bytes read from a page at most. Defaults to 2 MB.
+        - user_agent (str, optional): The user agent of the crawler. Defaults to "AiCompanyAssistantBot/1.0".
+
+        Returns:
+        None
+        """
+
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.max_page_size = max_page_size
+        self.user_agent = user_agent
+
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+
+    async def crawl(
+        self,
+        url: str,
+        maxDepth: int = 2,
+        limit: int = 10,
+        excludes: Optional[List[str]] = None,
+        includes: Optional[List[str]] = None,
+        **_: Any,
+    ) -> List[Dict[str, Any]]:
+        """
+        Crawls the pages of the site of a URL, following links on the same host.
+
+        The options mirror the FireCrawl crawler options, and the pages are returned in the FireCrawl format.
+
+        Parameters:
+        - url (str): The URL the crawl starts from.
+        - maxDepth (int, optional): The maximum number of links followed from the start URL. Defaults to 2.
+        - limit (int, optional): The maximum number of pages returned. Defaults to 10.
+        - excludes (Optional[List[str]], optional): Glob patterns of the paths not to crawl, e.g. "blog/*". Defaults to None.
+        - includes (Optional[List[str]], optional): Glob patterns of the only paths to crawl, if any. Defaults to None.
+
+        Returns:
+        List[Dict[str, Any]]: The pages, as dictionaries with the "markdown" text and the "metadata" of each page.
+        """
+
+        excludes = excludes or []
+        includes = includes or []
+        host = self._host(url)
+
+        pages: List[Dict[str, Any]] = []
+        seen: Set[str] = {urldefrag(url)[0]}
+        level = [url]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        headers = {"User-Agent": self.user_agent}
+        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+
+            async def _fetch(page_url: str) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+                async with semaphore:
+                    try:
+                        return await self._fetch(session, page_url)
+                    except Exception as e:
+                        logger.warning(f"Error while crawling {page_url}: {e}")
+                        return None
+
+            for depth in range(maxDepth + 1):
+                results = await asyncio.gather(*[_fetch(page_url) for page_url in level])
+
+                next_level = []
+                for result in results:
+                    if result is None:
+                        continue
+                    page, links = result
+                    if len(pages) < limit:
+                        pages.append(page)
+
+                    for link in links:
+                        link = urldefrag(urljoin(page["metadata"]["sourceURL"], link))[0]
+                        if link in seen or self._host(link) != host:
+                            continue
+                        if not self._is_allowed_path(link, includes, excludes):
+                            continue
+                        seen.add(link)
+                        next_level.append(link)
+
+                # Fetching no more pages than can still be returned
+                level = next_level[: limit - len(pages)]
+                if len(level) == 0 or depth == maxDepth:
+                    break
+
+        return pages
+
+    async def _fetch(
+        self, session: aiohttp.ClientSession, url: str
+    ) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """
+        Downloads an HTML page politely and extracts its text and links as it is streamed.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session of the crawl.
+        - url (str): The URL of the page.
+
+        Returns:
+        Optional[Tuple[Dict[str, Any], List[str]]]: The page and its links, or None if it cannot be crawled.
+        """
+
+        robots = await self._get_robots(session, url)
+        if robots is not None and not robots.can_fetch(self.user_agent, url):
+            return None
+
+        crawl_delay = robots.crawl_delay(self.user_agent) if robots is not None else None
+        await self._wait_for_turn(url, max(self.delay, float(crawl_delay or 0)))
+
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as response:
+            if response.status != 200 or response.content_type not in (
+                "text/html",
+                "application/xhtml+xml",
+            ):
+                return None
+
+            # Reading the head of the page first, so the charset it declares is known before decoding
+            head = b""
+            chunks = response.content.iter_chunked(64 * 1024)
+            async for chunk in chunks:
+                head += chunk
+                if len(head) >= self._sniff_size:
+                    break
+
+            extractor = _TextExtractor()
+            decoder = codecs.getincrementaldecoder(
+                self._charset(response.charset, head[: self._sniff_size])
+            )(errors="replace")
+            extractor.feed(decoder.decode(head))
+            size = len(head)
+            if size < self.max_page_size:
+                async for chunk in chunks:
+                    extractor.feed(decoder.decode(chunk))
+                    size += len(chunk)
+                    if size >= self.max_page_size:
+                        break
+            extractor.feed(decoder.decode(b"", final=True))
+            extractor.close()
+
+            page_url = str(response.url)
+
+        page = {
+            "markdown": extractor.text,
+            "metadata": {"sourceURL": page_url, "title": extractor.title.strip()},
+        }
+        return page, extractor.links
+
+    async def _get_robots(
+        self, session: aiohttp.ClientSession, url: str
+    ) -> Optional[RobotFileParser]:
+        """
+        Returns the robots.txt rules of the host of a URL, downloading them on first use.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The HTTP session of the crawl.
+        - url (str): A URL of the host.
+
+        Returns:
+        Optional[RobotFileParser]: The rules, or None if the host has no robots.txt.
+        """
+
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        if origin in self._robots:
+            return self._robots[origin]
+
+        robots = None
+        try:
+            async with session.get(
+                f"{origin}/robots.txt", timeout=aiohttp.ClientTimeout(total=self.timeout)
+            ) as response:
+                if response.status == 200:
+                    robots = RobotFileParser()
+                    robots.parse((await response.text(errors="replace")).splitlines())
+                elif response.status in (401, 403):
+                    # Following the convention that a protected robots.txt disallows everything
+                    robots = RobotFileParser()
+                    robots.disallow_all = True
+        except Exception as e:
+            logger.warning(f"Error while reading robots.txt of {origin}: {e}")
+
+        self._robots[origin] = robots
+        return robots
+
+    async def _wait_for_turn(self, url: str, delay: float) -> None:
+        """
+        Waits until the given delay has passed since the previous request to the host of a URL.
+
+        Parameters:
+        - url (str): The URL about to be requested.
+        - delay (float): The minimum number of seconds between two requests to the host.
+
+        Returns:
+        None
+        """
+
+        host = urlparse(url).netloc
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._last_request.get(host, 0.0) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request[host] = time.monotonic()
+
+    @classmethod
+    def extract_text(cls, body: bytes, header_charset: Optional[str] = None) -> str:
+        """
+        Extracts the visible text of a downloaded HTML page, decoded with the charset the page declares.
+        Scripts, styles and the head are left out, so per-request tokens in them do not change the text.
+
+        Parameters:
+        - body (bytes): The body of the page.
+        - header_charset (Optional[str], optional): The charset of the Content-Type header, if any. Defaults to None.
+
+        Returns:
+        str: The text of the page, one block per line.
+        """
+
+        charset = cls._charset(header_charset, body[: cls._sniff_size])
+        extractor = _TextExtractor()
+        extractor.feed(body.decode(charset, errors="replace"))
+        extractor.close()
+        return extractor.text
+
+    @classmethod
+    def _charset(cls, header_charset: Optional[str], head: bytes) -> str:
+        """
+        Determines the charset of a page: a byte order mark wins, then the Content-Type header,
+        then the charset declared in the page itself, falling back to UTF-8.
+
+        Parameters:
+        - header_charset (Optional[str]): The charset of the Content-Type header, if any.
+        - head (bytes): The leading bytes of the page.
+
+        Returns:
+        str: The name of a charset known to Python.
+        """
+
+        if head.startswith(codecs.BOM_UTF8):
+            return "utf-8-sig"
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return "utf-16"
+
+        match = cls._meta_charset_pattern.search(head)
+        candidates = [
+            header_charset,
+            match.group(1).decode("ascii") if match is not None else None,
+        ]
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                logger.warning(f"Unknown charset {candidate}, ignoring it.")
+        return "utf-8"
+
+    @staticmethod
+    def _host(url: str) -> str:
+        """
+        Returns the host of a URL, without the "www." prefix.
+
+        Parameters:
+        - url (str): The URL.
+
+        Returns:
+        str: The host.
+        """
+
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    @staticmethod
+    def _is_allowed_path(url: str, includes: List[str], excludes: List[str]) -> bool:
+        """
+        Checks the path of a URL against the include and exclude patterns of the crawl.
+
+        Parameters:
+        - url (str): The URL.
+        - includes (List[str]): Glob patterns of the only paths to crawl, if any.
+        - excludes (List[str]): Glob patterns of the paths not to crawl.
+
+        Returns:
+        bool: True if the URL may be crawled, False otherwise.
+        """
+
+        path = urlparse(url).path.lstrip("/")
+        if any(fnmatch.fnmatch(path, pattern) for pattern in excludes):
+            return False
+        return len(includes) == 0 or any(
+            fnmatch.fnmatch(path, pattern) for pattern in includes
+        )
@@ -0,0 +1,99 @@
+import re
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# The Mersenne prime 2^31 - 1, small enough for the permutation products to fit in 64 bits.
+_PRIME = np.uint64((1 << 31) - 1)
+
+# Matches the words of a text.
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def _shingles(text: str, size: int) -> np.ndarray:
+    """
+    Hashes the word shingles of a text.
+
+    Parameters:
+    - text (str): The text.
+    - size (int): The number of words in a shingle.
+
+    Returns:
+    np.ndarray: The distinct hashes of the shingles.
+    """
+
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(len(words) - size + 1)
+        }
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) % int(_PRIME) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def signatures(
+    texts: List[str], num_perm: int = 128, shingle_size: int = 5
+) -> List[Optional[np.ndarray]]:
+    """
+    Computes the MinHash signatures of texts.
+
+    Parameters:
+    - texts (List[str]): The texts.
+    - num_perm (int, optional): The number of hash permutations. Defaults to 128.
+    - shingle_size (int, optional): The number of words in a shingle. Defaults to 5.
+
+    Returns:
+    List[Optional[np.ndarray]]: The signature of every text, or None for texts without words.
+    """
+
+    # The permutations are seeded so that signatures are comparable between runs
+    generator = np.random.default_rng(1)
+    a = generator.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+    b = generator.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    result = []
+    for text in texts:
+        hashes = _shingles(text, shingle_size)
+        if len(hashes) == 0:
+            result.append(None)
+            continue
+        result.append(((np.outer(hashes, a) + b) % _PRIME).min(axis=0))
+    return result
+
+
+def find_near_duplicates(
+    texts: List[str],
+    threshold: float,
+    num_perm: int = 128,
+    shingle_size: int = 5,
+) -> List[int]:
+    """
+    Finds the texts that are near-duplicates of an earlier text, comparing the estimated Jaccard similarity
+    of their word shingles.
+
+    Parameters:
+    - texts (List[str]): The texts, in order of preference.
+    - threshold (float): The estimated similarity from which a text is a near-duplicate.
+    - num_perm (int, optional): The number of hash permutations. Defaults to 128.
+    - shingle_size (int, optional): The number of words in a shingle. Defaults to 5.
+
+    Returns:
+    List[int]: The indices of the texts that duplicate an earlier one.
+    """
+
+    kept = np.empty((0, num_perm), dtype=np.uint64)
+    duplicates = []
+    for index, signature in enumerate(signatures(texts, num_perm, shingle_size)):
+        if signature is None:
+            continue
+        if len(kept) > 0 and (kept == signature).mean(axis=1).max() >= threshold:
+            duplicates.append(index)
+            continue
+        kept = np.vstack([kept, signature])
+    return duplicates
@@ -0,0 +1,342 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import aiohttp
+import httpx
+import openai
+from loguru import logger
+
+# The monotonic time by which the current operation must finish, if any.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker of its endpoint is open.
+    """
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Limits the time available to every resilient call made inside the block, including tasks it spawns.
+
+    A nested deadline can only shorten the enclosing one.
+
+    Parameters:
+    - seconds (float): The time budget of the block.
+
+    Returns:
+    Iterator[None]: A context manager.
+    """
+
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """
+    Returns the time left until the current deadline.
+
+    Returns:
+    Optional[float]: The remaining seconds, or None if no deadline is set.
+    """
+
+    current = _deadline.get()
+    if current is None:
+        return None
+    return current - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker stops calls to an endpoint after consecutive failures and lets a single probe through
+    once the reset timeout has passed.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        """
+        Initializes a closed circuit breaker.
+
+        Parameters:
+        - name (str): The name of the protected endpoint.
+        - failure_threshold (int): The number of consecutive failures that opens the circuit.
+        - reset_timeout (float): The number of seconds the circuit stays open before a probe is allowed.
+
+        Returns:
+        None
+        """
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """
+        Returns the state of the circuit: "closed", "open" or "half_open".
+
+        Returns:
+        str: The state of the circuit.
+        """
+
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Checks whether a call may be made now. In the half-open state only one probe is allowed at a time.
+
+        Returns:
+        bool: True if the call may be made, False otherwise.
+        """
+
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """
+        Closes the circuit after a successful call.
+
+        Returns:
+        None
+        """
+
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self) -> None:
+        """
+        Gives back the probe of a call that ended without telling anything about the endpoint, e.g. a cancelled call.
+
+        Returns:
+        None
+        """
+
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """
+        Counts a failed call and opens the circuit when the threshold is reached or a probe fails.
+
+        Returns:
+        bool: True if this failure tripped the circuit, False otherwise.
+        """
+
+        self.failures += 1
+        was_probing = self._probing
+        self._probing = False
+        if was_probing or (
+            self.opened_at is None and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class Resilience:
+    """
+    Resilience wraps calls to external services with jittered exponential backoff retries,
+    per-endpoint circuit breakers and the deadline of the current context.
+    """
+
+    # A dictionary containing the default retry and circuit breaker options.
+    _config = {
+        "attempts": 4,
+        "base_delay": 0.5,
+        "max_delay": 20.0,
+        "failure_threshold": 5,
+        "reset_timeout": 30.0,
+    }
+
+    # A dictionary mapping endpoint names to their circuit breakers.
+    _breakers: Dict[str, CircuitBreaker] = {}
+
+    # Counters of calls, retries, failures, circuit trips, rejections and exceeded deadlines, keyed by "<event>:<endpoint>".
+    _counters: Counter = Counter()
+
+    @classmethod
+    def breaker(cls, endpoint: str) -> CircuitBreaker:
+        """
+        Returns the circuit breaker of an endpoint, creating it on first use.
+
+        Parameters:
+        - endpoint (str): The name of the endpoint.
+
+        Returns:
+        CircuitBreaker: The circuit breaker of the endpoint.
+        """
+
+        if endpoint not in cls._breakers:
+            cls._breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                failure_threshold=cls._config["failure_threshold"],
+                reset_timeout=cls._config["reset_timeout"],
+            )
+        return cls._breakers[endpoint]
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """
+        Returns a snapshot of the resilience counters.
+
+        Returns:
+        Dict[str, int]: The counters keyed by "<event>:<endpoint>".
+        """
+
+        return dict(cls._counters)
+
+    @staticmethod
+    def _status(error: Exception) -> Optional[int]:
+        """
+        Returns the HTTP status of the response an error was raised for, if any.
+
+        Parameters:
+        - error (Exception): The error raised by the call.
+
+        Returns:
+        Optional[int]: The HTTP status, or None if the endpoint did not answer.
+        """
+
+        status = getattr(error, "status_code", None) or getattr(error, "status", None)
+        return status if isinstance(status, int) else None
+
+    @classmethod
+    def _is_retryable(cls, error: Exception) -> bool:
+        """
+        Decides whether a failed call is worth retrying. Only transient errors are: timeouts, connection errors,
+        server errors, request timeouts, conflicts and rate limits. Any other error is raised at once.
+
+        Parameters:
+        - error (Exception): The error raised by the call.
+
+        Returns:
+        bool: True if the call may be retried, False otherwise.
+        """
+
+        if isinstance(
+            error,
+            (
+                asyncio.TimeoutError,
+                ConnectionError,
+                aiohttp.ClientConnectionError,
+                httpx.TransportError,
+                openai.APIConnectionError,
+            ),
+        ):
+            return True
+        status = cls._status(error)
+        return status is not None and (status >= 500 or status in (408, 409, 429))
+
+    @classmethod
+    async def call(
+        cls,
+        endpoint: str,
+        fn: Callable[..., Awaitable[Any]],
+        *args: Any,
+        attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Calls `fn(*args, **kwargs)` through the circuit breaker of the endpoint, retrying retryable failures.
+
+        Parameters:
+        - endpoint (str): The name of the endpoint, e.g. "openai.chat".
+        - fn (Callable[..., Awaitable[Any]]): A function producing the awaitable to run; it is called again on each attempt.
+        - attempts (Optional[int], optional): The maximum number of attempts. Defaults to the configured value.
+        - base_delay (Optional[float], optional): The backoff delay before the first retry. Defaults to the configured value.
+        - max_delay (Optional[float], optional): The upper bound of the backoff delay. Defaults to the configured value.
+
+        Returns:
+        Any: The result of the call.
+
+        Raises:
+        - CircuitOpenError: If the circuit of the endpoint is open.
+        - asyncio.TimeoutError: If the deadline of the current context is exceeded.
+        - Exception: The last error of the call if it is not retryable or all attempts failed.
+        """
+
+        attempts = attempts or cls._config["attempts"]
+        base_delay = base_delay if base_delay is not None else cls._config["base_delay"]
+        max_delay = max_delay if max_delay is not None else cls._config["max_delay"]
+        breaker = cls.breaker(endpoint)
+
+        for attempt in range(attempts):
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError(f"Deadline exceeded before calling {endpoint}.")
+
+            if not breaker.allow():
+                cls._counters[f"rejections:{endpoint}"] += 1
+                raise CircuitOpenError(f"Circuit of {endpoint} is open.")
+
+            cls._counters[f"calls:{endpoint}"] += 1
+            try:
+                result = await asyncio.wait_for(fn(*args, **kwargs), timeout=remaining)
+            except Exception as e:
+                if (
+                    isinstance(e, asyncio.TimeoutError)
+                    and remaining is not None
+                    and remaining_time() <= 0
+                ):
+                    # The deadline of the caller ran out, which says nothing about the endpoint
+                    cls._counters[f"deadlines:{endpoint}"] += 1
+                    breaker.release()
+                    raise
+
+                retryable = cls._is_retryable(e)
+                if retryable:
+                    cls._counters[f"failures:{endpoint}"] += 1
+                    if breaker.record_failure():
+                        cls._counters[f"trips:{endpoint}"] += 1
+                        logger.error(f"Circuit of {endpoint} is open after: {e}")
+                elif cls._status(e) is not None:
+                    # The endpoint answered, so the circuit stays as healthy as the answer shows.
+                    breaker.record_success()
+                else:
+                    # Errors of the caller say nothing about the endpoint
+                    breaker.release()
+
+                if not retryable or attempt == attempts - 1:
+                    raise
+
+                delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+                remaining = remaining_time()
+                if remaining is not None and delay >= remaining:
+                    raise
+                cls._counters[f"retries:{endpoint}"] += 1
+                logger.warning(
+                    f"Call to {endpoint} failed ({e}), retrying in {delay:.2f}s."
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # A cancelled call must not keep the probe of a half-open circuit forever
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return result
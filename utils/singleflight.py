@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    SingleFlight coalesces concurrent calls sharing a key: the first caller starts the work,
+    and every caller arriving while it is in flight awaits the same result.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty registry of in-flight calls.
+
+        Returns:
+        None
+        """
+
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs `fn` unless a call with the same key is already in flight, and returns its result.
+
+        The registry entry is cleared as soon as the call succeeds or fails, so a later call starts afresh.
+        Cancelling one of the waiting callers does not cancel the shared call.
+
+        Parameters:
+        - key (Hashable): The key identifying the call.
+        - fn (Callable[[], Awaitable[Any]]): A function producing the awaitable to run.
+
+        Returns:
+        Any: The result of the shared call. Its exception is raised to every caller if it fails.
+        """
+
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """
+        Checks whether a call with the given key is in flight.
+
+        Parameters:
+        - key (Hashable): The key identifying the call.
+
+        Returns:
+        bool: True if the call is in flight, False otherwise.
+        """
+
+        return key in self._calls
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """
+        Removes a finished call from the registry.
+
+        Parameters:
+        - key (Hashable): The key identifying the call.
+        - task (asyncio.Task): The finished call.
+
+        Returns:
+        None
+        """
+
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -11,6 +11,8 @@ class Strings:
 
     URL_INVALID_MSG = "Ваш URL-адрес невалиден. Попробуйте ещё раз."
 
+    URL_UNREACHABLE_MSG = "Не удалось открыть сайт по этому адресу. Проверьте URL-адрес и попробуйте ещё раз."
+
     BAD_NAME_MSG = (
         "Имя компании должно содержать только буквы, цифра, пробелы, дефисы и кавычки."
     )
@@ -29,6 +31,24 @@ class Strings:
 
     ASSISTANT_IS_LOADING_MSG = "Ваш ассистент загружается. Пожалуйста, подождите."
 
+    ONBOARDING_QUEUED_MSG = "Заявка поставлена в очередь."
+
+    ONBOARDING_CRAWLING_MSG = "Собираем информацию с веб-сайта компании..."
+
+    ONBOARDING_SUMMARIZING_MSG = "Анализируем собранную информацию..."
+
+    ONBOARDING_CREATING_MSG = "Создаём ассистента..."
+
+    ONBOARDING_DONE_MSG = "Готово!"
+
+    ASSISTANT_IS_CREATING_MSG = (
+        "Ваш ассистент ещё создаётся. Мы сообщим, как только он будет готов."
+    )
+
+    EMPTY_ANSWER_MSG = "Извините, не удалось сформулировать ответ. Пожалуйста, переформулируйте вопрос."
+
+    VOICE_IS_TOO_LARGE_MSG = "Голосовое сообщение слишком большое. Пожалуйста, запишите сообщение покороче."
+
     ASSISTANT_IS_DEAD = (
         "Возникла ошибка: ассистент не сумел создаться. Пожалуйста, повторите попытку."
     )
@@ -0,0 +1,152 @@
+import re
+
+# HTML tags, e.g. <div class="...">. Group 1 is set only for a complete tag.
+_HTML_TAG_PATTERN = re.compile(r"<[^>]*(>)?")
+
+# Markdown images without nested brackets, e.g. ![alt](src). Group 1 is set only for a complete image.
+_MARKDOWN_IMAGE_PATTERN = re.compile(r"!\[[^\]]*(?:\](?:\([^)]*(\))?)?)?")
+
+# Everything from the first "![" of a line up to the end of that line.
+_LINE_IMAGE_TAIL_PATTERN = re.compile(r"!\[[^\n]*")
+
+# Markdown links, e.g. [text](href). Group 2 is set only for a complete link.
+_MARKDOWN_LINK_PATTERN = re.compile(r"\[([^\]]+)(?:\](?:\([^)]*(\))?)?)?")
+
+# Words that look like file names of images and documents.
+_FILE_NAME_PATTERN = re.compile(
+    r"\b\w+\.(jpg|jpeg|png|gif|bmp|pdf|doc|docx|xls|xlsx|ppt|pptx|webp)\b",
+    flags=re.IGNORECASE,
+)
+
+# Markup characters deleted before file names are stripped.
+_MARKUP_CHARS_TABLE = str.maketrans("", "", "*#=-\\")
+
+# Quote characters deleted after file names are stripped.
+_QUOTE_CHARS_TABLE = str.maketrans("", "", "\"'")
+
+
+def _strip_html_tag(match: re.Match) -> str:
+    """
+    Removes a complete non-empty HTML tag, equivalent to substituting `<[^>]+>`.
+
+    The pattern never backtracks: an incomplete candidate is consumed as is, since no match could start inside it.
+
+    Parameters:
+    - match (re.Match): The match of the tag candidate.
+
+    Returns:
+    str: An empty string for a tag, or the unchanged candidate otherwise.
+    """
+
+    if match.group(1) is None or match.end() - match.start() == 2:
+        return match.group(0)
+    return ""
+
+
+def _strip_markdown_image(match: re.Match) -> str:
+    """
+    Removes a complete markdown image, equivalent to substituting `!\\[[^\\]]*\\]\\([^)]*\\)`.
+
+    Parameters:
+    - match (re.Match): The match of the image candidate.
+
+    Returns:
+    str: An empty string for an image, or the unchanged candidate otherwise.
+    """
+
+    return "" if match.group(1) is not None else match.group(0)
+
+
+def _unwrap_markdown_link(match: re.Match) -> str:
+    """
+    Replaces a complete markdown link with its text, equivalent to substituting `\\[([^\\]]+)\\]\\([^)]*\\)`.
+
+    Parameters:
+    - match (re.Match): The match of the link candidate.
+
+    Returns:
+    str: The link text for a link, or the unchanged candidate otherwise.
+    """
+
+    return match.group(1) if match.group(2) is not None else match.group(0)
+
+
+def _strip_line_image(match: re.Match) -> str:
+    """
+    Removes a greedy markdown image from the tail of a line.
+
+    The tail starts at the first "![" of the line. Like the greedy pattern `!\\[.*\\]\\(.*\\)`, the image spans
+    up to the last ")" of the line, provided a "](" lies between them.
+
+    Parameters:
+    - match (re.Match): The match of the line tail.
+
+    Returns:
+    str: The line tail without the image, or the unchanged tail if it holds no image.
+    """
+
+    tail = match.group(0)
+    end = tail.rfind(")")
+    if end == -1 or tail.rfind("](", 2, end) == -1:
+        return tail
+    return tail[end + 1 :]
+
+
+def _strip_lazy_links(text: str) -> str:
+    """
+    Removes what remains of markdown links from single-line text, in linear time.
+
+    This is equivalent to the lazy pattern `\\[.*?\\]\\(.*?\\)`: each link starts at a "[", runs to the
+    nearest following "](" and ends at the nearest ")" after it.
+
+    Parameters:
+    - text (str): The text to process. It must not contain line breaks.
+
+    Returns:
+    str: The text without the links.
+    """
+
+    parts = []
+    position = 0
+    while True:
+        start = text.find("[", position)
+        if start == -1:
+            break
+        middle = text.find("](", start + 1)
+        if middle == -1:
+            break
+        end = text.find(")", middle + 2)
+        if end == -1:
+            break
+        parts.append(text[position:start])
+        position = end + 1
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def clean_text(text: str) -> str:
+    """
+    Cleans the input text by removing HTML tags, markdown syntax, and other non-text elements.
+
+    All patterns are precompiled and run in linear time, single-character deletions use translation tables.
+
+    Parameters:
+    - text (str): The text to clean.
+
+    Returns:
+    str: The cleaned text.
+    """
+
+    text = _HTML_TAG_PATTERN.sub(_strip_html_tag, text)
+    text = _MARKDOWN_IMAGE_PATTERN.sub(_strip_markdown_image, text)
+    # A line holds at most one greedy image, and lazy image patterns cannot match what is left afterwards.
+    text = _LINE_IMAGE_TAIL_PATTERN.sub(_strip_line_image, text)
+    text = _MARKDOWN_LINK_PATTERN.sub(_unwrap_markdown_link, text)
+    text = " ".join(text.split())
+    text = _strip_lazy_links(text)
+    # Every "<...>" left after the first pass is gone by now, so <img> and <a> tags need no extra pass.
+    text = text.translate(_MARKUP_CHARS_TABLE)
+    text = _FILE_NAME_PATTERN.sub("", text)
+    text = text.translate(_QUOTE_CHARS_TABLE)
+    text = " ".join(text.split())
+    return text